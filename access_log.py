@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import json
+import queue
+import random
+import atexit
+import threading
+from datetime import datetime
+
+# Format access log yang dikenal; default dapat diganti lewat konfigurasi (access_log_format)
+ACCESS_LOG_FORMATS = ('text', 'json')
+ACCESS_LOG_FORMAT = 'text'
+# Porsi request yang dicatat di access log (1.0 = semua), dapat diganti lewat access_log_sample_rate
+ACCESS_LOG_SAMPLE_RATE = 1.0
+# Jumlah maksimal baris yang ditulis dalam satu kali write
+LOG_BATCH_SIZE = 512
+
+class LogWriter:
+    """Logger dengan antrean: worker hanya enqueue, thread latar menulis per batch"""
+    def __init__(self, stream=None, access_format=ACCESS_LOG_FORMAT, sample_rate=ACCESS_LOG_SAMPLE_RATE, batch_size=LOG_BATCH_SIZE):
+        # stream None berarti sys.stdout saat ditulis
+        self.stream = stream
+        self.access_format = access_format
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        # Thread penulis dimiliki satu proses, dibuat ulang setelah fork
+        self.owner_pid = None
+        self.start_lock = threading.Lock()
+        self.cached_second = None
+        self.cached_timestamp = ''
+
+    def configure(self, access_format=ACCESS_LOG_FORMAT, sample_rate=ACCESS_LOG_SAMPLE_RATE):
+        """Mengatur format dan sampling access log, dipanggil sebelum worker di-fork"""
+        self.access_format = access_format
+        self.sample_rate = sample_rate
+
+    def configure_from(self, server_config):
+        """Mengambil format dan sampling dari konfigurasi server (access_log_format, access_log_sample_rate)"""
+        self.configure(server_config.access_log_format, server_config.access_log_sample_rate)
+
+    def start(self):
+        """Menjalankan thread penulis untuk proses saat ini"""
+        with self.start_lock:
+            if self.owner_pid == os.getpid():
+                return
+            # Thread milik proses induk tidak ikut ter-fork, antrean juga dibuat baru
+            self.queue = queue.SimpleQueue()
+            self.owner_pid = os.getpid()
+            threading.Thread(target=self.run, name='log-writer', daemon=True).start()
+
+    def enqueue(self, record):
+        if self.owner_pid != os.getpid():
+            self.start()
+        self.queue.put(record)
+
+    def log(self, message, label):
+        """Mencatat pesan server biasa"""
+        self.enqueue(('message', time.time(), label, message))
+
+    def write(self, text):
+        """Mencatat teks apa adanya (misalnya blok status server)"""
+        self.enqueue(('raw', text))
+
+    def access(self, client_address, http_request, http_response, latency):
+        """Mencatat satu request di access log sesuai sampling"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.enqueue(('access', time.time(), os.getpid(), client_address, http_request.method, http_request.path, http_response.kode, http_response.sent_bytes, latency))
+
+    def flush(self, timeout=1.0):
+        """Menunggu semua baris yang sudah di-enqueue selesai ditulis"""
+        if self.owner_pid != os.getpid():
+            return
+        flushed = threading.Event()
+        self.queue.put(('flush', flushed))
+        flushed.wait(timeout)
+
+    def format_timestamp(self, created):
+        # Format waktu cukup dihitung sekali per detik
+        created_second = int(created)
+        if created_second != self.cached_second:
+            self.cached_second = created_second
+            self.cached_timestamp = datetime.fromtimestamp(created_second).strftime("%Y-%m-%d %H:%M:%S")
+        return self.cached_timestamp
+
+    def format_record(self, record):
+        if record[0] == 'raw':
+            return record[1]
+
+        if record[0] == 'message':
+            _, created, label, message = record
+            return f"[{self.format_timestamp(created)}] [{label:>8}] {message}\n"
+
+        _, created, process_id, client_address, method, path, status, sent_bytes, latency = record
+        if self.access_format == 'json':
+            return json.dumps({
+                'time': datetime.fromtimestamp(created).isoformat(timespec='milliseconds'),
+                'pid': process_id,
+                'client': f"{client_address[0]}:{client_address[1]}",
+                'method': method,
+                'path': path,
+                'status': status,
+                'bytes': sent_bytes,
+                'latency_ms': round(latency * 1000, 3)
+            }) + "\n"
+        return f"[{self.format_timestamp(created)}] [{process_id:>8}] {client_address[0]}:{client_address[1]} \"{method} {path}\" {status} {sent_bytes}B {latency * 1000:.1f}ms\n"
+
+    def run(self):
+        """Loop thread penulis: mengambil semua baris yang menunggu lalu menulis sekaligus"""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            flush_events = []
+            lines = []
+            for record in batch:
+                if record[0] == 'flush':
+                    flush_events.append(record[1])
+                else:
+                    lines.append(self.format_record(record))
+
+            if lines:
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write(''.join(lines))
+                    stream.flush()
+                except (OSError, ValueError):
+                    pass
+            for flush_event in flush_events:
+                flush_event.set()
+
+# Logger bersama untuk semua mode server
+log_writer = LogWriter()
+
+atexit.register(log_writer.flush)
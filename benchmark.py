@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from client import WebClient, TransferError
+
+# Skrip server untuk setiap mode yang bisa dibandingkan
+SERVER_MODES = {
+    'thread': 'server_thread_pool_http.py',
+    'process': 'server_process_pool_http.py',
+    'async': 'server_async_http.py',
+    'prefork': 'server_prefork_http.py',
+}
+
+# Campuran request bawaan (bobot relatif)
+DEFAULT_MIX = 'index=30,files=5,small=35,medium=20,large=2,upload=4,delete=4'
+# Ukuran file uji yang disediakan di document root sementara
+FIXTURE_SIZES = {'small': 1024, 'medium': 100 * 1024, 'large': 8 * 1024 * 1024}
+
+BENCHMARK_HOST = '127.0.0.1'
+SERVER_START_TIMEOUT = 10
+
+def parse_mix(mix_text):
+    """Mengurai 'jenis=bobot,...' menjadi daftar (jenis, bobot)"""
+    request_mix = []
+    for mix_item in mix_text.split(','):
+        request_kind, _, weight = mix_item.partition('=')
+        request_kind = request_kind.strip()
+        if request_kind not in ('index', 'files', 'upload', 'delete') and request_kind not in FIXTURE_SIZES:
+            raise ValueError(f"Jenis request tidak dikenal: {request_kind}")
+        request_mix.append((request_kind, float(weight or 1)))
+    return request_mix
+
+def prepare_fixtures(document_root, upload_directory):
+    """Membuat file uji untuk GET di document root dan sumber upload di sisi klien"""
+    for fixture_name, fixture_size in FIXTURE_SIZES.items():
+        with open(os.path.join(document_root, f'{fixture_name}.bin'), 'wb') as fixture_file:
+            fixture_file.write(os.urandom(fixture_size))
+    upload_source = os.path.join(upload_directory, 'upload-source.bin')
+    with open(upload_source, 'wb') as upload_file:
+        upload_file.write(os.urandom(FIXTURE_SIZES['small']))
+    return upload_source
+
+def process_tree(root_pid):
+    """PID proses server beserta semua turunannya (worker pool/pre-fork)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat_file:
+                stat_fields = stat_file.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        children.setdefault(int(stat_fields[1]), []).append(int(entry))
+
+    tree = [root_pid]
+    for pid in tree:
+        tree.extend(children.get(pid, []))
+    return tree
+
+def process_usage(pids):
+    """Total waktu CPU (detik) dan RSS (KB) untuk sekumpulan proses dari /proc"""
+    clock_ticks = os.sysconf('SC_CLK_TCK')
+    cpu_seconds = 0.0
+    rss_kb = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as stat_file:
+                stat_fields = stat_file.read().rpartition(')')[2].split()
+            # utime dan stime ada di kolom ke-14 dan ke-15 (indeks 11 dan 12 setelah nama proses)
+            cpu_seconds += (int(stat_fields[11]) + int(stat_fields[12])) / clock_ticks
+            with open(f'/proc/{pid}/status') as status_file:
+                for status_line in status_file:
+                    if status_line.startswith('VmRSS:'):
+                        rss_kb += int(status_line.split()[1])
+                        break
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu_seconds, rss_kb
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_load_thread(port, request_mix, deadline, reuse_connections, upload_source, samples, thread_label):
+    """Satu klien beban: mengirim request sesuai campuran sampai deadline"""
+    web_client = WebClient(BENCHMARK_HOST, port)
+    request_kinds = [request_kind for request_kind, _ in request_mix]
+    weights = [weight for _, weight in request_mix]
+    uploaded_names = []
+    upload_counter = 0
+
+    while time.monotonic() < deadline:
+        request_kind = random.choices(request_kinds, weights)[0]
+        if request_kind == 'delete' and not uploaded_names:
+            # Belum ada file milik klien ini untuk dihapus
+            request_kind = 'upload'
+
+        request_start = time.perf_counter()
+        status_code = 0
+        try:
+            if request_kind == 'index':
+                response_head, _ = web_client.exchange(web_client.build_request_head('GET', '/'))
+                status_code = web_client.response_status(response_head)[0]
+            elif request_kind == 'files':
+                response_head, _ = web_client.exchange(web_client.build_request_head('GET', '/files?limit=100'))
+                status_code = web_client.response_status(response_head)[0]
+            elif request_kind == 'upload':
+                upload_counter += 1
+                upload_path = os.path.join(os.path.dirname(upload_source), f'bench-{thread_label}-{upload_counter}.bin')
+                os.link(upload_source, upload_path)
+                try:
+                    web_client.upload_file(upload_path)
+                finally:
+                    os.remove(upload_path)
+                uploaded_names.append(os.path.basename(upload_path))
+                status_code = 200
+            elif request_kind == 'delete':
+                web_client.delete_remote(uploaded_names.pop())
+                status_code = 200
+            else:
+                # GET file uji; body dibuang begitu diterima
+                response_head, _ = web_client.exchange(web_client.build_request_head('GET', f'/{request_kind}.bin'), body_sink=len)
+                status_code = web_client.response_status(response_head)[0]
+        except TransferError as transfer_error:
+            status_code = transfer_error.status_code
+        except OSError:
+            web_client.close_connection()
+            status_code = -1
+        samples.append((request_kind, status_code, time.perf_counter() - request_start))
+
+        if not reuse_connections:
+            web_client.close_connection()
+    web_client.close_connection()
+
+def run_load_process(port, request_mix, duration, threads, reuse_connections, upload_source, result_queue, process_number):
+    """Proses pembangkit beban dengan beberapa thread klien"""
+    deadline = time.monotonic() + duration
+    samples = []
+    load_threads = [
+        threading.Thread(target=run_load_thread, args=(port, request_mix, deadline, reuse_connections, upload_source, samples, f'{process_number}-{thread_number}'))
+        for thread_number in range(threads)
+    ]
+    for load_thread in load_threads:
+        load_thread.start()
+    for load_thread in load_threads:
+        load_thread.join()
+    result_queue.put(samples)
+
+def wait_for_server(port, server_process):
+    """Menunggu sampai server menerima koneksi"""
+    start_time = time.monotonic()
+    while time.monotonic() - start_time < SERVER_START_TIMEOUT:
+        if server_process.poll() is not None:
+            raise RuntimeError(f"Server berhenti saat start (exit code {server_process.returncode})")
+        try:
+            socket.create_connection((BENCHMARK_HOST, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server tidak siap dalam batas waktu")
+
+def stop_server(server_process):
+    """Menghentikan server beserta worker-nya seperti Ctrl+C, lalu paksa jika perlu"""
+    try:
+        os.killpg(server_process.pid, signal.SIGINT)
+        server_process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(server_process.pid, signal.SIGKILL)
+        server_process.wait()
+    except ProcessLookupError:
+        pass
+
+def benchmark_mode(mode, options, request_mix):
+    """Menjalankan satu mode server dan mengukur hasilnya"""
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SERVER_MODES[mode])
+    with tempfile.TemporaryDirectory(prefix=f'bench-{mode}-') as document_root, tempfile.TemporaryDirectory(prefix='bench-upload-') as upload_directory:
+        upload_source = prepare_fixtures(document_root, upload_directory)
+        server_environment = dict(os.environ, HTTP_SERVER_HOST=BENCHMARK_HOST, HTTP_SERVER_PORT=str(options.port))
+        # Server dijalankan di document root sementara, log dibuang agar tidak membebani terminal
+        server_process = subprocess.Popen([sys.executable, script_path], cwd=document_root, env=server_environment,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        try:
+            wait_for_server(options.port, server_process)
+            time.sleep(options.warmup)
+            cpu_before, _ = process_usage(process_tree(server_process.pid))
+
+            result_queue = multiprocessing.Queue()
+            threads_per_process = max(1, options.concurrency // options.load_processes)
+            load_processes = [
+                multiprocessing.Process(target=run_load_process, args=(options.port, request_mix, options.duration, threads_per_process,
+                                                                       not options.no_reuse, upload_source, result_queue, process_number))
+                for process_number in range(options.load_processes)
+            ]
+            load_start = time.monotonic()
+            for load_process in load_processes:
+                load_process.start()
+
+            # RSS dicatat berkala selama beban berjalan, yang dilaporkan adalah puncaknya
+            peak_rss_kb = 0
+            while time.monotonic() - load_start < options.duration:
+                peak_rss_kb = max(peak_rss_kb, process_usage(process_tree(server_process.pid))[1])
+                time.sleep(0.25)
+
+            samples = []
+            for _ in load_processes:
+                samples.extend(result_queue.get())
+            for load_process in load_processes:
+                load_process.join()
+            elapsed = time.monotonic() - load_start
+            server_pids = process_tree(server_process.pid)
+            cpu_after, final_rss_kb = process_usage(server_pids)
+            peak_rss_kb = max(peak_rss_kb, final_rss_kb)
+        finally:
+            stop_server(server_process)
+
+    return summarize(mode, samples, elapsed, cpu_after - cpu_before, peak_rss_kb, len(server_pids))
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'p999_ms': round(percentile(latencies, 0.999) * 1000, 3) if latencies else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+    }
+
+def summarize(mode, samples, elapsed, cpu_seconds, peak_rss_kb, process_count):
+    """Menyusun hasil satu mode dalam bentuk dict siap JSON"""
+    status_counts = {}
+    latencies_by_kind = {}
+    for request_kind, status_code, latency in samples:
+        status_counts[str(status_code)] = status_counts.get(str(status_code), 0) + 1
+        latencies_by_kind.setdefault(request_kind, []).append(latency)
+    error_count = sum(count for status, count in status_counts.items() if not 200 <= int(status) < 400)
+
+    return {
+        'mode': mode,
+        'requests': len(samples),
+        'errors': error_count,
+        'duration_s': round(elapsed, 3),
+        'rps': round(len(samples) / elapsed, 1),
+        'latency': latency_summary([latency for _, _, latency in samples]),
+        'latency_by_kind': {request_kind: latency_summary(latencies) for request_kind, latencies in sorted(latencies_by_kind.items())},
+        'status_counts': status_counts,
+        'server_cpu_seconds': round(cpu_seconds, 3),
+        'server_cpu_percent': round(cpu_seconds / elapsed * 100, 1),
+        'server_peak_rss_kb': peak_rss_kb,
+        'server_processes': process_count,
+    }
+
+def main(arguments=None):
+    argument_parser = argparse.ArgumentParser(description="Benchmark mode-mode server HTTP di localhost")
+    argument_parser.add_argument('--modes', default='thread,process', help=f"daftar mode dipisah koma: {', '.join(SERVER_MODES)}")
+    argument_parser.add_argument('--concurrency', type=int, default=16, help="jumlah klien bersamaan")
+    argument_parser.add_argument('--load-processes', type=int, default=max(1, min(4, os.cpu_count() or 1)), help="proses pembangkit beban")
+    argument_parser.add_argument('--duration', type=float, default=10.0, help="lama beban per mode (detik)")
+    argument_parser.add_argument('--warmup', type=float, default=0.5, help="jeda setelah server siap (detik)")
+    argument_parser.add_argument('--mix', default=DEFAULT_MIX, help="campuran request, jenis: index, files, small, medium, large, upload, delete")
+    argument_parser.add_argument('--no-reuse', action='store_true', help="koneksi baru untuk setiap request")
+    argument_parser.add_argument('--port', type=int, default=18885)
+    argument_parser.add_argument('--output', help="file hasil JSON (default stdout)")
+    options = argument_parser.parse_args(arguments)
+
+    modes = [mode.strip() for mode in options.modes.split(',') if mode.strip()]
+    for mode in modes:
+        if mode not in SERVER_MODES:
+            argument_parser.error(f"mode tidak dikenal: {mode}")
+    options.load_processes = max(1, min(options.load_processes, options.concurrency))
+    request_mix = parse_mix(options.mix)
+
+    results = []
+    for mode in modes:
+        print(f"Benchmark mode {mode}...", file=sys.stderr)
+        results.append(benchmark_mode(mode, options, request_mix))
+
+    report = {
+        'config': {
+            'concurrency': options.concurrency,
+            'load_processes': options.load_processes,
+            'duration_s': options.duration,
+            'mix': options.mix,
+            'reuse_connections': not options.no_reuse,
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    report_text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(report_text + "\n")
+    else:
+        print(report_text)
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,644 @@
 import socket
 import os
 import sys
-from urllib.parse import quote
+import json
+import time
+import uuid
+import queue
+import random
+import zlib
+import argparse
+import threading
+from collections import namedtuple, Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote, urlencode
+from config import DEFAULT_HOST, DEFAULT_PORT, CLIENT_SETTINGS, add_arguments, resolve
+
+# One file entry from the server's JSON listing (mtime is a Unix timestamp)
+FileRecord = namedtuple('FileRecord', ['name', 'size', 'mtime', 'mime_type'])
+
+# Number of records requested per listing page
+LISTING_PAGE_SIZE = 1000
+# Bytes handed to sendfile per call, progress is reported between calls
+UPLOAD_SLICE_SIZE = 4 * 1024 * 1024
+
+# Ranged downloads: byte range fetched per request and concurrent connections per file
+RANGE_PART_SIZE = 8 * 1024 * 1024
+RANGE_CONNECTIONS = 4
+
+# Bulk transfer defaults: pooled connections, retries and base backoff delay (seconds)
+BULK_WORKERS = 8
+BULK_RETRIES = 3
+BULK_BACKOFF = 0.5
+
+class TransferError(Exception):
+    """The server answered, but not with the expected success status"""
+    def __init__(self, status_code, status_line):
+        super().__init__(status_line)
+        self.status_code = status_code
 
 class WebClient:
-    def __init__(self, server_host='172.16.16.101', server_port=8885):
+    def __init__(self, server_host=DEFAULT_HOST, server_port=DEFAULT_PORT):
         self.server_host = server_host
         self.server_port = server_port
+        # Persistent HTTP/1.1 connection reused across requests
+        self.connection = None
+        self.receive_buffer = b""
     
-    def transmit_request(self, http_request):
-        """Transmit HTTP request and retrieve response"""
-        try:
-            # Establish socket connection
-            connection_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            connection_socket.connect((self.server_host, self.server_port))
-            
-            # Transmit request
-            connection_socket.send(http_request.encode())
-            
-            # Collect response
-            server_response = b""
+    def open_connection(self):
+        """Return the persistent connection, connecting if necessary"""
+        if self.connection is None:
+            self.connection = socket.create_connection((self.server_host, self.server_port))
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.receive_buffer = b""
+        return self.connection
+    
+    def close_connection(self):
+        """Close the persistent connection"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            self.receive_buffer = b""
+    
+    def build_request_head(self, method, path, extra_headers=None):
+        """Build an HTTP/1.1 request head that asks for a persistent connection"""
+        header_lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.server_host}:{self.server_port}",
+            "Connection: keep-alive"
+        ]
+        for header_name, header_value in (extra_headers or {}).items():
+            header_lines.append(f"{header_name}: {header_value}")
+        return ("\r\n".join(header_lines) + "\r\n\r\n").encode()
+    
+    def receive_more(self):
+        """Read the next chunk from the connection into the receive buffer"""
+        received_chunk = self.connection.recv(65536)
+        if not received_chunk:
+            raise ConnectionError("Connection closed by server")
+        self.receive_buffer += received_chunk
+    
+    def read_response(self, body_sink=None):
+        """Read one complete response, returns (head, body, keep_alive)
+        
+        With body_sink, a successful Content-Length body is passed to it piece by
+        piece as it arrives instead of being collected, and body is returned empty.
+        """
+        while b'\r\n\r\n' not in self.receive_buffer:
+            try:
+                self.receive_more()
+            except ConnectionError:
+                if not self.receive_buffer:
+                    # Server closed an idle keep-alive connection before answering
+                    raise ConnectionResetError("Connection closed before response")
+                raise
+        
+        response_head, _, self.receive_buffer = self.receive_buffer.partition(b'\r\n\r\n')
+        header_values = {}
+        for header_line in response_head.split(b'\r\n')[1:]:
+            header_name, _, header_value = header_line.partition(b':')
+            header_values[header_name.strip().lower()] = header_value.strip().lower()
+        
+        keep_alive = header_values.get(b'connection') != b'close'
+        status_code = response_head.split(b' ', 2)[1] if b' ' in response_head else b''
+        if status_code in (b'204', b'304'):
+            # These responses never carry a body
+            response_body = b""
+        elif header_values.get(b'transfer-encoding') == b'chunked':
+            response_body = self.read_chunked_body()
+        elif b'content-length' in header_values and body_sink is not None and status_code in (b'200', b'206'):
+            self.receive_into_sink(int(header_values[b'content-length']), body_sink)
+            response_body = b""
+        elif b'content-length' in header_values:
+            body_length = int(header_values[b'content-length'])
+            while len(self.receive_buffer) < body_length:
+                self.receive_more()
+            response_body = self.receive_buffer[:body_length]
+            self.receive_buffer = self.receive_buffer[body_length:]
+        else:
+            # No length given: the body runs until the server closes the connection
             while True:
-                received_chunk = connection_socket.recv(4096)
-                if not received_chunk:
-                    break
-                server_response += received_chunk
-                # Verify complete response received
-                if b'\r\n\r\n' in server_response:
+                try:
+                    self.receive_more()
+                except ConnectionError:
                     break
+            response_body, self.receive_buffer = self.receive_buffer, b""
+            keep_alive = False
+        
+        return response_head, response_body, keep_alive
+    
+    def receive_into_sink(self, body_length, body_sink):
+        """Hand body_length bytes to body_sink without accumulating them"""
+        buffered_part = self.receive_buffer[:body_length]
+        self.receive_buffer = self.receive_buffer[body_length:]
+        if buffered_part:
+            body_sink(buffered_part)
+        remaining = body_length - len(buffered_part)
+        while remaining:
+            # Never read past this body, the rest belongs to the next response
+            received_chunk = self.connection.recv(min(remaining, 1048576))
+            if not received_chunk:
+                raise ConnectionError(f"Connection closed with {remaining} body bytes outstanding")
+            body_sink(received_chunk)
+            remaining -= len(received_chunk)
+    
+    def read_chunked_body(self):
+        """Read a Transfer-Encoding: chunked body and return it joined"""
+        body_parts = []
+        while True:
+            while b'\r\n' not in self.receive_buffer:
+                self.receive_more()
+            size_line, _, self.receive_buffer = self.receive_buffer.partition(b'\r\n')
+            chunk_size = int(size_line.split(b';')[0], 16)
+            if chunk_size == 0:
+                # Skip optional trailers up to the final blank line
+                while not self.receive_buffer.startswith(b'\r\n') and b'\r\n\r\n' not in self.receive_buffer:
+                    self.receive_more()
+                if self.receive_buffer.startswith(b'\r\n'):
+                    self.receive_buffer = self.receive_buffer[2:]
+                else:
+                    self.receive_buffer = self.receive_buffer.partition(b'\r\n\r\n')[2]
+                return b"".join(body_parts)
+            while len(self.receive_buffer) < chunk_size + 2:
+                self.receive_more()
+            body_parts.append(self.receive_buffer[:chunk_size])
+            self.receive_buffer = self.receive_buffer[chunk_size + 2:]
+    
+    def exchange(self, request_data, send_body=None, body_sink=None):
+        """Send a request over the persistent connection and return (head, body)
+        
+        send_body, if given, is called with the socket after request_data to
+        stream the rest of the request; it must be safe to call again on retry.
+        body_sink is passed on to read_response.
+        """
+        for attempt in range(2):
+            reused_connection = self.connection is not None
+            self.open_connection()
+            try:
+                self.connection.sendall(request_data)
+                if send_body is not None:
+                    send_body(self.connection)
+                response_head, response_body, keep_alive = self.read_response(body_sink)
+            except (ConnectionResetError, BrokenPipeError):
+                self.close_connection()
+                # A reused connection may have been closed by the server's idle timeout
+                if reused_connection and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                self.close_connection()
+                raise
             
-            connection_socket.close()
-            return server_response.decode('utf-8', errors='ignore')
+            if not keep_alive:
+                self.close_connection()
+            return response_head, response_body
+    
+    def response_status(self, response_head):
+        """Return (status_code, status_line) of a response head"""
+        status_line = response_head.split(b'\r\n', 1)[0].decode('latin-1')
+        status_parts = status_line.split(' ')
+        status_code = int(status_parts[1]) if len(status_parts) > 1 and status_parts[1].isdigit() else 0
+        return status_code, status_line
+    
+    def response_headers(self, response_head):
+        """Parse the header lines of a response head into a dict keyed by lower-case name"""
+        header_values = {}
+        for header_line in response_head.split(b'\r\n')[1:]:
+            header_name, _, header_value = header_line.partition(b':')
+            header_values[header_name.strip().lower().decode('latin-1')] = header_value.strip().decode('latin-1')
+        return header_values
+    
+    def transmit_request(self, http_request):
+        """Transmit HTTP request and retrieve response"""
+        try:
+            request_data = http_request.encode() if isinstance(http_request, str) else http_request
+            response_head, response_body = self.exchange(request_data)
+            return (response_head + b'\r\n\r\n' + response_body).decode('utf-8', errors='ignore')
             
         except Exception as connection_error:
             return f"Error: {str(connection_error)}"
     
+    def fetch_listing_page(self, offset=0, limit=LISTING_PAGE_SIZE, sort='name'):
+        """Fetch one page of the JSON listing, returns (records, total)"""
+        query = {'offset': offset, 'sort': sort}
+        if limit is not None:
+            query['limit'] = limit
+        # The JSON listing compresses well, ask for gzip to save bandwidth on slow links
+        listing_request = self.build_request_head("GET", f"/api/files?{urlencode(query)}", {'Accept-Encoding': 'gzip'})
+        response_head, response_body = self.exchange(listing_request)
+        status_code, status_line = self.response_status(response_head)
+        if status_code != 200:
+            raise TransferError(status_code, f"Listing request failed: {status_line}")
+        
+        if self.response_headers(response_head).get('content-encoding') == 'gzip':
+            response_body = zlib.decompress(response_body, 31)
+        listing = json.loads(response_body)
+        records = [FileRecord(entry['name'], entry['size'], entry['mtime'], entry['mime_type']) for entry in listing['files']]
+        return records, listing['total']
+    
+    def iter_file_records(self, sort='name', page_size=LISTING_PAGE_SIZE):
+        """Yield every file on the server as a FileRecord, one page at a time"""
+        offset = 0
+        while True:
+            records, total = self.fetch_listing_page(offset, page_size, sort)
+            yield from records
+            offset += len(records)
+            if not records or offset >= total:
+                break
+    
+    def list_file_records(self, sort='name'):
+        """Return the full directory listing as a list of FileRecord"""
+        return list(self.iter_file_records(sort))
+    
     def retrieve_file_listing(self):
         """Fetch directory listing from server"""
-        http_request = "GET /files HTTP/1.0\r\n\r\n"
-        server_response = self.transmit_request(http_request)
-        
-        # Parse HTML content from response
-        if "200 OK" in server_response:
-            html_start_pos = server_response.find('<html>')
-            if html_start_pos != -1:
-                html_body = server_response[html_start_pos:]
-                # Basic parsing to extract file information
-                print("\n=== Directory Contents ===")
-                if '<tr>' in html_body:
-                    table_rows = html_body.split('<tr>')
-                    for table_row in table_rows[2:]:  # Skip header rows
-                        if '<td>' in table_row:
-                            table_cells = table_row.split('<td>')
-                            if len(table_cells) >= 4:
-                                file_name = table_cells[1].split('</td>')[0]
-                                file_size = table_cells[2].split('</td>')[0]
-                                last_modified = table_cells[3].split('</td>')[0]
-                                print(f"File: {file_name} | Size: {file_size} bytes | Modified: {last_modified}")
-                else:
-                    print("Directory is empty")
-            else:
-                print("Unable to parse directory listing")
-        else:
+        try:
+            file_records = self.list_file_records()
+        except Exception as listing_error:
             print("Failed to retrieve directory listing")
-            print(server_response)
+            print(f"Error: {str(listing_error)}")
+            return
+        
+        print("\n=== Directory Contents ===")
+        if not file_records:
+            print("Directory is empty")
+        for file_record in file_records:
+            last_modified = datetime.fromtimestamp(file_record.mtime).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"File: {file_record.name} | Size: {file_record.size} bytes | Modified: {last_modified}")
+    
+    def stream_file(self, connection, file_handle, file_size, file_name, show_progress):
+        """Send a whole file with sendfile in slices, reporting progress between slices"""
+        start_time = time.monotonic()
+        sent_total = 0
+        while sent_total < file_size:
+            slice_size = min(UPLOAD_SLICE_SIZE, file_size - sent_total)
+            sent_count = connection.sendfile(file_handle, sent_total, slice_size)
+            if not sent_count:
+                raise ConnectionError("Connection closed during upload")
+            sent_total += sent_count
+            if show_progress:
+                elapsed = max(time.monotonic() - start_time, 1e-6)
+                sys.stdout.write(f"\rUploading {file_name}: {sent_total * 100 / file_size:5.1f}% "
+                                 f"({sent_total / 1048576:.1f}/{file_size / 1048576:.1f} MB, {sent_total / 1048576 / elapsed:.1f} MB/s)")
+                sys.stdout.flush()
+        if show_progress and file_size:
+            sys.stdout.write("\n")
+        return sent_total
     
-    def transfer_file(self, file_path):
+    def upload_file(self, file_path, show_progress=False):
+        """Upload one file, streaming it from disk; returns its size or raises"""
+        file_name = os.path.basename(file_path)
+        with open(file_path, 'rb') as file_handle:
+            # Length is known up front, so the body never has to be assembled in memory
+            file_size = os.fstat(file_handle.fileno()).st_size
+            form_boundary = f"----WebClientBoundary{uuid.uuid4().hex}"
+            quoted_name = file_name.replace('\\', '\\\\').replace('"', '\\"')
+            
+            form_preamble = (
+                f"--{form_boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{quoted_name}"\r\n'
+                "Content-Type: application/octet-stream\r\n"
+                "\r\n"
+            ).encode()
+            form_epilogue = f"\r\n--{form_boundary}--\r\n".encode()
+            
+            request_head = self.build_request_head("POST", "/upload", {
+                "Content-Type": f"multipart/form-data; boundary={form_boundary}",
+                "Content-Length": len(form_preamble) + file_size + len(form_epilogue)
+            })
+            
+            def send_body(connection):
+                # Preamble goes out with the head, then the file via sendfile, then the epilogue
+                self.stream_file(connection, file_handle, file_size, file_name, show_progress)
+                connection.sendall(form_epilogue)
+            
+            response_head, _ = self.exchange(request_head + form_preamble, send_body)
+        
+        status_code, status_line = self.response_status(response_head)
+        if status_code != 200:
+            raise TransferError(status_code, f"Upload of {file_name} failed: {status_line}")
+        return file_size
+    
+    def transfer_file(self, file_path, show_progress=True):
         """Transfer a file to the server"""
         if not os.path.exists(file_path):
             print(f"Error: File {file_path} does not exist")
-            return
+            return False
         
         file_name = os.path.basename(file_path)
+        try:
+            start_time = time.monotonic()
+            file_size = self.upload_file(file_path, show_progress)
+            elapsed = max(time.monotonic() - start_time, 1e-6)
+            print(f"Upload successful for {file_name} ({file_size} bytes in {elapsed:.2f}s, {file_size / 1048576 / elapsed:.1f} MB/s)")
+            return True
+        except TransferError as upload_error:
+            print(str(upload_error))
+            return False
+        except Exception as upload_error:
+            print(f"Error during file upload: {str(upload_error)}")
+            return False
+    
+    def download_file(self, remote_name, local_path):
+        """Download one file into local_path; returns its size or raises"""
+        partial_path = local_path + '.part'
+        try:
+            with open(partial_path, 'wb') as output_file:
+                # The body is written to disk as it arrives
+                response_head, response_body = self.exchange(self.build_request_head("GET", f"/{quote(remote_name)}"), body_sink=output_file.write)
+                status_code, status_line = self.response_status(response_head)
+                if status_code != 200:
+                    raise TransferError(status_code, f"Download of {remote_name} failed: {status_line}")
+                if response_body:
+                    output_file.write(response_body)
+        except BaseException:
+            os.remove(partial_path)
+            raise
+        os.replace(partial_path, local_path)
+        return os.path.getsize(local_path)
+    
+    def fetch_range(self, remote_name, range_start, range_end, body_sink):
+        """GET one byte range of a file, feeding the body to body_sink; returns (status, headers)"""
+        range_request = self.build_request_head("GET", f"/{quote(remote_name)}", {"Range": f"bytes={range_start}-{range_end}"})
+        response_head, response_body = self.exchange(range_request, body_sink=body_sink)
+        status_code, status_line = self.response_status(response_head)
+        if status_code not in (200, 206):
+            raise TransferError(status_code, f"Range request for {remote_name} failed: {status_line}")
+        return status_code, self.response_headers(response_head)
+    
+    def download_ranged(self, remote_name, local_path, connections=RANGE_CONNECTIONS, part_size=RANGE_PART_SIZE):
+        """Download a file as parallel byte ranges written in place with pwrite
         
+        Progress is kept in <local_path>.state, so an interrupted download
+        resumes with only the missing ranges as long as the remote file
+        (size and ETag) is unchanged. Returns the file size.
+        """
+        # A one-byte range reveals the size and validator without fetching the body
+        probe_body = []
         try:
-            # Load file content
-            with open(file_path, 'rb') as file_handle:
-                file_data = file_handle.read()
-            
-            # Construct multipart form data
-            form_boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
-            
-            # Assemble multipart body
-            form_sections = []
-            form_sections.append(f"------WebKitFormBoundary7MA4YWxkTrZu0gW")
-            form_sections.append(f'Content-Disposition: form-data; name="file"; filename="{file_name}"')
-            form_sections.append("Content-Type: application/octet-stream")
-            form_sections.append("")
-            
-            # Combine headers
-            header_section = "\r\n".join(form_sections) + "\r\n"
-            
-            # Assemble complete body
-            complete_body = header_section.encode() + file_data + f"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n".encode()
-            
-            # Construct HTTP request
-            request_headers = [
-                "POST /upload HTTP/1.0",
-                f"Content-Type: multipart/form-data; boundary=----WebKitFormBoundary7MA4YWxkTrZu0gW",
-                f"Content-Length: {len(complete_body)}",
-                "",
-                ""
-            ]
-            
-            request_header_text = "\r\n".join(request_headers)
-            full_request = request_header_text.encode() + complete_body
-            
-            # Transmit request via socket for binary data
-            upload_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            upload_socket.connect((self.server_host, self.server_port))
-            upload_socket.send(full_request)
+            status_code, probe_headers = self.fetch_range(remote_name, 0, 0, probe_body.append)
+        except TransferError as probe_error:
+            if probe_error.status_code != 416:
+                raise
+            # An empty file has no satisfiable range
+            return self.download_file(remote_name, local_path)
+        if status_code == 200 or 'content-range' not in probe_headers:
+            # The server ignored the range, fall back to a single stream
+            return self.download_file(remote_name, local_path)
+        file_size = int(probe_headers['content-range'].rpartition('/')[2])
+        file_etag = probe_headers.get('etag')
+        # The parts use their own connections; an idle probe connection would hold a server worker until idle_timeout
+        self.close_connection()
+        
+        partial_path = local_path + '.part'
+        state_path = local_path + '.state'
+        part_count = max(1, -(-file_size // part_size))
+        completed_parts = set()
+        try:
+            with open(state_path) as state_file:
+                saved_state = json.load(state_file)
+            if saved_state['size'] == file_size and saved_state['etag'] == file_etag and saved_state['part_size'] == part_size and os.path.exists(partial_path):
+                completed_parts = set(saved_state['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        output_descriptor = os.open(partial_path, os.O_RDWR | os.O_CREAT, 0o644)
+        state_lock = threading.Lock()
+        
+        def save_state():
+            state_temp_path = state_path + '.tmp'
+            with open(state_temp_path, 'w') as state_file:
+                json.dump({'size': file_size, 'etag': file_etag, 'part_size': part_size, 'done': sorted(completed_parts)}, state_file)
+            os.replace(state_temp_path, state_path)
+        
+        def fetch_part(web_client, part_index):
+            range_start = part_index * part_size
+            range_end = min(file_size, range_start + part_size) - 1
+            write_offset = [range_start]
             
-            # Collect response
-            upload_response = b""
-            while True:
-                response_chunk = upload_socket.recv(4096)
-                if not response_chunk:
-                    break
-                upload_response += response_chunk
-                if b'\r\n\r\n' in upload_response:
-                    break
+            def write_at_offset(data):
+                # Each part writes into its own region, no seek or shared file position
+                os.pwrite(output_descriptor, data, write_offset[0])
+                write_offset[0] += len(data)
             
-            upload_socket.close()
+            status_code, part_headers = web_client.fetch_range(remote_name, range_start, range_end, write_at_offset)
+            if status_code != 206 or part_headers.get('etag') != file_etag:
+                raise TransferError(409, f"{remote_name} changed on the server during download")
+            if write_offset[0] != range_end + 1:
+                raise ConnectionError(f"Short range for {remote_name}: {write_offset[0] - range_start} of {range_end - range_start + 1} bytes")
+            with state_lock:
+                completed_parts.add(part_index)
+                save_state()
+            return range_end - range_start + 1
+        
+        try:
+            # Reserve the full size up front so the ranges can land in any order
+            if os.fstat(output_descriptor).st_size != file_size:
+                os.ftruncate(output_descriptor, file_size)
+            if hasattr(os, 'posix_fallocate') and file_size:
+                try:
+                    os.posix_fallocate(output_descriptor, 0, file_size)
+                except OSError:
+                    pass
+            with state_lock:
+                save_state()
             
-            response_text = upload_response.decode('utf-8', errors='ignore')
-            if "200 OK" in response_text:
-                print(f"Upload successful for {file_name}")
-            else:
-                print(f"Upload failed for {file_name}")
-                print(response_text)
-                
-        except Exception as upload_error:
-            print(f"Error during file upload: {str(upload_error)}")
+            missing_parts = [part_index for part_index in range(part_count) if part_index not in completed_parts]
+            if missing_parts:
+                bulk_transfer = BulkTransfer(self.server_host, self.server_port, min(connections, len(missing_parts)))
+                try:
+                    failures = bulk_transfer.run(fetch_part, missing_parts, f"ranged download of {remote_name}", 'ranges')
+                finally:
+                    bulk_transfer.close()
+                if failures:
+                    raise failures[0][1]
+            os.fsync(output_descriptor)
+        finally:
+            os.close(output_descriptor)
+        
+        os.replace(partial_path, local_path)
+        os.remove(state_path)
+        return file_size
+    
+    def delete_remote(self, target_filename):
+        """Delete one file on the server; raises TransferError if it was refused"""
+        # Encode filename for URL to handle special characters
+        delete_request = self.build_request_head("DELETE", f"/delete/{quote(target_filename)}")
+        response_head, _ = self.exchange(delete_request)
+        status_code, status_line = self.response_status(response_head)
+        if status_code != 200:
+            raise TransferError(status_code, f"Delete of {target_filename} failed: {status_line}")
+        return 0
     
     def remove_file(self, target_filename):
         """Remove a file from the server"""
-        # Encode filename for URL to handle special characters
-        encoded_name = quote(target_filename)
-        delete_request = f"DELETE /delete/{encoded_name} HTTP/1.0\r\n\r\n"
+        try:
+            self.delete_remote(target_filename)
+            print(f"File {target_filename} deleted successfully")
+        except TransferError as delete_error:
+            if delete_error.status_code == 404:
+                print(f"File {target_filename} was not found")
+            else:
+                print(f"Failed to delete {target_filename}")
+                print(str(delete_error))
+        except Exception as delete_error:
+            print(f"Failed to delete {target_filename}")
+            print(f"Error: {str(delete_error)}")
+
+class BulkTransfer:
+    """Runs many uploads, downloads or deletes concurrently over a bounded pool of persistent connections"""
+    def __init__(self, server_host=DEFAULT_HOST, server_port=DEFAULT_PORT, workers=BULK_WORKERS, retries=BULK_RETRIES, backoff=BULK_BACKOFF):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        # Each client owns one keep-alive connection; a task borrows one for its duration
+        self.client_pool = queue.Queue()
+        for _ in range(workers):
+            self.client_pool.put(WebClient(server_host, server_port))
+        # Items not yet picked up; once none are left, idle connections are closed right away
+        self.unstarted_items = 0
+        self.unstarted_lock = threading.Lock()
+    
+    def close(self):
+        """Close every pooled connection"""
+        while not self.client_pool.empty():
+            self.client_pool.get_nowait().close_connection()
+    
+    def run_task(self, operation, item):
+        """Run operation(client, item) with retry and exponential backoff; returns bytes moved"""
+        with self.unstarted_lock:
+            self.unstarted_items -= 1
+        for attempt in range(self.retries + 1):
+            web_client = self.client_pool.get()
+            try:
+                return operation(web_client, item)
+            except TransferError as transfer_error:
+                # Client errors will not fix themselves, server errors (e.g. 503) are retried
+                if transfer_error.status_code < 500 or attempt == self.retries:
+                    raise
+            except OSError:
+                web_client.close_connection()
+                if attempt == self.retries:
+                    raise
+            finally:
+                if not self.unstarted_items:
+                    # Thread and process pool servers hold a worker per open connection until idle_timeout
+                    web_client.close_connection()
+                self.client_pool.put(web_client)
+            time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+    
+    def run(self, operation, items, label, unit='files'):
+        """Run operation over all items and print an aggregate summary; returns the failures"""
+        items = list(items)
+        start_time = time.monotonic()
+        total_bytes = 0
+        failures = []
+        self.unstarted_items = len(items)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.run_task, operation, item): item for item in items}
+            for future, item in futures.items():
+                try:
+                    total_bytes += future.result()
+                except Exception as task_error:
+                    failures.append((item, task_error))
+                    print(f"{label} failed for {item}: {task_error}")
         
-        delete_response = self.transmit_request(delete_request)
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        succeeded = len(items) - len(failures)
+        print(f"\n=== Bulk {label} summary ===")
+        print(f"{unit.capitalize()}: {succeeded} succeeded, {len(failures)} failed, {len(items)} total")
+        print(f"Transferred: {total_bytes} bytes in {elapsed:.2f}s "
+              f"({total_bytes / 1048576 / elapsed:.1f} MB/s, {len(items) / elapsed:.1f} {unit}/s)")
+        return failures
+    
+    def upload(self, paths):
+        """Upload files and whole directory trees (files land flat on the server)"""
+        file_paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                for directory_path, _, file_names in os.walk(path):
+                    file_paths.extend(os.path.join(directory_path, file_name) for file_name in sorted(file_names))
+            else:
+                file_paths.append(path)
+        # Files land flat on the server, so two local files with one name would overwrite each other
+        name_counts = Counter(os.path.basename(file_path) for file_path in file_paths)
+        clashing_names = {file_name for file_name, count in name_counts.items() if count > 1}
         
-        if "200 OK" in delete_response:
-            print(f"File {target_filename} deleted successfully")
-        elif "404 Not Found" in delete_response:
-            print(f"File {target_filename} was not found")
+        def upload_one(web_client, file_path):
+            file_name = os.path.basename(file_path)
+            if file_name in clashing_names:
+                raise ValueError(f"{name_counts[file_name]} files in this upload are named {file_name}; none of them were sent")
+            return web_client.upload_file(file_path)
+        
+        return self.run(upload_one, file_paths, "upload")
+    
+    def download(self, remote_names, destination):
+        """Download the named files (all files if none are named) into destination"""
+        os.makedirs(destination, exist_ok=True)
+        if not remote_names:
+            listing_client = self.client_pool.get()
+            try:
+                remote_names = [file_record.name for file_record in listing_client.iter_file_records()]
+            finally:
+                self.client_pool.put(listing_client)
+        return self.run(lambda web_client, remote_name: web_client.download_file(remote_name, os.path.join(destination, remote_name)), remote_names, "download")
+    
+    def delete(self, remote_names):
+        """Delete the named files on the server"""
+        return self.run(lambda web_client, remote_name: web_client.delete_remote(remote_name), remote_names, "delete")
+
+def execute_bulk(arguments):
+    """Non-interactive mode: python client.py {upload,download,fetch,delete} [items...]; no operation opens the menu"""
+    argument_parser = argparse.ArgumentParser(description="Bulk file transfer over a pool of persistent connections")
+    argument_parser.add_argument('operation', nargs='?', choices=['upload', 'download', 'fetch', 'delete'],
+                                 help="fetch downloads each named file as parallel resumable byte ranges")
+    argument_parser.add_argument('items', nargs='*', help="local files/directories to upload, or remote names to download/delete")
+    add_arguments(argument_parser, CLIENT_SETTINGS)
+    argument_parser.add_argument('--workers', type=int, default=BULK_WORKERS, help="number of concurrent connections")
+    argument_parser.add_argument('--retries', type=int, default=BULK_RETRIES)
+    argument_parser.add_argument('--dest', default='.', help="download directory")
+    argument_parser.add_argument('--connections', type=int, default=RANGE_CONNECTIONS, help="connections per file for fetch")
+    options = argument_parser.parse_args(arguments)
+    # Server address: defaults < .env file < environment < --host/--port
+    server_config = resolve(options, 'client', CLIENT_SETTINGS)
+    options.host, options.port = server_config.host, server_config.port
+    
+    if options.operation is None:
+        execute_main(options.host, options.port)
+        return 0
+    
+    if options.operation == 'fetch':
+        os.makedirs(options.dest, exist_ok=True)
+        web_client = WebClient(options.host, options.port)
+        exit_code = 0
+        for remote_name in options.items:
+            try:
+                web_client.download_ranged(remote_name, os.path.join(options.dest, remote_name), options.connections)
+            except Exception as fetch_error:
+                print(f"fetch failed for {remote_name}: {fetch_error} (run again to resume)")
+                exit_code = 1
+        web_client.close_connection()
+        return exit_code
+    
+    if options.operation != 'download' and not options.items:
+        argument_parser.error(f"{options.operation} needs at least one item")
+    
+    bulk_transfer = BulkTransfer(options.host, options.port, options.workers, options.retries)
+    try:
+        if options.operation == 'upload':
+            failures = bulk_transfer.upload(options.items)
+        elif options.operation == 'download':
+            failures = bulk_transfer.download(options.items, options.dest)
         else:
-            print(f"Failed to delete {target_filename}")
-            print(delete_response)
+            failures = bulk_transfer.delete(options.items)
+    finally:
+        bulk_transfer.close()
+    return 1 if failures else 0
 
-def execute_main():
+def execute_main(server_host=DEFAULT_HOST, server_port=DEFAULT_PORT):
     print("=== HTTP File Management Client ===")
-    print("Ensure your HTTP server is running on 172.16.16.101:8885")
-    
-    # Collect server connection details
-    server_host = "172.16.16.101"
-    server_port = 8885
+    print(f"Ensure your HTTP server is running on {server_host}:{server_port}")
     
     web_client = WebClient(server_host, server_port)
     
@@ -164,9 +647,10 @@ def execute_main():
         print("1. List Files")
         print("2. Upload new file")
         print("3. Delete File")
-        print("4. Exit application")
+        print("4. Download file")
+        print("5. Exit application")
         
-        user_choice = input("\nSelect option (1-4): ").strip()
+        user_choice = input("\nSelect option (1-5): ").strip()
         
         if user_choice == '1':
             print("Retrieving file directory...")
@@ -197,11 +681,23 @@ def execute_main():
                 print("Filename is required")
                 
         elif user_choice == '4':
+            remote_name = input("Enter filename to download: ").strip()
+            if remote_name:
+                try:
+                    file_size = web_client.download_ranged(remote_name, remote_name)
+                    print(f"Downloaded {remote_name} ({file_size} bytes)")
+                except Exception as download_error:
+                    print(f"Download failed: {str(download_error)} (try again to resume)")
+            else:
+                print("Filename is required")
+                
+        elif user_choice == '5':
+            web_client.close_connection()
             print("Application terminated!")
             break
             
         else:
-            print("Invalid selection. Please choose 1-4.")
+            print("Invalid selection. Please choose 1-5.")
 
 if __name__ == "__main__":
-    execute_main()
\ No newline at end of file
+    sys.exit(execute_bulk(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import sys
+import argparse
+
+from access_log import ACCESS_LOG_FORMATS, ACCESS_LOG_FORMAT, ACCESS_LOG_SAMPLE_RATE
+
+# File environment yang dibaca jika ada (baris KEY=VALUE)
+ENV_FILE = '.env'
+
+DEFAULT_HOST = '172.16.16.101'
+DEFAULT_PORT = 8885
+
+def parse_sites(sites_text):
+    """Mengurai 'PORT=ROOT,PORT=ROOT' menjadi daftar (port, document_root)"""
+    sites = []
+    for site_text in sites_text.split(','):
+        if not site_text.strip():
+            continue
+        port_text, separator, document_root = site_text.partition('=')
+        if not separator or not document_root.strip():
+            raise ValueError(f"Format site harus PORT=ROOT: {site_text}")
+        sites.append((int(port_text), document_root.strip()))
+    return sites
+
+def parse_log_format(format_text):
+    """Memastikan format access log dikenal (text atau json)"""
+    format_text = format_text.strip().lower()
+    if format_text not in ACCESS_LOG_FORMATS:
+        raise ValueError(f"Format access log harus salah satu dari {', '.join(ACCESS_LOG_FORMATS)}: {format_text}")
+    return format_text
+
+def parse_sample_rate(rate_text):
+    """Mengurai porsi sampling access log antara 0 dan 1"""
+    sample_rate = float(rate_text)
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError(f"Sample rate access log harus antara 0 dan 1: {rate_text}")
+    return sample_rate
+
+def parse_names(names_text):
+    """Mengurai daftar nama dipisah koma menjadi tuple"""
+    return tuple(name.strip() for name in names_text.split(',') if name.strip())
+
+# Nama setting, variabel environment, konversi dan keterangan untuk --help
+SETTINGS = [
+    ('host', 'HTTP_SERVER_HOST', str, "alamat bind server / alamat server untuk klien"),
+    ('port', 'HTTP_SERVER_PORT', int, "port server"),
+    ('document_root', 'HTTP_DOCUMENT_ROOT', str, "direktori file yang dilayani"),
+    ('sites', 'HTTP_SITES', parse_sites, "beberapa site sekaligus: PORT=ROOT dipisah koma (menggantikan --port/--document-root)"),
+    ('listen_backlog', 'HTTP_LISTEN_BACKLOG', int, "panjang antrean accept di kernel"),
+    ('workers', 'HTTP_WORKERS', int, "jumlah thread/proses worker"),
+    ('threads', 'HTTP_THREADS', int, "thread per proses worker (pre-fork) atau thread I/O file (async)"),
+    ('max_in_flight', 'HTTP_MAX_IN_FLIGHT', int, "koneksi yang dilayani sekaligus sebelum ditolak 503"),
+    ('retry_after', 'HTTP_RETRY_AFTER', int, "nilai Retry-After (detik) untuk response 503"),
+    ('worker_mode', 'HTTP_WORKER_MODE', str, "mode worker pre-fork: thread atau async"),
+    ('header_timeout', 'HTTP_HEADER_TIMEOUT', float, "batas waktu (detik) menerima seluruh header request"),
+    ('body_timeout', 'HTTP_BODY_TIMEOUT', float, "jeda maksimum (detik) antar potongan body request"),
+    ('idle_timeout', 'HTTP_IDLE_TIMEOUT', float, "batas idle (detik) koneksi keep-alive menunggu request berikutnya"),
+    ('write_timeout', 'HTTP_WRITE_TIMEOUT', float, "jeda maksimum (detik) saat klien tidak membaca response"),
+    ('min_transfer_rate', 'HTTP_MIN_TRANSFER_RATE', float, "laju minimum body request (byte/detik) setelah masa tenggang"),
+    ('rate_grace_period', 'HTTP_RATE_GRACE_PERIOD', float, "masa tenggang (detik) sebelum laju minimum diperiksa"),
+    ('request_rate', 'HTTP_REQUEST_RATE', float, "batas request per detik per IP klien, lebihnya dijawab 429 (0 = tanpa batas)"),
+    ('request_burst', 'HTTP_REQUEST_BURST', float, "jumlah request beruntun yang boleh melewati request_rate (default jatah satu detik)"),
+    ('byte_rate', 'HTTP_BYTE_RATE', float, "batas byte response per detik per IP klien, pengiriman dijeda (0 = tanpa batas)"),
+    ('byte_burst', 'HTTP_BYTE_BURST', float, "byte yang boleh dikirim tanpa jeda sebelum byte_rate berlaku (default jatah satu detik)"),
+    ('access_log_format', 'HTTP_ACCESS_LOG_FORMAT', parse_log_format, "format access log: text atau json"),
+    ('access_log_sample_rate', 'HTTP_ACCESS_LOG_SAMPLE_RATE', parse_sample_rate, "porsi request yang dicatat di access log, 0 sampai 1 (1 = semua)"),
+    ('storage', 'HTTP_STORAGE', str, "penyimpanan upload: plain, atau content (sekali per sha256, nama sebagai hardlink)"),
+    ('handlers', 'HTTP_HANDLERS', parse_names, "modul route tambahan dipisah koma, masing-masing punya register_routes(http_server)"),
+]
+
+# Setting yang relevan untuk klien
+CLIENT_SETTINGS = ('host', 'port')
+
+class ServerConfig:
+    """Konfigurasi hasil gabungan default, file env, environment dan argumen CLI"""
+    def __init__(self, values):
+        for name, value in values.items():
+            setattr(self, name, value)
+        # Tanpa daftar site, satu site dari port dan document root
+        if not self.sites:
+            self.sites = [(self.port, self.document_root)]
+
+    def addresses(self):
+        """Daftar ((host, port), document_root) untuk setiap listener"""
+        return [((self.host, port), document_root) for port, document_root in self.sites]
+
+def default_values(mode):
+    """Nilai bawaan, ukuran pool diturunkan dari jumlah CPU"""
+    cpu_count = os.cpu_count() or 1
+    values = {
+        'host': DEFAULT_HOST,
+        'port': DEFAULT_PORT,
+        'document_root': './',
+        'sites': None,
+        'listen_backlog': 128,
+        'retry_after': 1,
+        'worker_mode': 'thread',
+        'header_timeout': 10,
+        'body_timeout': 30,
+        'idle_timeout': 5,
+        'write_timeout': 30,
+        'min_transfer_rate': 1024,
+        'rate_grace_period': 10,
+        'request_rate': 0,
+        'request_burst': 0,
+        'byte_rate': 0,
+        'byte_burst': 0,
+        'access_log_format': ACCESS_LOG_FORMAT,
+        'access_log_sample_rate': ACCESS_LOG_SAMPLE_RATE,
+        'storage': 'plain',
+        'handlers': (),
+    }
+    if mode == 'process':
+        # Satu proses per core, minimal 4 karena setiap koneksi keep-alive menahan satu proses;
+        # antrean koneksi beberapa kali jumlah proses
+        process_count = max(4, cpu_count)
+        values.update(workers=process_count, threads=None, max_in_flight=process_count * 8)
+    elif mode == 'prefork':
+        values.update(workers=cpu_count, threads=20, max_in_flight=100)
+    elif mode == 'async':
+        # Koneksi async murah, batasnya dijaga di bawah batas file descriptor bawaan (1024)
+        values.update(workers=1, threads=max(32, cpu_count * 4), max_in_flight=512)
+    else:
+        # Thread banyak tertahan di I/O dan koneksi keep-alive, jadi jauh di atas jumlah core
+        thread_count = max(20, cpu_count * 8)
+        values.update(workers=thread_count, threads=None, max_in_flight=thread_count * 5)
+    return values
+
+def read_env_file(path):
+    """Membaca file KEY=VALUE, baris kosong dan komentar (#) dilewati"""
+    env_values = {}
+    try:
+        with open(path) as env_file:
+            for env_line in env_file:
+                env_line = env_line.strip()
+                if not env_line or env_line.startswith('#') or '=' not in env_line:
+                    continue
+                env_key, _, env_value = env_line.partition('=')
+                env_values[env_key.strip()] = env_value.strip().strip('"').strip("'")
+    except FileNotFoundError:
+        pass
+    return env_values
+
+def add_arguments(parser, names=None):
+    """Menambahkan flag CLI untuk setting (semua, atau hanya names) ke parser"""
+    parser.add_argument('--env-file', default=None, help=f"file KEY=VALUE tambahan (default {ENV_FILE} jika ada)")
+    for name, env_name, _, help_text in SETTINGS:
+        if names is not None and name not in names:
+            continue
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, default=None, help=f"{help_text} [{env_name}]")
+
+def served_directories(options, values):
+    """Document root menurut flag CLI, environment atau default (tanpa file env)"""
+    sites_text = getattr(options, 'sites', None) or os.environ.get('HTTP_SITES')
+    if sites_text:
+        try:
+            return [document_root for _, document_root in parse_sites(sites_text)]
+        except ValueError:
+            return []
+    return [getattr(options, 'document_root', None) or os.environ.get('HTTP_DOCUMENT_ROOT') or values['document_root']]
+
+def resolve(options, mode, names=None):
+    """Menggabungkan sumber setting: default < file env < environment < flag CLI"""
+    values = default_values(mode)
+    env_file = getattr(options, 'env_file', None)
+    env_values = read_env_file(env_file or ENV_FILE)
+    if env_file is None and env_values and (names is None or 'document_root' in names):
+        # .env bawaan tidak dibaca dari direktori yang dilayani server, karena klien bisa menulis ke sana
+        env_directory = os.path.realpath(os.path.dirname(os.path.abspath(ENV_FILE)))
+        if any(os.path.realpath(document_root) == env_directory for document_root in served_directories(options, values)):
+            print(f"Peringatan: {ENV_FILE} di document root diabaikan, gunakan --env-file untuk memakainya", file=sys.stderr)
+            env_values = {}
+    for name, env_name, convert, _ in SETTINGS:
+        if names is not None and name not in names:
+            continue
+        raw_value = getattr(options, name, None)
+        if raw_value is None:
+            raw_value = os.environ.get(env_name, env_values.get(env_name))
+        if raw_value is not None:
+            try:
+                values[name] = convert(raw_value)
+            except ValueError as convert_error:
+                raise SystemExit(f"Nilai {name} tidak valid ({raw_value}): {convert_error}")
+    return ServerConfig(values)
+
+def load_config(mode, arguments=None, description=None):
+    """Membaca konfigurasi server untuk mode tertentu, arguments None berarti sys.argv"""
+    parser = argparse.ArgumentParser(description=description)
+    add_arguments(parser)
+    options = parser.parse_args(arguments)
+    return resolve(options, mode)
@@ -1,162 +1,1591 @@
 import sys
 import os.path
+import stat
 import uuid
-from glob import glob
+import socket
+import time
+import math
 from datetime import datetime
+import re
+import tempfile
+import threading
+import queue
+import functools
+from collections import namedtuple, OrderedDict
 import urllib.parse
 import json
+import email.utils
+import html
+import importlib
+import zlib
+import hashlib
+import shutil
+from metrics import metrics_registry
 
-class HttpServer:
+# fcntl tidak tersedia di Windows, indeks store hanya dikunci antar thread
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+# Brotli opsional, tanpa modulnya hanya gzip yang ditawarkan
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+# Batas koneksi persistent (HTTP/1.1 keep-alive)
+KEEP_ALIVE_TIMEOUT = 5
+MAX_KEEP_ALIVE_REQUESTS = 100
+
+# Batas waktu I/O per koneksi (detik) agar klien lambat tidak menahan worker
+HEADER_TIMEOUT = 10
+BODY_TIMEOUT = 30
+WRITE_TIMEOUT = 30
+# Laju minimum body request (byte/detik), diperiksa setelah masa tenggang
+MIN_TRANSFER_RATE = 1024
+RATE_GRACE_PERIOD = 10
+# Body request yang tidak dibaca handler dibuang agar koneksi bisa dipakai lagi
+MAX_DISCARD_BODY_SIZE = 1024 * 1024
+# Body yang dibaca utuh ke memori lewat request.body, lebih dari ini dijawab 413 (iter_body tidak dibatasi)
+MAX_BODY_SIZE = 16 * 1024 * 1024
+# Ukuran potongan body saat pengiriman dibatasi laju byte per klien
+THROTTLE_SEGMENT_SIZE = 64 * 1024
+
+# Cache response file kecil di memori (per proses)
+RESPONSE_CACHE_SIZE = 32 * 1024 * 1024
+RESPONSE_CACHE_MAX_FILE_SIZE = 256 * 1024
+
+# Jumlah baris listing direktori per potongan chunked
+LISTING_CHUNK_ROWS = 256
+
+# Kompresi body untuk tipe teks; file kecil dikompres di memori, file besar ke file sidecar
+CONTENT_CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_MAX_FILE_SIZE = 64 * 1024 * 1024
+# Level kompresi: file statis dikompres sekali (level tinggi), listing dikompres setiap request
+STATIC_COMPRESSION_LEVELS = {'gzip': 9, 'br': 11}
+STREAM_COMPRESSION_LEVELS = {'gzip': 6, 'br': 5}
+# Sidecar file yang lebih besar dari ini memakai level stream agar tidak menahan thread pembuat terlalu lama
+STATIC_COMPRESSION_MAX_SIZE = 4 * 1024 * 1024
+# Direktori tersembunyi di document root untuk varian terkompresi file besar
+COMPRESSED_DIRECTORY = '.compressed'
+# File upload sementara ditulis di sini agar document root hanya berubah saat file selesai dipindahkan
+UPLOAD_TEMP_DIRECTORY = '.uploads'
+
+# Store upload berbasis isi: objek per sha256, catatan digest per nama dan file lock
+OBJECTS_DIRECTORY = '.objects'
+OBJECTS_NAMES_DIRECTORY = 'names'
+OBJECTS_LOCKS_DIRECTORY = 'locks'
+# Jumlah file lock untuk nama dan untuk shard objek; upload berbeda jarang berebut lock yang sama
+STORE_LOCK_SLOTS = 64
+
+SERVER_NAME = 'myserver/1.0'
+CONNECTION_CLOSE = b'Connection: close\r\n\r\n'
+CONNECTION_KEEP_ALIVE = b'Connection: keep-alive\r\n\r\n'
+# Penutup body Transfer-Encoding: chunked
+LAST_CHUNK = b'0\r\n\r\n'
+
+# Awal header (baris status dan Server) per kode status, dibuat sekali
+STATUS_PREFIXES = {}
+
+def status_prefix(kode, message):
+	"""Baris status dan header Server dalam bytes, diambil dari template"""
+	prefix = STATUS_PREFIXES.get((kode, message))
+	if prefix is None:
+		prefix = f"HTTP/1.1 {kode} {message}\r\nServer: {SERVER_NAME}\r\n".encode()
+		STATUS_PREFIXES[(kode, message)] = prefix
+	return prefix
+
+for common_status in ((200, 'OK'), (206, 'Partial Content'), (302, 'Found'), (304, 'Not Modified'), (400, 'Bad Request'), (404, 'Not Found'),
+		(411, 'Length Required'), (413, 'Payload Too Large'), (416, 'Range Not Satisfiable'), (429, 'Too Many Requests'), (431, 'Request Header Fields Too Large'), (500, 'Internal Server Error'), (503, 'Service Unavailable')):
+	status_prefix(*common_status)
+
+class DateHeader:
+	"""Header Date (format HTTP/GMT) yang diformat ulang paling banyak sekali per detik"""
+	def __init__(self):
+		# Detik dan baris header disimpan sebagai satu tuple agar aman dibaca antar thread
+		self.cached = (None, b'')
+
+	def line(self):
+		current_second = int(time.time())
+		cached_second, cached_line = self.cached
+		if cached_second != current_second:
+			cached_line = f"Date: {email.utils.formatdate(current_second, usegmt=True)}\r\n".encode()
+			self.cached = (current_second, cached_line)
+		return cached_line
+
+date_header = DateHeader()
+
+def negotiate_encoding(accept_encoding):
+	"""Memilih Content-Encoding dari header Accept-Encoding, None berarti tanpa kompresi"""
+	if not accept_encoding:
+		return None
+	qualities = {}
+	for coding_item in accept_encoding.split(','):
+		coding, _, parameters = coding_item.partition(';')
+		quality = 1.0
+		parameters = parameters.strip().lower()
+		if parameters.startswith('q='):
+			try:
+				quality = float(parameters[2:])
+			except ValueError:
+				quality = 0.0
+		qualities[coding.strip().lower()] = quality
+
+	chosen_coding = None
+	chosen_quality = 0.0
+	# Urutan CONTENT_CODINGS menjadi pilihan saat nilai q sama
+	for coding in CONTENT_CODINGS:
+		quality = qualities.get(coding, qualities.get('*', 0.0))
+		if quality > chosen_quality:
+			chosen_coding, chosen_quality = coding, quality
+	return chosen_coding
+
+def is_compressible(mime_type):
+	"""True untuk tipe teks yang layak dikompres"""
+	return mime_type.startswith(COMPRESSIBLE_TYPES)
+
+class BodyCompressor:
+	"""Kompresi bertahap gzip atau brotli dengan antarmuka yang sama"""
+	def __init__(self, encoding, level):
+		self.encoding = encoding
+		if encoding == 'br':
+			self.compressor = brotli.Compressor(quality=level)
+		else:
+			# wbits 31: format gzip lengkap dengan header dan CRC
+			self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+	def compress(self, data, flush=False):
+		"""Mengompres potongan data; flush=True mengeluarkan output yang masih tertahan"""
+		if self.encoding == 'br':
+			output = self.compressor.process(data)
+			return output + self.compressor.flush() if flush else output
+		output = self.compressor.compress(data)
+		return output + self.compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+	def finish(self):
+		"""Sisa output dan penutup stream"""
+		if self.encoding == 'br':
+			return self.compressor.finish()
+		return self.compressor.flush()
+
+def compress_bytes(data, encoding, level):
+	"""Mengompres body lengkap sekaligus"""
+	body_compressor = BodyCompressor(encoding, level)
+	return body_compressor.compress(data) + body_compressor.finish()
+
+def compress_chunks(chunks, encoding):
+	"""Mengompres body bertahap, setiap potongan di-flush agar tetap terkirim per potongan"""
+	body_compressor = BodyCompressor(encoding, STREAM_COMPRESSION_LEVELS[encoding])
+	for chunk in chunks:
+		yield body_compressor.compress(chunk, flush=True)
+	yield body_compressor.finish()
+
+def chunk_buffers(chunk):
+	"""Membingkai satu potongan body untuk Transfer-Encoding: chunked"""
+	return [f"{len(chunk):x}\r\n".encode(), chunk, b'\r\n']
+
+def send_buffers(client_socket, buffers):
+	"""Mengirim beberapa buffer dengan satu sendmsg (writev) tanpa menyambungnya"""
+	buffers = [memoryview(buffer).cast('B') for buffer in buffers if len(buffer)]
+	if not hasattr(client_socket, 'sendmsg'):
+		client_socket.sendall(b''.join(buffers))
+		return
+
+	while buffers:
+		sent_count = client_socket.sendmsg(buffers)
+		# Membuang bagian yang sudah terkirim, sendmsg bisa mengirim sebagian
+		while sent_count:
+			if sent_count >= len(buffers[0]):
+				sent_count -= len(buffers[0])
+				buffers.pop(0)
+			else:
+				buffers[0] = buffers[0][sent_count:]
+				sent_count = 0
+
+class RequestError(Exception):
+	"""Request tidak valid yang harus dijawab dengan status error tertentu"""
+	def __init__(self, kode, message):
+		super().__init__(f"{kode} {message}")
+		self.kode = kode
+		self.message = message
+
+class IoDeadlines(namedtuple('IoDeadlines', ['header_timeout', 'body_timeout', 'idle_timeout', 'write_timeout', 'min_transfer_rate', 'rate_grace_period'],
+                               defaults=(HEADER_TIMEOUT, BODY_TIMEOUT, KEEP_ALIVE_TIMEOUT, WRITE_TIMEOUT, MIN_TRANSFER_RATE, RATE_GRACE_PERIOD))):
+	"""Batas waktu I/O per koneksi (detik) dan laju minimum body (byte/detik)"""
+	@classmethod
+	def from_config(cls, server_config):
+		"""Mengambil nilai dari konfigurasi server dengan nama setting yang sama"""
+		return cls(*(getattr(server_config, field_name) for field_name in cls._fields))
+
+DEFAULT_DEADLINES = IoDeadlines()
+
+class DeadlineExceeded(TimeoutError):
+	"""Klien tidak membuat kemajuan dalam batas waktu; phase: header, body, idle, write atau rate"""
+	def __init__(self, phase):
+		super().__init__(f"batas waktu {phase} terlewati")
+		self.phase = phase
+
+class TransferProgress:
+	"""Memantau laju penerimaan body, klien yang terlalu lambat diputus"""
+	def __init__(self, deadlines):
+		self.deadlines = deadlines
+		self.started = time.monotonic()
+		self.received = 0
+
+	def add(self, received_count):
+		self.received += received_count
+		elapsed = time.monotonic() - self.started
+		if elapsed > self.deadlines.rate_grace_period and self.received < elapsed * self.deadlines.min_transfer_rate:
+			raise DeadlineExceeded('rate')
+
+class RequestReader:
+	"""Membaca request HTTP dari socket secara bertahap dalam bentuk bytes"""
+	def __init__(self, client_socket, chunk_size=65536, max_header_size=65536, deadlines=DEFAULT_DEADLINES):
+		self.client_socket = client_socket
+		self.chunk_size = chunk_size
+		self.max_header_size = max_header_size
+		self.deadlines = deadlines
+		# Sisa data yang sudah diterima tetapi belum dikonsumsi
+		self.pending = bytearray()
+		self.body_progress = None
+
+	def read_head(self, idle_timeout=None):
+		"""Membaca blok header sampai baris kosong, None jika koneksi ditutup"""
+		# Tanpa idle_timeout seluruh header dibatasi header_timeout sejak awal, dengan idle_timeout
+		# byte pertama boleh ditunggu selama itu lalu sisa header dibatasi header_timeout
+		header_deadline = None if idle_timeout is not None else time.monotonic() + self.deadlines.header_timeout
+		search_start = 0
+		while True:
+			header_end = self.pending.find(b'\r\n\r\n', search_start)
+			if header_end != -1:
+				head = bytes(self.pending[:header_end])
+				del self.pending[:header_end + 4]
+				return head
+
+			if len(self.pending) > self.max_header_size:
+				raise RequestError(431, 'Request Header Fields Too Large')
+
+			if header_deadline is None and self.pending:
+				header_deadline = time.monotonic() + self.deadlines.header_timeout
+			if header_deadline is None:
+				wait_phase = 'idle'
+				self.client_socket.settimeout(idle_timeout)
+			else:
+				# Header yang dikirim sedikit demi sedikit tetap dibatasi waktu totalnya
+				wait_phase = 'header'
+				remaining_time = header_deadline - time.monotonic()
+				if remaining_time <= 0:
+					raise DeadlineExceeded('header')
+				self.client_socket.settimeout(remaining_time)
+
+			# Pencarian berikutnya cukup dimulai dari ekor buffer
+			search_start = max(0, len(self.pending) - 3)
+			try:
+				received_bytes = self.client_socket.recv(self.chunk_size)
+			except socket.timeout:
+				raise DeadlineExceeded(wait_phase)
+			if not received_bytes:
+				# Klien menutup sisi kirim tanpa baris kosong, anggap header selesai
+				head = bytes(self.pending).rstrip(b'\r\n')
+				self.pending.clear()
+				return head or None
+			self.pending += received_bytes
+
+	def read_body(self, length):
+		"""Membaca body sepanjang length langsung ke buffer yang sudah dialokasikan"""
+		body = bytearray(length)
+		body_view = memoryview(body)
+
+		# Memakai data yang sudah ikut terbaca bersama header
+		filled = min(len(self.pending), length)
+		body_view[:filled] = self.pending[:filled]
+		del self.pending[:filled]
+
+		while filled < length:
+			received_count = self.receive_body(self.client_socket.recv_into, body_view[filled:], min(length - filled, self.chunk_size))
+			if received_count == 0:
+				raise ConnectionError(f"Koneksi terputus setelah {filled} dari {length} byte body")
+			filled += received_count
+		return body
+
+	def read_chunk(self, limit):
+		"""Mengambil potongan body berikutnya sebanyak maksimal limit byte"""
+		if self.pending:
+			chunk = bytes(self.pending[:limit])
+			del self.pending[:limit]
+			return chunk
+
+		chunk = self.receive_body(self.client_socket.recv, min(limit, self.chunk_size))
+		if not chunk:
+			raise ConnectionError("Koneksi terputus sebelum body selesai diterima")
+		return chunk
+
+	def receive_body(self, receive, *receive_arguments):
+		"""Satu operasi recv body dengan batas jeda body_timeout dan pemeriksaan laju minimum"""
+		self.client_socket.settimeout(self.deadlines.body_timeout)
+		try:
+			received = receive(*receive_arguments)
+		except socket.timeout:
+			raise DeadlineExceeded('body')
+		self.body_progress.add(received if isinstance(received, int) else len(received))
+		return received
+
+	def read_request(self, idle_timeout=None):
+		"""Membaca header satu request sebagai HttpRequest, None jika koneksi ditutup"""
+		head = self.read_head(idle_timeout)
+		if head is None:
+			return None
+		# Body belum dibaca: handler memilih membaca utuh atau per potongan
+		request = HttpRequest.parse(head)
+		request.body_reader = self
+		request.body_remaining = request.content_length()
+		self.body_progress = TransferProgress(self.deadlines)
+		return request
+
+class HttpRequest:
+	"""Request HTTP yang sudah diurai: method, path, header dan body"""
+	def __init__(self, method, path, version='HTTP/1.0', headers=None, body=b''):
+		self.method = method
+		# Query string dipisahkan dari path, diurai sekali saat query pertama diakses
+		self.path, _, self.query_string = path.partition('?')
+		self._query = None
+		# Sisa path setelah prefix route yang cocok, diisi oleh router
+		self.route_tail = ''
+		self.version = version
+		# Nama header disimpan dalam huruf kecil
+		self.headers = headers if headers is not None else {}
+		self._body = memoryview(body)
+		# Jika body_reader diisi, body masih berada di socket
+		self.body_reader = None
+		self.body_remaining = 0
+		# Ukuran blok header yang diterima, termasuk baris kosong penutup
+		self.head_size = 0
+
+	@classmethod
+	def parse(cls, head, body=b''):
+		"""Mengurai blok header (bytes) menjadi HttpRequest"""
+		head_lines = head.split(b'\r\n')
+		line_parts = head_lines[0].decode('utf-8', errors='replace').split(' ')
+		if len(line_parts) < 2:
+			raise RequestError(400, 'Bad Request')
+
+		method = line_parts[0].upper().strip()
+		path = line_parts[1].strip()
+		version = line_parts[2].strip() if len(line_parts) > 2 else 'HTTP/1.0'
+
+		headers = {}
+		for header_line in head_lines[1:]:
+			header_name, separator, header_value = header_line.partition(b':')
+			if separator:
+				headers[header_name.strip().lower().decode('latin-1')] = header_value.strip().decode('latin-1')
+		request = cls(method, path, version, headers, body)
+		request.head_size = len(head) + 4
+		return request
+
+	@classmethod
+	def from_raw(cls, data):
+		"""Mengurai request mentah (str atau bytes) yang sudah lengkap beserta body"""
+		if isinstance(data, str):
+			data = data.encode('utf-8')
+		head, _, body = data.partition(b'\r\n\r\n')
+		return cls.parse(head, body)
+
+	@property
+	def query(self):
+		"""Parameter query string sebagai dict"""
+		if self._query is None:
+			self._query = dict(urllib.parse.parse_qsl(self.query_string))
+		return self._query
+
+	@property
+	def body(self):
+		"""Body lengkap sebagai memoryview, dibaca dari socket saat pertama diakses"""
+		if self.body_reader is not None:
+			if self.body_remaining != self.content_length():
+				raise RuntimeError("Body sudah dibaca sebagian secara streaming")
+			# Ukuran buffer berasal dari Content-Length klien, jadi dibatasi sebelum dialokasikan
+			if self.body_remaining > MAX_BODY_SIZE:
+				raise RequestError(413, 'Payload Too Large')
+			self._body = memoryview(self.body_reader.read_body(self.body_remaining))
+			self.body_reader = None
+			self.body_remaining = 0
+		return self._body
+
+	def iter_body(self, chunk_size=65536):
+		"""Menghasilkan body per potongan begitu diterima tanpa menampung semuanya"""
+		if self.body_reader is None:
+			if len(self._body):
+				yield self._body
+			return
+
+		while self.body_remaining > 0:
+			chunk = self.body_reader.read_chunk(min(chunk_size, self.body_remaining))
+			self.body_remaining -= len(chunk)
+			yield chunk
+		self.body_reader = None
+		self._body = memoryview(b'')
+
+	def discard_body(self, limit=MAX_DISCARD_BODY_SIZE):
+		"""Membuang sisa body yang belum dibaca, False jika terlalu besar untuk dibuang"""
+		if self.body_remaining > limit:
+			return False
+		for _ in self.iter_body():
+			pass
+		return True
+
+	def wants_keep_alive(self):
+		"""Menentukan apakah klien ingin koneksi tetap terbuka setelah response"""
+		connection_options = [option.strip().lower() for option in self.headers.get('connection', '').split(',')]
+		if self.version == 'HTTP/1.1':
+			return 'close' not in connection_options
+		return 'keep-alive' in connection_options
+
+	def header(self, name, default=None):
+		"""Mengambil nilai header tanpa memperhatikan huruf besar/kecil"""
+		return self.headers.get(name.lower(), default)
+
+	def content_length(self):
+		"""Mengambil nilai Content-Length, 0 jika tidak ada"""
+		# Body chunked tidak didekode; tanpa penolakan isinya terbaca sebagai request berikutnya
+		if 'transfer-encoding' in self.headers:
+			raise RequestError(411, 'Length Required')
+		length_value = self.headers.get('content-length')
+		if length_value is None:
+			return 0
+		try:
+			length = int(length_value)
+		except ValueError:
+			raise RequestError(400, 'Bad Request')
+		if length < 0:
+			raise RequestError(400, 'Bad Request')
+		return length
+
+class HttpResponse:
+	"""Response HTTP: potongan header ditambah body berupa bytes, potongan file atau stream"""
+	def __init__(self, kode, message, header_buffers, body=b'', file=None, offset=0, count=0, chunks=None, chunked=False):
+		self.kode = kode
+		self.message = message
+		# Header disimpan sebagai daftar buffer dan dikirim dengan writev tanpa disambung
+		self.header_buffers = header_buffers
+		self.body = body
+		# Body dari file dikirim dengan sendfile tanpa dibaca ke memori
+		self.file = file
+		self.offset = offset
+		self.count = count
+		# Body yang dibuat bertahap: dibingkai chunked, atau dikirim apa adanya sampai koneksi ditutup
+		self.chunks = chunks
+		self.chunked = chunked
+		self.close_connection = chunks is not None and not chunked
+		# Jumlah byte yang terkirim, untuk access log
+		self.sent_bytes = 0
+
+	def header_size(self):
+		return sum(len(header_buffer) for header_buffer in self.header_buffers)
+
+	def send(self, client_socket, keep_alive=False, throttle=None):
+		"""Mengirim response ke socket, body file di-stream dengan sendfile"""
+		# throttle(byte_count), jika ada, dipanggil sebelum setiap potongan dan menjeda sesuai batas laju klien
+		# Header Connection ditentukan oleh koneksi, bukan oleh handler
+		connection_line = CONNECTION_KEEP_ALIVE if keep_alive and not self.close_connection else CONNECTION_CLOSE
+		try:
+			if self.chunks is not None:
+				send_buffers(client_socket, [*self.header_buffers, connection_line])
+				self.sent_bytes = self.header_size() + len(connection_line)
+				# Setiap potongan dikirim begitu dibuat, klien tidak perlu menunggu seluruh body
+				for chunk in self.chunks:
+					if not chunk:
+						continue
+					chunk_data = chunk_buffers(chunk) if self.chunked else [chunk]
+					if throttle is not None:
+						throttle(sum(len(chunk_part) for chunk_part in chunk_data))
+					send_buffers(client_socket, chunk_data)
+					self.sent_bytes += sum(len(chunk_part) for chunk_part in chunk_data)
+				if self.chunked:
+					client_socket.sendall(LAST_CHUNK)
+					self.sent_bytes += len(LAST_CHUNK)
+			elif self.file is not None:
+				send_buffers(client_socket, [*self.header_buffers, connection_line])
+				self.sent_bytes = self.header_size() + len(connection_line)
+				if self.count and throttle is not None:
+					# Dikirim per potongan agar jeda tersebar sepanjang transfer, bukan sekaligus di awal
+					segment_offset = self.offset
+					segment_end = self.offset + self.count
+					while segment_offset < segment_end:
+						segment_size = min(THROTTLE_SEGMENT_SIZE, segment_end - segment_offset)
+						throttle(segment_size)
+						segment_sent = client_socket.sendfile(self.file, segment_offset, segment_size)
+						if not segment_sent:
+							break
+						segment_offset += segment_sent
+						self.sent_bytes += segment_sent
+				elif self.count:
+					self.sent_bytes += client_socket.sendfile(self.file, self.offset, self.count)
+			else:
+				if throttle is not None:
+					throttle(len(self.body))
+				send_buffers(client_socket, [*self.header_buffers, connection_line, self.body])
+				self.sent_bytes = self.header_size() + len(connection_line) + len(self.body)
+		finally:
+			self.close()
+
+	def close(self):
+		"""Menutup file body jika ada"""
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+	def __bytes__(self):
+		# Dipakai untuk pengujian: menggabungkan header dan body ke memori
+		if self.chunks is not None:
+			body_parts = []
+			for chunk in self.chunks:
+				if chunk:
+					body_parts.extend(chunk_buffers(chunk) if self.chunked else [chunk])
+			if self.chunked:
+				body_parts.append(LAST_CHUNK)
+			return b''.join(self.header_buffers) + CONNECTION_CLOSE + b''.join(body_parts)
+		if self.file is not None:
+			self.file.seek(self.offset)
+			body = self.file.read(self.count)
+			self.close()
+			return b''.join(self.header_buffers) + CONNECTION_CLOSE + body
+		return b''.join(self.header_buffers) + CONNECTION_CLOSE + bytes(self.body)
+
+def current_umask():
+	"""umask proses; os.umask hanya bisa dibaca dengan mengubahnya sementara"""
+	process_umask = os.umask(0)
+	os.umask(process_umask)
+	return process_umask
+
+# mkstemp membuat file 0600, upload diberi mode seperti open() biasa agar tetap bisa dibaca pengguna lain
+UPLOAD_FILE_MODE = 0o666 & ~current_umask()
+
+class UploadStore:
+	"""Upload disimpan langsung dengan namanya di document root"""
+	# Store ini tidak membutuhkan digest isi file
+	hashes_content = False
+
+	def __init__(self, directory):
+		self.directory = directory
+		# Direktori file sementara (.uploads) baru dibuat saat upload pertama, bukan saat server dibuat
+
+	def commit(self, temp_path, name, digest):
+		"""Memindahkan file sementara yang sudah lengkap ke namanya secara atomik"""
+		os.replace(temp_path, os.path.join(self.directory, name))
+
+	def remove(self, name):
+		"""Menghapus file berdasarkan nama"""
+		os.remove(os.path.join(self.directory, name))
+
+class ContentAddressedStore(UploadStore):
+	"""Isi upload disimpan sekali per sha256 di .objects, nama file adalah hardlink ke objeknya"""
+	hashes_content = True
+
+	def __init__(self, directory):
+		super().__init__(directory)
+		self.objects_directory = os.path.join(directory, OBJECTS_DIRECTORY)
+		# Digest tiap nama disimpan di file kecil tersendiri, diperbarui tanpa menulis ulang catatan nama lain
+		self.names_directory = os.path.join(self.objects_directory, OBJECTS_NAMES_DIRECTORY)
+		self.locks_directory = os.path.join(self.objects_directory, OBJECTS_LOCKS_DIRECTORY)
+		# Tanpa fcntl (Windows) lock hanya berlaku antar thread
+		self.thread_locks = {}
+		os.makedirs(self.names_directory, exist_ok=True)
+		os.makedirs(self.locks_directory, exist_ok=True)
+
+	def object_path(self, digest):
+		return os.path.join(self.objects_directory, digest[:2], digest[2:])
+
+	def name_record_path(self, name):
+		return os.path.join(self.names_directory, name)
+
+	def acquire(self, kind, key):
+		"""Mengunci satu nama ('name') atau satu shard objek ('object') antar thread dan proses"""
+		slot = zlib.crc32(key.encode()) % STORE_LOCK_SLOTS
+		if fcntl is None:
+			thread_lock = self.thread_locks.setdefault((kind, slot), threading.Lock())
+			thread_lock.acquire()
+			return thread_lock
+		# flock berlaku per file yang dibuka, jadi thread dalam satu proses juga saling menunggu
+		lock_file = open(os.path.join(self.locks_directory, f'{kind}-{slot}.lock'), 'a')
+		fcntl.flock(lock_file, fcntl.LOCK_EX)
+		return lock_file
+
+	def release_lock(self, lock):
+		if fcntl is None:
+			lock.release()
+		else:
+			# Menutup file sekaligus melepas flock
+			lock.close()
+
+	def read_name_digest(self, name):
+		"""Digest objek yang ditautkan nama, None jika tidak tercatat"""
+		try:
+			with open(self.name_record_path(name)) as record_file:
+				return record_file.read().strip() or None
+		except FileNotFoundError:
+			return None
+
+	def write_name_digest(self, name, digest):
+		temp_fd, temp_path = tempfile.mkstemp(prefix='.name-', dir=self.names_directory)
+		with os.fdopen(temp_fd, 'w') as record_file:
+			record_file.write(digest)
+		os.replace(temp_path, self.name_record_path(name))
+
+	def release(self, digest):
+		"""Menghapus objek jika tidak ada lagi nama yang menautkannya (st_nlink tinggal 1)"""
+		object_path = self.object_path(digest)
+		object_lock = self.acquire('object', digest[:2])
+		try:
+			# Nama hasil salinan (tanpa hardlink) tidak bergantung pada objek, jadi objek boleh ikut dihapus
+			if os.stat(object_path).st_nlink > 1:
+				return
+			os.remove(object_path)
+			# Direktori shard ikut dihapus jika sudah kosong
+			os.rmdir(os.path.dirname(object_path))
+		except OSError:
+			pass
+		finally:
+			self.release_lock(object_lock)
+
+	def commit(self, temp_path, name, digest):
+		"""Menyimpan objek jika isinya belum ada, lalu menautkan nama ke objek tersebut"""
+		object_path = self.object_path(digest)
+		name_path = os.path.join(self.directory, name)
+		name_lock = self.acquire('name', name)
+		try:
+			# Shard yang sama dikunci agar objek tidak dihapus release() di antara pemeriksaan dan penautan
+			object_lock = self.acquire('object', digest[:2])
+			try:
+				if os.path.exists(object_path):
+					# Isi yang sama sudah tersimpan, salinan baru dibuang
+					os.remove(temp_path)
+				else:
+					os.makedirs(os.path.dirname(object_path), exist_ok=True)
+					os.replace(temp_path, object_path)
+
+				# Nama lama (jika ada) diganti secara atomik lewat tautan sementara
+				link_path = os.path.join(self.directory, f'.link-{uuid.uuid4().hex}')
+				try:
+					os.link(object_path, link_path)
+				except OSError:
+					# File system tanpa dukungan hardlink, nama berisi salinan objek
+					shutil.copyfile(object_path, link_path)
+				os.replace(link_path, name_path)
+			finally:
+				self.release_lock(object_lock)
+
+			previous_digest = self.read_name_digest(name)
+			self.write_name_digest(name, digest)
+		finally:
+			self.release_lock(name_lock)
+		if previous_digest is not None and previous_digest != digest:
+			self.release(previous_digest)
+
+	def remove(self, name):
+		"""Menghapus nama; objeknya ikut dihapus saat tautan terakhir hilang"""
+		name_lock = self.acquire('name', name)
+		try:
+			os.remove(os.path.join(self.directory, name))
+			digest = self.read_name_digest(name)
+			try:
+				os.remove(self.name_record_path(name))
+			except FileNotFoundError:
+				pass
+		finally:
+			self.release_lock(name_lock)
+		if digest is not None:
+			self.release(digest)
+
+# Backend store upload yang bisa dipilih lewat konfigurasi
+UPLOAD_STORES = {'plain': UploadStore, 'content': ContentAddressedStore}
+
+def create_upload_store(directory, storage='plain'):
+	"""Membuat store upload sesuai nama backend"""
+	if storage not in UPLOAD_STORES:
+		raise ValueError(f"Backend storage tidak dikenal: {storage} (pilih {', '.join(UPLOAD_STORES)})")
+	return UPLOAD_STORES[storage](directory)
+
+class MultipartParser:
+	"""Parser multipart/form-data bertahap yang menulis bagian file langsung ke disk"""
+	def __init__(self, boundary, upload_store, directory_index=None, max_part_header_size=16384):
+		self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+		self.upload_store = upload_store
+		# Indeks diperbarui langsung saat file disimpan, tanpa pemindaian ulang direktori
+		self.directory_index = directory_index
+		self.directory = os.path.join(upload_store.directory, UPLOAD_TEMP_DIRECTORY)
+		self.max_part_header_size = max_part_header_size
+		# Body diawali boundary tanpa CRLF, ditambahkan agar semua delimiter seragam
+		self.buffer = bytearray(b'\r\n')
+		self.state = 'preamble'
+		self.part_file = None
+		self.part_name = None
+		self.temp_path = None
+		# Digest dihitung sambil data ditulis, tanpa membaca ulang file
+		self.part_hash = None
+		self.saved_files = []
+
+	def feed(self, chunk):
+		"""Memproses potongan body berikutnya"""
+		self.buffer += chunk
+		while True:
+			if self.state in ('preamble', 'data'):
+				delimiter_pos = self.buffer.find(self.delimiter)
+				if delimiter_pos == -1:
+					# Menyisakan ekor yang mungkin merupakan awal delimiter di potongan berikutnya
+					flush_size = len(self.buffer) - (len(self.delimiter) - 1)
+					if flush_size > 0:
+						if self.part_file is not None:
+							self.write_part(memoryview(self.buffer)[:flush_size])
+						del self.buffer[:flush_size]
+					return
+
+				if self.part_file is not None:
+					self.write_part(memoryview(self.buffer)[:delimiter_pos])
+				if self.state == 'data':
+					self.finish_part()
+				del self.buffer[:delimiter_pos + len(self.delimiter)]
+				self.state = 'delimiter'
+
+			if self.state == 'delimiter':
+				if len(self.buffer) < 2:
+					return
+				if self.buffer[:2] == b'--':
+					# Delimiter penutup, sisa data (epilog) diabaikan
+					self.state = 'done'
+				else:
+					self.state = 'headers'
+
+			if self.state == 'headers':
+				header_end = self.buffer.find(b'\r\n\r\n')
+				if header_end == -1:
+					if len(self.buffer) > self.max_part_header_size:
+						raise RequestError(400, 'Bad Request')
+					return
+				part_header = bytes(self.buffer[2:header_end])
+				del self.buffer[:header_end + 4]
+				self.start_part(part_header)
+				self.state = 'data'
+
+			if self.state == 'done':
+				self.buffer.clear()
+				return
+
+	def write_part(self, data):
+		"""Menulis data bagian file dan memperbarui digest-nya"""
+		self.part_file.write(data)
+		if self.part_hash is not None:
+			self.part_hash.update(data)
+
+	def start_part(self, part_header):
+		"""Menyiapkan file sementara jika bagian ini berisi file"""
+		file_name = None
+		for header_line in part_header.split(b'\r\n'):
+			if header_line.lower().startswith(b'content-disposition'):
+				name_match = re.search(r'filename="([^"]*)"|filename=([^;\s]+)', header_line.decode('utf-8', errors='replace'))
+				if name_match:
+					# Hanya nama file yang dipakai agar tidak keluar dari direktori
+					file_name = os.path.basename(name_match.group(1) or name_match.group(2))
+				break
+
+		if not file_name:
+			return
+		# Nama berawalan titik disembunyikan indeks direktori dan bisa menimpa file seperti .env, jadi ditolak
+		if file_name.startswith('.'):
+			raise RequestError(400, 'Bad Request')
+		os.makedirs(self.directory, exist_ok=True)
+		temp_fd, self.temp_path = tempfile.mkstemp(prefix='.upload-', suffix='.part', dir=self.directory)
+		if hasattr(os, 'fchmod'):
+			os.fchmod(temp_fd, UPLOAD_FILE_MODE)
+		self.part_file = os.fdopen(temp_fd, 'wb')
+		self.part_name = file_name
+		self.part_hash = hashlib.sha256() if self.upload_store.hashes_content else None
+
+	def finish_part(self):
+		"""Menutup bagian file yang selesai dan memindahkannya secara atomik"""
+		if self.part_file is None:
+			return
+		self.part_file.close()
+		digest = self.part_hash.hexdigest() if self.part_hash is not None else None
+		commit_part = functools.partial(self.upload_store.commit, self.temp_path, self.part_name, digest)
+		if self.directory_index is not None:
+			self.directory_index.apply_change(self.part_name, commit_part)
+		else:
+			commit_part()
+		self.saved_files.append(self.part_name)
+		self.part_file = None
+		self.part_name = None
+		self.temp_path = None
+
+	def close(self):
+		"""Memastikan delimiter penutup sudah diterima"""
+		if self.state != 'done':
+			self.abort()
+			raise RequestError(400, 'Bad Request')
+
+	def abort(self):
+		"""Membuang file sementara dari bagian yang belum selesai"""
+		if self.part_file is not None:
+			self.part_file.close()
+			os.remove(self.temp_path)
+			self.part_file = None
+			self.temp_path = None
+
+class FileUpload:
+	"""Upload multipart yang diberi body per potongan, dipakai handler sinkron maupun event loop async"""
+	def __init__(self, http_server, request):
+		self.http_server = http_server
+		self.multipart_parser = None
+		# Response diisi begitu upload gagal, potongan body berikutnya tidak diproses lagi
+		self.response = None
+
+		# Mencari header Content-Type untuk mendapatkan boundary
+		content_type_line = request.header('content-type')
+		if not content_type_line or 'multipart/form-data' not in content_type_line:
+			self.response = http_server.response(400, 'Bad Request', 'Invalid content type for file upload', {})
+			return
+
+		# Ekstrak boundary dari header
+		boundary_value = None
+		if 'boundary=' in content_type_line:
+			boundary_value = content_type_line.split('boundary=')[1].split(';')[0].strip().strip('"')
+		if not boundary_value:
+			self.response = http_server.response(400, 'Bad Request', 'Missing boundary in multipart data', {})
+			return
+
+		# Body diurai per potongan dan file langsung ditulis ke disk
+		try:
+			self.multipart_parser = MultipartParser(boundary_value, http_server.upload_store, http_server.directory_index)
+		except ValueError:
+			# Misalnya boundary dengan karakter di luar latin-1
+			self.response = http_server.response(400, 'Bad Request', 'Invalid boundary in multipart data', {})
+
+	def feed(self, chunk):
+		"""Mengurai dan menulis satu potongan body (I/O disk, jalankan di luar event loop)"""
+		if self.response is not None:
+			return
+		try:
+			self.multipart_parser.feed(chunk)
+		except (RequestError, ValueError):
+			self.fail(400, 'Bad Request', 'Malformed multipart data or invalid filename')
+		except Exception as upload_error:
+			# Misalnya disk penuh saat menulis atau menyimpan file
+			self.fail(500, 'Internal Server Error', f'Upload error: {str(upload_error)}')
+
+	def fail(self, kode, message, content):
+		"""Menyimpan response gagal dan membuang file sementara"""
+		self.response = self.http_server.response(kode, message, content, {})
+		self.abort()
+
+	def finish(self):
+		"""Dipanggil setelah body habis, mengembalikan response upload (termasuk response error)"""
+		if self.response is not None:
+			return self.response
+		try:
+			return self.finish_upload()
+		except (RequestError, ValueError):
+			self.fail(400, 'Bad Request', 'Malformed multipart data or invalid filename')
+		except Exception as upload_error:
+			self.fail(500, 'Internal Server Error', f'Upload error: {str(upload_error)}')
+		return self.response
+
+	def finish_upload(self):
+		"""Memastikan delimiter penutup diterima lalu membuat response sukses"""
+		self.multipart_parser.close()
+
+		saved_files = self.multipart_parser.saved_files
+		if not saved_files:
+			return self.http_server.response(400, 'Bad Request', 'No file found in upload', {})
+
+		for saved_file in saved_files:
+			self.http_server.response_cache.invalidate(saved_file)
+			self.http_server.compressed_variants.invalidate(saved_file)
+
+		# Membuat response HTML
+		success_html = f"""
+		<!DOCTYPE html>
+		<html>
+		<body>
+			<h1>Upload Successful</h1>
+			<p>Files uploaded: {', '.join(saved_files)}</p>
+			<a href="/files">Back to file list</a>
+		</body>
+		</html>
+		"""
+
+		response_headers = {'Content-Type': 'text/html'}
+		return self.http_server.response(200, 'OK', success_html, response_headers)
+
+	def abort(self):
+		"""Membuang file sementara dari bagian yang belum selesai"""
+		if self.multipart_parser is not None:
+			self.multipart_parser.abort()
+
+# Data satu file dalam indeks direktori
+IndexEntry = namedtuple('IndexEntry', ['name', 'size', 'mtime', 'mime_type'])
+
+class DirectoryIndex:
+	"""Indeks file dalam direktori dengan lookup O(1) berdasarkan nama"""
+	def __init__(self, directory, types):
+		self.directory = directory
+		self.types = types
+		self.entries = {}
+		# mtime direktori saat terakhir dipindai, berubah setiap ada file dibuat/dihapus
+		self.directory_mtime = None
+		self.scan_lock = threading.Lock()
+		# Naik setiap isi indeks berubah, dipakai untuk cache hasil pengurutan
+		self.version = 0
+		self.sorted_cache = {}
+
+	def mime_type(self, name):
+		"""Menentukan content type berdasarkan ekstensi file"""
+		return self.types.get(os.path.splitext(name)[1], 'application/octet-stream')
+
+	def make_entry(self, name, stat_result):
+		return IndexEntry(name, stat_result.st_size, stat_result.st_mtime, self.mime_type(name))
+
+	def refresh(self):
+		"""Memindai ulang direktori hanya jika mtime direktori berubah"""
+		directory_mtime = os.stat(self.directory).st_mtime_ns
+		if directory_mtime == self.directory_mtime:
+			return
+
+		# Selama thread lain memindai, entri lama tetap dipakai; hanya pemindaian pertama yang ditunggu
+		if not self.scan_lock.acquire(blocking=self.directory_mtime is None):
+			return
+		try:
+			if directory_mtime == self.directory_mtime:
+				return
+			entries = {}
+			with os.scandir(self.directory) as directory_entries:
+				for directory_entry in directory_entries:
+					# File tersembunyi (termasuk file upload sementara) tidak ditampilkan
+					if directory_entry.name.startswith('.'):
+						continue
+					try:
+						if directory_entry.is_file():
+							entries[directory_entry.name] = self.make_entry(directory_entry.name, directory_entry.stat())
+					except OSError:
+						continue
+			self.entries = entries
+			self.directory_mtime = directory_mtime
+			self.version += 1
+		finally:
+			self.scan_lock.release()
+
+	def apply_change(self, name, change):
+		"""Menjalankan perubahan satu file oleh server (simpan/hapus) lalu langsung memperbarui entri file itu"""
+		try:
+			return change()
+		finally:
+			# mtime direktori sengaja tidak dicatat: worker lain bisa saja mengubah direktori pada saat yang sama,
+			# jadi refresh berikutnya tetap memindai ulang; selama itu pembaca lain memakai entri yang sudah diperbarui
+			self.update(name)
+
+	def lookup(self, name):
+		"""Mencari file berdasarkan nama, None jika tidak ada"""
+		self.refresh()
+		index_entry = self.entries.get(name)
+		if index_entry is None:
+			# Resolusi mtime bisa melewatkan perubahan beruntun, pastikan dengan stat
+			index_entry = self.update(name)
+		return index_entry
+
+	def update(self, name):
+		"""Memperbarui data satu file setelah file dibuat atau diubah"""
+		if not name or name.startswith('.') or '/' in name or os.sep in name:
+			return None
+		try:
+			stat_result = os.stat(os.path.join(self.directory, name))
+		except OSError:
+			self.invalidate(name)
+			return None
+		if not stat.S_ISREG(stat_result.st_mode):
+			return None
+		index_entry = self.make_entry(name, stat_result)
+		if self.entries.get(name) != index_entry:
+			self.entries[name] = index_entry
+			self.version += 1
+		return index_entry
+
+	def invalidate(self, name):
+		"""Menghapus file dari indeks setelah file dihapus"""
+		if self.entries.pop(name, None) is not None:
+			self.version += 1
+
+	def files(self):
+		"""Daftar semua file dalam indeks"""
+		self.refresh()
+		return list(self.entries.values())
+
+	def sorted_files(self, sort_key='name', reverse=False):
+		"""Daftar file terurut, hasil pengurutan dipakai ulang selama indeks tidak berubah"""
+		self.refresh()
+		index_version = self.version
+		cached_version, cached_files = self.sorted_cache.get((sort_key, reverse), (None, None))
+		if cached_version == index_version:
+			return cached_files
+		key_function = {'name': lambda entry: entry.name, 'size': lambda entry: entry.size, 'mtime': lambda entry: entry.mtime}[sort_key]
+		sorted_files = sorted(self.entries.values(), key=key_function, reverse=reverse)
+		self.sorted_cache[(sort_key, reverse)] = (index_version, sorted_files)
+		return sorted_files
+
+# Response file yang sudah diserialisasi, berlaku selama mtime dan ukuran file sama
+CacheEntry = namedtuple('CacheEntry', ['mtime_ns', 'size', 'etag', 'last_modified', 'header_fields', 'body'])
+
+class ResponseCache:
+	"""Cache LRU response file kecil, dibatasi total ukuran body"""
+	def __init__(self, max_size=RESPONSE_CACHE_SIZE, max_entry_size=RESPONSE_CACHE_MAX_FILE_SIZE):
+		self.max_size = max_size
+		self.max_entry_size = max_entry_size
+		self.entries = OrderedDict()
+		self.total_size = 0
+		self.lock = threading.Lock()
+
+	def get(self, name, path, encoding=None):
+		"""Mengambil entry (varian encoding tertentu) yang masih sesuai dengan file di disk, None jika tidak ada"""
+		cache_key = (name, encoding)
+		with self.lock:
+			cache_entry = self.entries.get(cache_key)
+		if cache_entry is None:
+			return None
+
+		# Cukup satu stat untuk memastikan file belum berubah sejak di-cache
+		try:
+			stat_result = os.stat(path)
+		except OSError:
+			self.invalidate(name)
+			return None
+		if stat_result.st_mtime_ns != cache_entry.mtime_ns or stat_result.st_size != cache_entry.size:
+			self.invalidate(name)
+			return None
+
+		with self.lock:
+			if cache_key in self.entries:
+				self.entries.move_to_end(cache_key)
+		return cache_entry
+
+	def put(self, name, cache_entry, encoding=None):
+		"""Menyimpan entry baru, entry paling lama tidak dipakai dibuang jika penuh"""
+		if len(cache_entry.body) > self.max_entry_size:
+			return
+		cache_key = (name, encoding)
+		with self.lock:
+			previous_entry = self.entries.pop(cache_key, None)
+			if previous_entry is not None:
+				self.total_size -= len(previous_entry.body)
+			self.entries[cache_key] = cache_entry
+			self.total_size += len(cache_entry.body)
+			while self.total_size > self.max_size:
+				_, evicted_entry = self.entries.popitem(last=False)
+				self.total_size -= len(evicted_entry.body)
+
+	def invalidate(self, name):
+		"""Membuang entry (semua varian encoding) setelah file diubah, di-upload ulang atau dihapus"""
+		with self.lock:
+			for encoding in (None,) + CONTENT_CODINGS:
+				cache_entry = self.entries.pop((name, encoding), None)
+				if cache_entry is not None:
+					self.total_size -= len(cache_entry.body)
+
+class CompressedVariants:
+	"""Varian terkompresi file besar, disimpan sebagai file sidecar dengan mtime sama seperti file asli"""
+	def __init__(self, document_root):
+		self.document_root = document_root
+		self.directory = os.path.join(document_root, COMPRESSED_DIRECTORY)
+		# Varian dibuat di thread latar milik proses ini, satu per satu, tanpa duplikat
+		self.pending_lock = threading.Lock()
+		self.pending = set()
+		self.build_queue = None
+		self.builder_pid = None
+
+	def variant_path(self, name, encoding):
+		return os.path.join(self.directory, f"{name}.{encoding}")
+
+	def open(self, name, encoding, source_stat):
+		"""Membuka varian yang masih sesuai file asli; None (dan dijadwalkan dibuat) jika belum ada"""
+		try:
+			variant_handle = open(self.variant_path(name, encoding), 'rb')
+		except FileNotFoundError:
+			variant_handle = None
+		if variant_handle is not None:
+			if os.fstat(variant_handle.fileno()).st_mtime_ns == source_stat.st_mtime_ns:
+				return variant_handle
+			# File asli sudah berubah sejak varian dibuat
+			variant_handle.close()
+
+		# Request ini dilayani tanpa kompresi, request berikutnya memakai varian yang sudah jadi
+		self.schedule(name, encoding)
+		return None
+
+	def schedule(self, name, encoding):
+		"""Memasukkan varian ke antrean thread pembuat jika belum ada di antrean"""
+		with self.pending_lock:
+			if self.builder_pid != os.getpid():
+				# Thread pembuat milik proses induk tidak ikut ter-fork, antrean dibuat baru
+				self.build_queue = queue.SimpleQueue()
+				self.pending = set()
+				self.builder_pid = os.getpid()
+				threading.Thread(target=self.build_pending, args=(self.build_queue,), daemon=True).start()
+			if (name, encoding) in self.pending:
+				return
+			self.pending.add((name, encoding))
+			self.build_queue.put((name, encoding))
+
+	def build_pending(self, build_queue):
+		"""Loop thread pembuat varian"""
+		while True:
+			name, encoding = build_queue.get()
+			try:
+				self.build_variant(name, encoding)
+			except OSError:
+				# Misalnya document root read-only atau file sudah dihapus, file tetap dikirim tanpa kompresi
+				pass
+			finally:
+				with self.pending_lock:
+					self.pending.discard((name, encoding))
+
+	def build_variant(self, name, encoding):
+		"""Membuat varian jika belum sesuai file asli, dilewati jika proses lain sedang membuatnya"""
+		os.makedirs(self.directory, exist_ok=True)
+		variant_path = self.variant_path(name, encoding)
+		with open(os.path.join(self.document_root, name), 'rb') as source_handle, open(os.path.join(self.directory, f".{name}.{encoding}.lock"), 'a') as lock_file:
+			if fcntl is not None:
+				try:
+					fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+				except BlockingIOError:
+					return
+			source_stat = os.fstat(source_handle.fileno())
+			if not COMPRESSION_MIN_SIZE <= source_stat.st_size <= COMPRESSION_MAX_FILE_SIZE:
+				return
+			try:
+				if os.stat(variant_path).st_mtime_ns == source_stat.st_mtime_ns:
+					# Sudah dibuat oleh proses lain
+					return
+			except FileNotFoundError:
+				pass
+			self.build(variant_path, encoding, source_stat, source_handle)
+
+	def build(self, variant_path, encoding, source_stat, source_handle):
+		"""Mengompres file asli ke file sementara lalu memindahkannya ke tempat varian"""
+		temporary_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+		try:
+			compression_levels = STATIC_COMPRESSION_LEVELS if source_stat.st_size <= STATIC_COMPRESSION_MAX_SIZE else STREAM_COMPRESSION_LEVELS
+			body_compressor = BodyCompressor(encoding, compression_levels[encoding])
+			with os.fdopen(temporary_descriptor, 'wb') as variant_file:
+				source_offset = 0
+				while True:
+					source_block = os.pread(source_handle.fileno(), 1024 * 1024, source_offset)
+					if not source_block:
+						break
+					source_offset += len(source_block)
+					variant_file.write(body_compressor.compress(source_block))
+				variant_file.write(body_compressor.finish())
+			# mtime varian menjadi penanda versi file asli yang dikompres
+			os.utime(temporary_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+			os.replace(temporary_path, variant_path)
+		except BaseException:
+			try:
+				os.unlink(temporary_path)
+			except OSError:
+				pass
+			raise
+
+	def invalidate(self, name):
+		"""Menghapus varian file yang sudah dihapus atau diganti"""
+		for encoding in CONTENT_CODINGS:
+			for stale_path in (self.variant_path(name, encoding), os.path.join(self.directory, f".{name}.{encoding}.lock")):
+				try:
+					os.unlink(stale_path)
+				except OSError:
+					pass
+
+class RouteNode:
+	"""Satu segmen path di trie route prefix"""
+	def __init__(self):
+		self.children = {}
+		self.handlers = {}
+
+class Router:
+	"""Tabel route: path persis lewat dict, route prefix lewat trie per segmen path"""
 	def __init__(self):
+		self.exact_routes = {}
+		self.prefix_root = RouteNode()
+
+	def add(self, method, path, handler):
+		"""Mendaftarkan handler untuk method dan path persis"""
+		self.exact_routes[(method, path)] = handler
+
+	def add_prefix(self, method, prefix, handler):
+		"""Mendaftarkan handler untuk semua path di bawah prefix ('/delete/', '/' untuk semua path)"""
+		route_node = self.prefix_root
+		for segment in prefix.strip('/').split('/'):
+			if segment:
+				route_node = route_node.children.setdefault(segment, RouteNode())
+		route_node.handlers[method] = handler
+
+	def match(self, method, path):
+		"""Mencari (handler, sisa path); route persis didahulukan, lalu prefix terpanjang"""
+		handler = self.exact_routes.get((method, path))
+		if handler is not None:
+			return handler, ''
+
+		segments = path[1:].split('/') if path.startswith('/') else path.split('/')
+		route_node = self.prefix_root
+		matched = (route_node.handlers.get(method), 0)
+		# Segmen terakhir bukan bagian prefix karena tidak diikuti '/'
+		for segment_index, segment in enumerate(segments[:-1]):
+			route_node = route_node.children.get(segment)
+			if route_node is None:
+				break
+			if method in route_node.handlers:
+				matched = (route_node.handlers[method], segment_index + 1)
+
+		handler, consumed = matched
+		if handler is None:
+			return None, path
+		return handler, '/'.join(segments[consumed:])
+
+class HttpServer:
+	def __init__(self, document_root='./', handler_modules=(), storage='plain'):
 		self.sessions = {}
+		# Direktori tempat file dilayani, di-upload dan dihapus
+		self.document_root = document_root
 		self.types = {
 			'.pdf': 'application/pdf',
 			'.jpg': 'image/jpeg',
 			'.txt': 'text/plain',
 			'.html': 'text/html'
 		}
+		self.directory_index = DirectoryIndex(document_root, self.types)
+		self.response_cache = ResponseCache()
+		self.compressed_variants = CompressedVariants(document_root)
+		self.upload_store = create_upload_store(document_root, storage)
+		# Counter bersama semua proses, ditampilkan di /metrics
+		self.metrics = metrics_registry
+
+		self.router = Router()
+		self.router.add('GET', '/', self.index_page)
+		self.router.add('GET', '/video', self.video_redirect)
+		self.router.add('GET', '/santai', self.santai_page)
+		self.router.add('GET', '/metrics', self.metrics_page)
+		self.router.add('GET', '/files', self.list_directory_files)
+		self.router.add('GET', '/api/files', self.list_files_json)
+		self.router.add('POST', '/upload', self.handle_file_upload)
+		self.router.add_prefix('DELETE', '/delete/', self.delete_file)
+		# Path lain: GET melayani file, POST dan DELETE mendapat response bawaan
+		self.router.add_prefix('GET', '/', self.serve_file)
+		self.router.add_prefix('POST', '/', self.default_post)
+		self.router.add_prefix('DELETE', '/', self.invalid_delete)
+
+		# Modul tambahan dari deployment mendaftarkan route lewat register_routes(http_server)
+		for module_name in handler_modules:
+			importlib.import_module(module_name).register_routes(self)
+
+	def add_route(self, method, path, handler, prefix=False):
+		"""Mendaftarkan handler(request) tambahan; prefix=True untuk semua path di bawah path"""
+		if prefix:
+			self.router.add_prefix(method, path, handler)
+		else:
+			self.router.add(method, path, handler)
 		
-	def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
-		current_time = datetime.now().strftime('%c')
+	def response_header(self, kode, message, content_length, headers):
+		"""Membuat potongan header response (tanpa Connection) sebagai daftar buffer"""
+		return [*self.status_header(kode, message), self.header_fields(content_length, headers)]
+
+	def status_header(self, kode, message):
+		"""Baris status, Server dan Date dari template yang sudah dibuat sebelumnya"""
+		return [status_prefix(kode, message), date_header.line()]
+
+	def header_fields(self, content_length, headers):
+		"""Header sisanya dalam bentuk "Name: value", bisa disimpan di cache bersama body"""
 		response_lines = []
-		
-		# Membuat baris status HTTP
-		response_lines.append(f"HTTP/1.0 {kode} {message}\r\n")
-		response_lines.append(f"Date: {current_time}\r\n")
-		response_lines.append("Connection: close\r\n")
-		response_lines.append("Server: myserver/1.0\r\n")
-		response_lines.append(f"Content-Length: {len(messagebody)}\r\n")
-		
+		# Response tanpa body (304) tidak menyertakan Content-Length
+		if content_length is not None:
+			response_lines.append(f"Content-Length: {content_length}\r\n")
+
 		# Menambahkan header tambahan
 		for header_key in headers:
-			response_lines.append(f"{header_key}:{headers[header_key]}\r\n")
-		
-		response_lines.append("\r\n")
-		
-		# Menggabungkan semua header menjadi string
-		header_string = ''.join(response_lines)
-		
+			response_lines.append(f"{header_key}: {headers[header_key]}\r\n")
+
+		# Header Connection dan baris kosong penutup ditambahkan saat dikirim
+		return ''.join(response_lines).encode()
+
+	def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
 		# Memastikan messagebody dalam format bytes
-		if not isinstance(messagebody, bytes):
+		if not isinstance(messagebody, (bytes, bytearray, memoryview)):
 			messagebody = messagebody.encode()
-		
-		# Menggabungkan header dan body
-		final_response = header_string.encode() + messagebody
-		return final_response
-		
-	def parse_multipart_data(self, body, boundary):
-		"""Mengurai data multipart form untuk upload file"""
-		boundary_bytes = ('--' + boundary).encode()
-		data_parts = body.split(boundary_bytes)
-		uploaded_files = {}
-		
-		for part in data_parts:
-			if b'Content-Disposition' in part:
-				part_lines = part.split(b'\r\n')
-				disposition_header = None
-				file_name = None
-				
-				# Mencari header Content-Disposition
-				for line in part_lines:
-					if b'Content-Disposition' in line:
-						disposition_header = line.decode()
-						if 'filename=' in disposition_header:
-							file_name = disposition_header.split('filename=')[1].strip('"')
-						break
-				
-				if file_name:
-					# Mencari lokasi data file (setelah header kosong)
-					content_start = part.find(b'\r\n\r\n')
-					if content_start != -1:
-						file_content = part[content_start + 4:]
-						# Menghapus trailing boundary
-						if file_content.endswith(b'\r\n'):
-							file_content = file_content[:-2]
-						uploaded_files[file_name] = file_content
-		
-		return uploaded_files
-		
+
+		header_buffers = self.response_header(kode, message, len(messagebody), headers)
+		return HttpResponse(kode, message, header_buffers, body=messagebody)
+
+	def stream_response(self, request, kode, message, chunks, headers):
+		"""Response dengan body bertahap: chunked untuk HTTP/1.1, dibaca sampai koneksi ditutup untuk HTTP/1.0"""
+		content_type = headers.get('Content-Type', '')
+		if is_compressible(content_type):
+			headers = {**headers, 'Vary': 'Accept-Encoding'}
+			content_encoding = negotiate_encoding(request.header('accept-encoding'))
+			if content_encoding:
+				chunks = compress_chunks(chunks, content_encoding)
+				headers['Content-Encoding'] = content_encoding
+		chunked = request.version == 'HTTP/1.1'
+		if chunked:
+			headers = {**headers, 'Transfer-Encoding': 'chunked'}
+		header_buffers = self.response_header(kode, message, None, headers)
+		return HttpResponse(kode, message, header_buffers, chunks=chunks, chunked=chunked)
+
+	def file_response(self, kode, message, file_handle, offset, count, headers):
+		"""Membuat response yang body-nya dikirim langsung dari file descriptor"""
+		header_buffers = self.response_header(kode, message, count, headers)
+		return HttpResponse(kode, message, header_buffers, file=file_handle, offset=offset, count=count)
+
+	def file_validators(self, stat_result):
+		"""ETag dan Last-Modified dari mtime dan ukuran file"""
+		etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+		last_modified = email.utils.formatdate(stat_result.st_mtime, usegmt=True)
+		return etag, last_modified
+
+	def not_modified(self, request, etag, mtime):
+		"""True jika salinan milik klien masih sama (If-None-Match / If-Modified-Since)"""
+		if_none_match = request.header('if-none-match')
+		if if_none_match is not None:
+			# If-None-Match lebih diutamakan daripada If-Modified-Since
+			client_tags = [client_tag.strip().removeprefix('W/') for client_tag in if_none_match.split(',')]
+			return '*' in client_tags or etag in client_tags
+
+		if_modified_since = request.header('if-modified-since')
+		if if_modified_since:
+			try:
+				since_time = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+			except (TypeError, ValueError, IndexError):
+				return False
+			return int(mtime) <= since_time
+		return False
+
+	def not_modified_response(self, etag, last_modified):
+		"""Response 304 tanpa body"""
+		header_buffers = self.response_header(304, 'Not Modified', None, {'ETag': etag, 'Last-Modified': last_modified})
+		return HttpResponse(304, 'Not Modified', header_buffers)
+
+	def cached_response(self, request, cache_entry):
+		"""Response dari cache: tanpa membuka file, hanya baris status dan Date yang dibuat"""
+		if self.not_modified(request, cache_entry.etag, cache_entry.mtime_ns / 1e9):
+			return self.not_modified_response(cache_entry.etag, cache_entry.last_modified)
+		header_buffers = [*self.status_header(200, 'OK'), cache_entry.header_fields]
+		return HttpResponse(200, 'OK', header_buffers, body=cache_entry.body)
+
+	def parse_range(self, range_header, file_size):
+		"""Mengurai header Range (satu rentang byte), mengembalikan (awal, akhir) atau None"""
+		range_unit, _, range_spec = range_header.partition('=')
+		# Unit lain atau multi-range diabaikan sehingga seluruh file dikirim
+		if range_unit.strip().lower() != 'bytes' or ',' in range_spec:
+			return None
+
+		start_text, separator, end_text = range_spec.strip().partition('-')
+		if not separator:
+			return None
+
+		try:
+			if start_text == '':
+				# Bentuk suffix "bytes=-N": N byte terakhir
+				suffix_length = int(end_text)
+				if suffix_length <= 0 or file_size == 0:
+					raise RequestError(416, 'Range Not Satisfiable')
+				return max(0, file_size - suffix_length), file_size - 1
+
+			range_start = int(start_text)
+			range_end = int(end_text) if end_text else file_size - 1
+		except ValueError:
+			return None
+
+		if range_start >= file_size:
+			raise RequestError(416, 'Range Not Satisfiable')
+
+		if range_start > range_end:
+			return None
+		return range_start, min(range_end, file_size - 1)
+
 	def proses(self, data):
-		request_lines = data.split("\r\n")
-		first_line = request_lines[0]
-		header_lines = [line for line in request_lines[1:] if line != '']
-		
-		# Ekstrak body untuk request POST
-		request_body = ""
-		if "\r\n\r\n" in data:
-			body_index = data.find("\r\n\r\n") + 4
-			request_body = data[body_index:]
-		
-		line_parts = first_line.split(" ")
+		# Request mentah (str/bytes) tetap diterima untuk kompatibilitas
 		try:
-			http_method = line_parts[0].upper().strip()
-			requested_path = line_parts[1].strip()
-			
-			if http_method == 'GET':
-				return self.http_get(requested_path, header_lines)
-			elif http_method == 'POST':
-				return self.http_post(requested_path, header_lines, request_body)
-			elif http_method == 'DELETE':
-				return self.http_delete(requested_path, header_lines)
-			else:
-				return self.response(400, 'Bad Request', '', {})
-		except IndexError:
-			return self.response(400, 'Bad Request', '', {})
-			
-	def http_get(self, object_address, headers):
-		available_files = glob('./*')
-		base_directory = './'
-		
-		# Route untuk halaman utama
-		if object_address == '/':
-			return self.response(200, 'OK', 'Ini Adalah web Server percobaan', {})
-		
-		# Route untuk redirect video
-		if object_address == '/video':
-			return self.response(302, 'Found', '', {'location': 'https://youtu.be/katoxpnTf04'})
-		
-		# Route santai
-		if object_address == '/santai':
-			return self.response(200, 'OK', 'santai saja', {})
-		
-		# Route untuk menampilkan daftar file
-		if object_address == '/files':
-			return self.list_directory_files(base_directory)
+			request = data if isinstance(data, HttpRequest) else HttpRequest.from_raw(data)
+		except RequestError as request_error:
+			return self.response(request_error.kode, request_error.message, '', {})
 		
-		# Menangani request file
-		file_path = object_address[1:]  # Menghapus '/' di awal
-		full_path = base_directory + file_path
-		
-		if full_path not in available_files:
+		# Satu lookup dict untuk route persis, selebihnya sepanjang segmen path
+		handler, request.route_tail = self.router.match(request.method, request.path)
+		if handler is None:
+			return self.response(400, 'Bad Request', '', {})
+		try:
+			return handler(request)
+		except RequestError as request_error:
+			# Misalnya body terlalu besar (413) saat handler membaca request.body
+			return self.response(request_error.kode, request_error.message, '', {})
+
+	def index_page(self, request):
+		"""Route untuk halaman utama"""
+		return self.response(200, 'OK', 'Ini Adalah web Server percobaan', {})
+
+	def video_redirect(self, request):
+		"""Route untuk redirect video"""
+		return self.response(302, 'Found', '', {'Location': 'https://youtu.be/katoxpnTf04'})
+
+	def santai_page(self, request):
+		"""Route santai"""
+		return self.response(200, 'OK', 'santai saja', {})
+
+	def metrics_page(self, request):
+		"""Route metrics dalam format teks Prometheus"""
+		return self.response(200, 'OK', self.metrics.render(), {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+	def list_files_json(self, request):
+		"""Route listing dalam format JSON untuk klien dan skrip"""
+		return self.list_directory_files(request, as_json=True)
+
+	def serve_file(self, request):
+		"""Menangani request file melalui indeks direktori"""
+		file_name = urllib.parse.unquote(request.route_tail)
+		index_entry = self.directory_index.lookup(file_name)
+		if index_entry is None:
+			self.response_cache.invalidate(file_name)
 			return self.response(404, 'Not Found', '', {})
+
+		# Range selalu dilayani dari file asli tanpa kompresi
+		range_header = request.header('range')
+		compressible = is_compressible(index_entry.mime_type)
+		content_encoding = None
+		# File di luar batas ukuran kompresi disimpan di cache tanpa encoding, jadi dicari dengan kunci yang sama
+		if compressible and not range_header and COMPRESSION_MIN_SIZE <= index_entry.size <= COMPRESSION_MAX_FILE_SIZE:
+			content_encoding = negotiate_encoding(request.header('accept-encoding'))
+
+		# File kecil yang sering diminta dilayani dari cache tanpa I/O disk
+		if not range_header:
+			cache_entry = self.response_cache.get(file_name, os.path.join(self.document_root, file_name), content_encoding)
+			if cache_entry is not None:
+				return self.cached_response(request, cache_entry)
 		
-		# Membaca file dalam mode binary
-		with open(full_path, 'rb') as file_handle:
-			file_content = file_handle.read()
-		
-		# Menentukan content type berdasarkan ekstensi file
-		file_extension = os.path.splitext(full_path)[1]
-		mime_type = self.types.get(file_extension, 'application/octet-stream')
-		
-		response_headers = {'Content-type': mime_type}
-		return self.response(200, 'OK', file_content, response_headers)
+		# File besar tidak dibaca ke memori, body dikirim dari descriptor dengan sendfile
+		try:
+			file_handle = open(os.path.join(self.document_root, file_name), 'rb')
+		except FileNotFoundError:
+			# Indeks belum tahu file sudah dihapus
+			self.directory_index.invalidate(file_name)
+			self.response_cache.invalidate(file_name)
+			return self.response(404, 'Not Found', '', {})
+		file_stat = os.fstat(file_handle.fileno())
+		file_size = file_stat.st_size
+
+		etag, last_modified = self.file_validators(file_stat)
+		response_headers = {'Content-Type': index_entry.mime_type, 'Accept-Ranges': 'bytes', 'ETag': etag, 'Last-Modified': last_modified}
+		if compressible:
+			response_headers['Vary'] = 'Accept-Encoding'
+
+		if content_encoding and COMPRESSION_MIN_SIZE <= file_size <= COMPRESSION_MAX_FILE_SIZE:
+			compressed_response = self.compressed_file_response(request, file_name, file_handle, file_stat, content_encoding, response_headers)
+			if compressed_response is not None:
+				return compressed_response
+
+		if self.not_modified(request, etag, file_stat.st_mtime):
+			file_handle.close()
+			return self.not_modified_response(etag, last_modified)
+
+		# Menangani request sebagian (Range) untuk melanjutkan download
+		if range_header:
+			try:
+				byte_range = self.parse_range(range_header, file_size)
+			except RequestError as range_error:
+				file_handle.close()
+				return self.response(range_error.kode, range_error.message, '', {'Content-Range': f'bytes */{file_size}'})
+
+			if byte_range:
+				range_start, range_end = byte_range
+				response_headers['Content-Range'] = f'bytes {range_start}-{range_end}/{file_size}'
+				return self.file_response(206, 'Partial Content', file_handle, range_start, range_end - range_start + 1, response_headers)
+
+		if file_size <= self.response_cache.max_entry_size:
+			# File kecil dibaca sekali lalu disimpan sebagai response siap kirim
+			with file_handle:
+				file_body = file_handle.read()
+			header_fields = self.header_fields(len(file_body), response_headers)
+			if len(file_body) == file_size:
+				self.response_cache.put(file_name, CacheEntry(file_stat.st_mtime_ns, file_size, etag, last_modified, header_fields, file_body))
+			return HttpResponse(200, 'OK', [*self.status_header(200, 'OK'), header_fields], body=file_body)
+
+		return self.file_response(200, 'OK', file_handle, 0, file_size, response_headers)
+
+	def compressed_file_response(self, request, file_name, file_handle, file_stat, content_encoding, response_headers):
+		"""Varian terkompresi: file kecil dari cache memori, file besar dari file sidecar; None jika tidak tersedia"""
+		# ETag berbeda per encoding agar cache klien dan proxy tidak tertukar
+		etag = f'{response_headers["ETag"][:-1]}-{content_encoding}"'
+		last_modified = response_headers['Last-Modified']
+		response_headers = {**response_headers, 'ETag': etag, 'Content-Encoding': content_encoding}
+		if self.not_modified(request, etag, file_stat.st_mtime):
+			file_handle.close()
+			return self.not_modified_response(etag, last_modified)
+
+		if file_stat.st_size <= self.response_cache.max_entry_size:
+			with file_handle:
+				file_body = file_handle.read()
+			compressed_body = compress_bytes(file_body, content_encoding, STATIC_COMPRESSION_LEVELS[content_encoding])
+			header_fields = self.header_fields(len(compressed_body), response_headers)
+			if len(file_body) == file_stat.st_size:
+				cache_entry = CacheEntry(file_stat.st_mtime_ns, file_stat.st_size, etag, last_modified, header_fields, compressed_body)
+				self.response_cache.put(file_name, cache_entry, content_encoding)
+			return HttpResponse(200, 'OK', [*self.status_header(200, 'OK'), header_fields], body=compressed_body)
+
+		variant_handle = self.compressed_variants.open(file_name, content_encoding, file_stat)
+		if variant_handle is None:
+			return None
+		file_handle.close()
+		variant_size = os.fstat(variant_handle.fileno()).st_size
+		return self.file_response(200, 'OK', variant_handle, 0, variant_size, response_headers)
 		
-	def list_directory_files(self, directory):
-		"""Menampilkan daftar semua file dalam direktori"""
+	def list_directory_files(self, request, as_json=False):
+		"""Menampilkan daftar file dalam direktori per halaman (?offset=&limit=&sort=), HTML atau JSON"""
+		sort_field = request.query.get('sort', 'name')
+		reverse = sort_field.startswith('-')
+		sort_field = sort_field.lstrip('-')
+		if sort_field not in ('name', 'size', 'mtime'):
+			return self.response(400, 'Bad Request', 'Invalid sort field, use name, size or mtime', {})
 		try:
-			file_list = []
-			for item in os.listdir(directory):
-				item_path = os.path.join(directory, item)
-				if os.path.isfile(item_path):
-					file_details = {
-						'name': item,
-						'size': os.path.getsize(item_path),
-						'modified': datetime.fromtimestamp(os.path.getmtime(item_path)).strftime('%Y-%m-%d %H:%M:%S')
-					}
-					file_list.append(file_details)
-			
-			# Membuat konten HTML
-			html_template = """
+			offset = max(0, int(request.query.get('offset', 0)))
+			limit = int(request.query['limit']) if 'limit' in request.query else None
+		except ValueError:
+			return self.response(400, 'Bad Request', 'offset and limit must be integers', {})
+		# limit=0 menghasilkan halaman kosong dengan tautan Next ke offset yang sama tanpa akhir
+		if limit is not None and limit <= 0:
+			return self.response(400, 'Bad Request', 'limit must be a positive integer', {})
+
+		try:
+			# Data file diambil dari indeks scandir, tanpa stat tambahan per file
+			sorted_files = self.directory_index.sorted_files(sort_field, reverse)
+		except OSError as error:
+			return self.response(500, 'Internal Server Error', f'Error listing directory: {str(error)}', {})
+		page_end = len(sorted_files) if limit is None else offset + limit
+		page_files = sorted_files[offset:page_end]
+
+		if as_json or 'application/json' in request.header('accept', ''):
+			listing_chunks = self.listing_json(page_files, len(sorted_files), offset, limit)
+			return self.stream_response(request, 200, 'OK', listing_chunks, {'Content-Type': 'application/json'})
+
+		next_offset = page_end if page_end < len(sorted_files) else None
+		listing_chunks = self.listing_html(page_files, request.query.get('sort', 'name'), next_offset, limit)
+		return self.stream_response(request, 200, 'OK', listing_chunks, {'Content-Type': 'text/html; charset=utf-8'})
+
+	def listing_json(self, page_files, total, offset, limit):
+		"""Potongan body listing JSON, dibuat per kelompok baris"""
+		yield f'{{"total": {total}, "offset": {offset}, "limit": {json.dumps(limit)}, "files": ['.encode()
+		for row_start in range(0, len(page_files), LISTING_CHUNK_ROWS):
+			rows = [json.dumps({'name': entry.name, 'size': entry.size, 'mtime': entry.mtime, 'mime_type': entry.mime_type})
+					for entry in page_files[row_start:row_start + LISTING_CHUNK_ROWS]]
+			yield ((', ' if row_start else '') + ', '.join(rows)).encode()
+		yield b']}'
+
+	def listing_html(self, page_files, sort_field, next_offset, limit):
+		"""Potongan body listing HTML, dibuat per kelompok baris"""
+		yield """
 			<!DOCTYPE html>
 			<html>
 			<head>
@@ -175,20 +1604,27 @@ class HttpServer:
 						<th>Size (bytes)</th>
 						<th>Last Modified</th>
 					</tr>
-			"""
-			
-			# Menambahkan baris untuk setiap file
-			for file_info in file_list:
-				html_template += f"""
+			""".encode()
+
+		# Baris tabel disusun dengan join per kelompok, bukan += pada satu string besar
+		for row_start in range(0, len(page_files), LISTING_CHUNK_ROWS):
+			rows = [f"""
 					<tr>
-						<td>{file_info['name']}</td>
-						<td>{file_info['size']}</td>
-						<td>{file_info['modified']}</td>
+						<td>{html.escape(entry.name)}</td>
+						<td>{entry.size}</td>
+						<td>{datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M:%S')}</td>
 					</tr>
-				"""
-			
-			html_template += """
+				""" for entry in page_files[row_start:row_start + LISTING_CHUNK_ROWS]]
+			yield ''.join(rows).encode()
+
+		next_link = ''
+		if next_offset is not None:
+			next_query = urllib.parse.urlencode({'offset': next_offset, 'limit': limit, 'sort': sort_field})
+			next_link = f'<p><a href="/files?{next_query}">Next page</a></p>'
+
+		yield f"""
 				</table>
+				{next_link}
 				<br>
 				<h2>Upload File</h2>
 				<form action="/upload" method="post" enctype="multipart/form-data">
@@ -197,95 +1633,57 @@ class HttpServer:
 				</form>
 			</body>
 			</html>
-			"""
-			
-			response_headers = {'Content-type': 'text/html'}
-			return self.response(200, 'OK', html_template, response_headers)
-			
-		except Exception as error:
-			return self.response(500, 'Internal Server Error', f'Error listing directory: {str(error)}', {})
+			""".encode()
 	
-	def http_post(self, object_address, headers, body):
-		# Menangani upload file
-		if object_address == '/upload':
-			return self.handle_file_upload(headers, body)
-		
-		# Default response untuk POST request lainnya
+	def default_post(self, request):
+		"""Default response untuk POST request lainnya"""
 		response_headers = {}
 		content = "kosong"
 		return self.response(200, 'OK', content, response_headers)
 		
-	def handle_file_upload(self, headers, body):
+	def handle_file_upload(self, request):
 		"""Menangani upload file dari form multipart"""
+		file_upload = FileUpload(self, request)
 		try:
-			# Mencari header Content-Type untuk mendapatkan boundary
-			content_type_line = None
-			for header_line in headers:
-				if header_line.lower().startswith('content-type:'):
-					content_type_line = header_line
+			for body_chunk in request.iter_body():
+				if file_upload.response is not None:
 					break
-			
-			if not content_type_line or 'multipart/form-data' not in content_type_line:
-				return self.response(400, 'Bad Request', 'Invalid content type for file upload', {})
-			
-			# Ekstrak boundary dari header
-			boundary_value = None
-			if 'boundary=' in content_type_line:
-				boundary_value = content_type_line.split('boundary=')[1].strip()
-			
-			if not boundary_value:
-				return self.response(400, 'Bad Request', 'Missing boundary in multipart data', {})
-			
-			# Parse data multipart
-			body_bytes = body.encode() if isinstance(body, str) else body
-			parsed_files = self.parse_multipart_data(body_bytes, boundary_value)
-			
-			if not parsed_files:
-				return self.response(400, 'Bad Request', 'No file found in upload', {})
-			
-			# Menyimpan file yang diupload
-			saved_files = []
-			for filename, file_data in parsed_files.items():
-				try:
-					file_path = './' + filename
-					with open(file_path, 'wb') as output_file:
-						output_file.write(file_data)
-					saved_files.append(filename)
-				except Exception as save_error:
-					return self.response(500, 'Internal Server Error', f'Error saving file {filename}: {str(save_error)}', {})
-			
-			# Membuat response HTML
-			success_html = f"""
-			<!DOCTYPE html>
-			<html>
-			<body>
-				<h1>Upload Successful</h1>
-				<p>Files uploaded: {', '.join(saved_files)}</p>
-				<a href="/files">Back to file list</a>
-			</body>
-			</html>
-			"""
-			
-			response_headers = {'Content-type': 'text/html'}
-			return self.response(200, 'OK', success_html, response_headers)
-			
+				file_upload.feed(body_chunk)
+			return file_upload.finish()
+		except DeadlineExceeded:
+			# Klien lambat diputus oleh serve_connection, bukan dijawab 500
+			raise
 		except Exception as upload_error:
 			return self.response(500, 'Internal Server Error', f'Upload error: {str(upload_error)}', {})
+		finally:
+			file_upload.abort()
+
+	def body_consumer(self, request):
+		"""Penerima body per potongan untuk route upload, None untuk route lain"""
+		# Server async membaca body di event loop dan hanya menyerahkan tiap potongan ke executor
+		handler, _ = self.router.match(request.method, request.path)
+		if handler == self.handle_file_upload:
+			return FileUpload(self, request)
+		return None
 	
-	def http_delete(self, object_address, headers):
-		"""Menangani penghapusan file"""
+	def invalid_delete(self, request):
+		"""DELETE di luar /delete/filename"""
+		return self.response(400, 'Bad Request', 'Invalid delete URL format. Use /delete/filename', {})
+
+	def delete_file(self, request):
+		"""Menangani penghapusan file (format: /delete/filename)"""
 		try:
-			# Ekstrak nama file dari URL (format: /delete/filename)
-			if not object_address.startswith('/delete/'):
-				return self.response(400, 'Bad Request', 'Invalid delete URL format. Use /delete/filename', {})
-			
-			target_filename = object_address[8:]  # Menghapus prefix '/delete/'
+			# Nama file adalah sisa path setelah prefix '/delete/'
+			target_filename = request.route_tail
 			if not target_filename:
 				return self.response(400, 'Bad Request', 'No filename specified', {})
 			
 			# Decode URL-encoded filename
 			decoded_filename = urllib.parse.unquote(target_filename)
-			target_path = './' + decoded_filename
+			# Hanya file langsung di document root yang boleh dihapus, file tersembunyi (.env, .objects) tidak
+			if '/' in decoded_filename or os.sep in decoded_filename or decoded_filename.startswith('.'):
+				return self.response(400, 'Bad Request', 'Invalid filename', {})
+			target_path = os.path.join(self.document_root, decoded_filename)
 			
 			# Validasi keberadaan file
 			if not os.path.exists(target_path):
@@ -294,8 +1692,10 @@ class HttpServer:
 			if not os.path.isfile(target_path):
 				return self.response(400, 'Bad Request', f'{decoded_filename} is not a file', {})
 			
-			# Menghapus file
-			os.remove(target_path)
+			# Menghapus file (objek di store berbasis isi hanya dihapus jika tidak dirujuk lagi)
+			self.directory_index.apply_change(decoded_filename, functools.partial(self.upload_store.remove, decoded_filename))
+			self.response_cache.invalidate(decoded_filename)
+			self.compressed_variants.invalidate(decoded_filename)
 			
 			# Membuat response HTML
 			delete_success_html = f"""
@@ -309,16 +1709,164 @@ class HttpServer:
 			</html>
 			"""
 			
-			response_headers = {'Content-type': 'text/html'}
+			response_headers = {'Content-Type': 'text/html'}
 			return self.response(200, 'OK', delete_success_html, response_headers)
 			
 		except Exception as delete_error:
 			return self.response(500, 'Internal Server Error', f'Delete error: {str(delete_error)}', {})
 
+def serve_connection(http_server, client_socket, client_address, log, observers=(), deadlines=DEFAULT_DEADLINES, max_requests=MAX_KEEP_ALIVE_REQUESTS, rate_limiter=None):
+	"""Melayani request berurutan pada satu koneksi (keep-alive dan pipelining)"""
+	client_label = f"{client_address[0]}:{client_address[1]}"
+	client_ip = client_address[0]
+	if rate_limiter is not None and not rate_limiter.enabled:
+		rate_limiter = None
+
+	def limit_bandwidth(byte_count):
+		# Semua koneksi dari IP yang sama berbagi satu bucket byte
+		delay = rate_limiter.throttle(client_ip, byte_count)
+		if delay:
+			http_server.metrics.throttled(delay)
+
+	if rate_limiter is not None and rate_limiter.byte_rate:
+		throttle = limit_bandwidth
+	else:
+		throttle = None
+	try:
+		# Response kecil tidak perlu menunggu algoritma Nagle
+		client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	except (OSError, AttributeError):
+		pass
+
+	# Sisa data di reader adalah awal request berikutnya (pipelining)
+	request_reader = RequestReader(client_socket, deadlines=deadlines)
+	handled_requests = 0
+	try:
+		while handled_requests < max_requests:
+			try:
+				# Request pertama dibatasi header_timeout sejak diterima, request berikutnya oleh idle timeout
+				http_request = request_reader.read_request(deadlines.idle_timeout if handled_requests else None)
+			except RequestError as request_error:
+				log(f"Request tidak valid dari {client_label}: {request_error}", "WARNING")
+				client_socket.settimeout(deadlines.write_timeout)
+				http_server.response(request_error.kode, request_error.message, '', {}).send(client_socket)
+				break
+
+			if http_request is None:
+				if not handled_requests:
+					log(f"Koneksi ditutup oleh {client_label}", "WARNING")
+				break
+
+			handled_requests += 1
+			request_start = time.monotonic()
+
+			# Klien yang melewati batas request mendapat 429 tanpa menjalankan handler
+			retry_after = rate_limiter.admit(client_ip) if rate_limiter is not None else 0
+			if retry_after:
+				log(f"Batas request {client_label} terlampaui, 429", "WARNING")
+				http_response = rate_limited_response(http_server, retry_after)
+			else:
+				http_response = http_server.proses(http_request)
+			keep_alive = http_request.wants_keep_alive() and handled_requests < max_requests
+			if keep_alive:
+				keep_alive = http_request.discard_body()
+
+			# Klien yang berhenti membaca response diputus setelah write_timeout tanpa kemajuan
+			client_socket.settimeout(deadlines.write_timeout)
+			try:
+				http_response.send(client_socket, keep_alive, throttle)
+			except socket.timeout:
+				raise DeadlineExceeded('write')
+			# Body tanpa panjang (HTTP/1.0 stream) diakhiri dengan menutup koneksi
+			keep_alive = keep_alive and not http_response.close_connection
+
+			# Access log dan metrics menerima setiap request yang selesai
+			request_latency = time.monotonic() - request_start
+			for observer in observers:
+				observer(client_address, http_request, http_response, request_latency)
+			if not keep_alive:
+				break
+	except DeadlineExceeded as deadline_error:
+		if deadline_error.phase == 'idle':
+			log(f"Koneksi {client_label} idle, ditutup", "INFO")
+		else:
+			log(f"Koneksi {client_label} tidak ada kemajuan ({deadline_error}), diputus", "WARNING")
+		http_server.metrics.reaped(deadline_error.phase)
+	return handled_requests
+
+class InFlightTracker:
+	"""Melacak task koneksi yang sedang berjalan, dilepas lewat callback selesai (O(1))"""
+	def __init__(self, max_in_flight, on_error=None, on_change=None):
+		self.max_in_flight = max_in_flight
+		self.on_error = on_error
+		# Dipanggil dengan jumlah task aktif setiap kali berubah (misalnya untuk gauge)
+		self.on_change = on_change
+		self.active = set()
+		self.lock = threading.Lock()
+
+	def __len__(self):
+		return len(self.active)
+
+	def is_full(self):
+		"""True jika jumlah task aktif sudah mencapai batas"""
+		return len(self.active) >= self.max_in_flight
+
+	def track(self, future):
+		"""Mendaftarkan future baru, dilepas otomatis saat selesai"""
+		with self.lock:
+			self.active.add(future)
+			active_count = len(self.active)
+		if self.on_change:
+			self.on_change(active_count)
+		future.add_done_callback(self.finished)
+
+	def finished(self, future):
+		with self.lock:
+			self.active.discard(future)
+			active_count = len(self.active)
+		if self.on_change:
+			self.on_change(active_count)
+		if not future.cancelled() and future.exception() is not None and self.on_error:
+			self.on_error(future.exception())
+
+	def snapshot(self):
+		"""Salinan daftar future aktif, misalnya untuk ditunggu saat shutdown"""
+		with self.lock:
+			return list(self.active)
+
+def create_listener(address, backlog, reuse_port=False):
+	"""Membuat socket listening, dengan SO_REUSEPORT jika beberapa proses bind ke port yang sama"""
+	listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	if reuse_port:
+		listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+	listener.bind(address)
+	listener.listen(backlog)
+	return listener
+
+def rate_limited_response(http_server, retry_after):
+	"""Response 429 dengan Retry-After (detik, dibulatkan ke atas) sampai token request tersedia"""
+	return http_server.response(429, 'Too Many Requests', 'Terlalu banyak request, coba lagi nanti', {'Retry-After': max(1, math.ceil(retry_after))})
+
+def overload_response(http_server, retry_after):
+	"""Response 503 untuk koneksi yang ditolak karena server penuh"""
+	return http_server.response(503, 'Service Unavailable', 'Server sedang sibuk, coba lagi nanti', {'Retry-After': retry_after})
+
+def send_overload_response(http_server, client_socket, retry_after):
+	"""Menolak koneksi secepatnya dengan 503 saat server penuh"""
+	try:
+		# Thread accept tidak boleh tertahan oleh klien yang lambat membaca
+		client_socket.setblocking(False)
+		overload_response(http_server, retry_after).send(client_socket)
+	except OSError:
+		pass
+	finally:
+		client_socket.close()
+
 # Testing section
 if __name__ == "__main__":
 	httpserver = HttpServer()
 	test_response1 = httpserver.proses('GET testing.txt HTTP/1.0')
-	print(test_response1)
+	print(bytes(test_response1))
 	test_response2 = httpserver.proses('GET donalbebek.jpg HTTP/1.0')
-	print(test_response2)
\ No newline at end of file
+	print(bytes(test_response2))
\ No newline at end of file
@@ -0,0 +1,224 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+# Label yang dicatat; nilai lain masuk ke label "other"
+METHODS = ('GET', 'POST', 'DELETE')
+STATUS_CODES = (200, 206, 302, 304, 400, 404, 411, 413, 416, 429, 431, 500, 503)
+ROUTES = ('/', '/video', '/santai', '/files', '/api/files', '/upload', '/delete', '/metrics', 'file')
+# Batas atas bucket histogram latensi (detik), ditambah +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GAUGES = ('in_flight_connections', 'pool_queue_depth')
+# Alasan koneksi diputus karena batas waktu I/O terlewati
+REAP_REASONS = ('header', 'body', 'idle', 'write', 'rate')
+
+# Jumlah minimal proses yang bisa memiliki slot counter sendiri; ditambah lewat reserve() sesuai jumlah worker
+MAX_SLOTS = 64
+
+class MetricsRegistry:
+    """Counter dan histogram di shared memory, satu slot per proses agar tanpa kontensi"""
+    def __init__(self, max_slots=MAX_SLOTS):
+        self.method_labels = METHODS + ('other',)
+        self.status_labels = STATUS_CODES + ('other',)
+        self.route_labels = ROUTES + ('other',)
+        self.bucket_count = len(LATENCY_BUCKETS) + 1
+
+        # Tata letak satu slot di array bersama
+        self.requests_offset = 0
+        self.bytes_in_offset = self.requests_offset + len(self.method_labels) * len(self.status_labels)
+        self.bytes_out_offset = self.bytes_in_offset + 1
+        self.buckets_offset = self.bytes_out_offset + 1
+        self.sums_offset = self.buckets_offset + len(self.route_labels) * self.bucket_count
+        self.counts_offset = self.sums_offset + len(self.route_labels)
+        self.reaped_offset = self.counts_offset + len(self.route_labels)
+        self.throttled_offset = self.reaped_offset + len(REAP_REASONS)
+        self.gauges_offset = self.throttled_offset + 1
+        self.slot_size = self.gauges_offset + len(GAUGES)
+
+        # Dibuat sebelum fork sehingga worker berbagi memori yang sama
+        self.max_slots = max_slots
+        self.values = RawArray('d', max_slots * self.slot_size)
+        self.slot_owners = RawArray('q', max_slots)
+        self.claim_lock = multiprocessing.Lock()
+
+        self.slot_pid = None
+        self.slot_base = 0
+        self.update_lock = threading.Lock()
+
+    def reserve(self, process_count):
+        """Memperbesar array slot agar cukup untuk process_count proses, dipanggil sebelum worker di-fork"""
+        if process_count <= self.max_slots:
+            return
+        with self.claim_lock:
+            values = RawArray('d', process_count * self.slot_size)
+            slot_owners = RawArray('q', process_count)
+            # Slot yang sudah diklaim (misalnya oleh proses induk) tetap di posisi yang sama
+            values[:len(self.values)] = self.values[:]
+            slot_owners[:self.max_slots] = self.slot_owners[:]
+            self.values = values
+            self.slot_owners = slot_owners
+            self.max_slots = process_count
+
+    def claim_slot(self):
+        """Mengambil slot untuk proses saat ini, slot milik proses yang sudah mati dipakai ulang"""
+        process_id = os.getpid()
+        with self.claim_lock:
+            chosen_slot = None
+            for slot in range(self.max_slots):
+                owner = self.slot_owners[slot]
+                if owner == process_id:
+                    chosen_slot = slot
+                    break
+                if chosen_slot is None and (owner == 0 or not self.process_alive(owner)):
+                    chosen_slot = slot
+            if chosen_slot is None:
+                # Berbagi slot membuat update saling menimpa, jadi lebih baik gagal dengan jelas
+                raise RuntimeError(f"Slot metrics habis ({self.max_slots} proses), panggil reserve() dengan jumlah worker sebelum fork")
+            self.slot_owners[chosen_slot] = process_id
+
+        self.slot_base = chosen_slot * self.slot_size
+        # Gauge milik proses lama tidak berlaku lagi, counter tetap diteruskan
+        for gauge_index in range(len(GAUGES)):
+            self.values[self.slot_base + self.gauges_offset + gauge_index] = 0
+        # Lock lama mungkin sedang dipegang thread lain saat fork
+        self.update_lock = threading.Lock()
+        self.slot_pid = process_id
+
+    def process_alive(self, process_id):
+        try:
+            os.kill(process_id, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def base(self):
+        if self.slot_pid != os.getpid():
+            self.claim_slot()
+        return self.slot_base
+
+    def route_label(self, method, path):
+        """Mengelompokkan path ke label route agar jumlah label tetap kecil"""
+        path = path.split('?', 1)[0]
+        if path in ROUTES:
+            return path
+        if path.startswith('/delete/'):
+            return '/delete'
+        if method == 'GET':
+            return 'file'
+        return 'other'
+
+    def label_index(self, labels, value):
+        try:
+            return labels.index(value)
+        except ValueError:
+            return len(labels) - 1
+
+    def observe(self, client_address, http_request, http_response, latency):
+        """Mencatat satu request yang selesai dilayani"""
+        slot_base = self.base()
+        method_index = self.label_index(self.method_labels, http_request.method)
+        status_index = self.label_index(self.status_labels, http_response.kode)
+        route_index = self.label_index(self.route_labels, self.route_label(http_request.method, http_request.path))
+
+        bucket_index = len(LATENCY_BUCKETS)
+        for index, upper_bound in enumerate(LATENCY_BUCKETS):
+            if latency <= upper_bound:
+                bucket_index = index
+                break
+
+        values = self.values
+        with self.update_lock:
+            values[slot_base + self.requests_offset + method_index * len(self.status_labels) + status_index] += 1
+            values[slot_base + self.bytes_in_offset] += http_request.head_size + http_request.content_length()
+            values[slot_base + self.bytes_out_offset] += http_response.sent_bytes
+            values[slot_base + self.buckets_offset + route_index * self.bucket_count + bucket_index] += 1
+            values[slot_base + self.sums_offset + route_index] += latency
+            values[slot_base + self.counts_offset + route_index] += 1
+
+    def reaped(self, reason):
+        """Mencatat koneksi yang diputus karena batas waktu I/O"""
+        slot_base = self.base()
+        with self.update_lock:
+            self.values[slot_base + self.reaped_offset + REAP_REASONS.index(reason)] += 1
+
+    def throttled(self, seconds):
+        """Mencatat jeda pengiriman karena batas laju byte per klien"""
+        slot_base = self.base()
+        with self.update_lock:
+            self.values[slot_base + self.throttled_offset] += seconds
+
+    def set_gauge(self, name, value):
+        """Mengisi gauge milik proses ini, nilai akhir dijumlahkan dari semua proses"""
+        self.values[self.base() + self.gauges_offset + GAUGES.index(name)] = value
+
+    def set_connections(self, in_flight, pool_size):
+        """Memperbarui gauge koneksi aktif dan antrean pool"""
+        self.set_gauge('in_flight_connections', in_flight)
+        self.set_gauge('pool_queue_depth', max(0, in_flight - pool_size))
+
+    def totals(self):
+        """Menjumlahkan semua slot menjadi satu daftar nilai"""
+        totals = [0.0] * self.slot_size
+        values = self.values
+        for slot in range(self.max_slots):
+            if not self.slot_owners[slot]:
+                continue
+            slot_base = slot * self.slot_size
+            for offset in range(self.slot_size):
+                totals[offset] += values[slot_base + offset]
+        return totals
+
+    def render(self):
+        """Menyusun metrics dalam format teks Prometheus"""
+        totals = self.totals()
+        lines = []
+
+        lines.append("# HELP http_requests_total Jumlah request per method dan status.")
+        lines.append("# TYPE http_requests_total counter")
+        for method_index, method in enumerate(self.method_labels):
+            for status_index, status in enumerate(self.status_labels):
+                count = totals[self.requests_offset + method_index * len(self.status_labels) + status_index]
+                if count:
+                    lines.append(f'http_requests_total{{method="{method}",status="{status}"}} {count:.0f}')
+
+        lines.append("# HELP http_request_bytes_total Byte request yang diterima.")
+        lines.append("# TYPE http_request_bytes_total counter")
+        lines.append(f"http_request_bytes_total {totals[self.bytes_in_offset]:.0f}")
+        lines.append("# HELP http_response_bytes_total Byte response yang dikirim.")
+        lines.append("# TYPE http_response_bytes_total counter")
+        lines.append(f"http_response_bytes_total {totals[self.bytes_out_offset]:.0f}")
+
+        lines.append("# HELP http_request_duration_seconds Latensi request per route.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for route_index, route in enumerate(self.route_labels):
+            route_count = totals[self.counts_offset + route_index]
+            if not route_count:
+                continue
+            cumulative = 0.0
+            for bucket_index in range(self.bucket_count):
+                cumulative += totals[self.buckets_offset + route_index * self.bucket_count + bucket_index]
+                upper_bound = f"{LATENCY_BUCKETS[bucket_index]:g}" if bucket_index < len(LATENCY_BUCKETS) else "+Inf"
+                lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="{upper_bound}"}} {cumulative:.0f}')
+            lines.append(f'http_request_duration_seconds_sum{{route="{route}"}} {totals[self.sums_offset + route_index]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{route="{route}"}} {route_count:.0f}')
+
+        lines.append("# HELP http_connections_reaped_total Koneksi yang diputus karena batas waktu I/O terlewati.")
+        lines.append("# TYPE http_connections_reaped_total counter")
+        for reason_index, reason in enumerate(REAP_REASONS):
+            lines.append(f'http_connections_reaped_total{{reason="{reason}"}} {totals[self.reaped_offset + reason_index]:.0f}')
+
+        lines.append("# HELP http_throttled_seconds_total Lama jeda pengiriman karena batas laju byte per klien.")
+        lines.append("# TYPE http_throttled_seconds_total counter")
+        lines.append(f"http_throttled_seconds_total {totals[self.throttled_offset]:.6f}")
+
+        for gauge_index, gauge in enumerate(GAUGES):
+            lines.append(f"# TYPE http_{gauge} gauge")
+            lines.append(f"http_{gauge} {totals[self.gauges_offset + gauge_index]:.0f}")
+
+        return "\n".join(lines) + "\n"
+
+# Registry bersama, dibuat saat import (sebelum fork) agar dipakai semua worker
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,123 @@
+import time
+import hashlib
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+# Jumlah klien (IP) yang dilacak sekaligus; klien yang lama tidak aktif digantikan klien baru
+MAX_CLIENTS = 4096
+# Tabel dibagi ke beberapa bagian dengan lock masing-masing agar worker jarang saling menunggu
+LOCK_STRIPES = 16
+# Jumlah slot yang dicoba untuk satu klien sebelum slot paling lama tidak dipakai diambil alih
+MAX_PROBES = 8
+
+# Isi satu slot di array nilai: token request, token byte, waktu pembaruan terakhir
+REQUEST_TOKENS = 0
+BYTE_TOKENS = 1
+UPDATED_AT = 2
+SLOT_SIZE = 3
+
+class RateLimiter:
+    """Token bucket request dan byte per IP klien, disimpan di shared memory agar berlaku lintas proses"""
+    def __init__(self, max_clients=MAX_CLIENTS, lock_stripes=LOCK_STRIPES):
+        # Dibuat sebelum fork sehingga semua worker membaca dan mengurangi bucket yang sama
+        self.lock_stripes = lock_stripes
+        self.stripe_size = max(1, max_clients // lock_stripes)
+        slot_count = self.stripe_size * lock_stripes
+        self.keys = RawArray('q', slot_count)
+        self.values = RawArray('d', slot_count * SLOT_SIZE)
+        self.locks = [multiprocessing.Lock() for _ in range(lock_stripes)]
+        self.configure()
+
+    def configure(self, request_rate=0, request_burst=0, byte_rate=0, byte_burst=0):
+        """Mengatur batas (0 = tanpa batas), dipanggil sebelum worker di-fork"""
+        self.request_rate = request_rate
+        self.byte_rate = byte_rate
+        # Tanpa burst eksplisit, bucket menampung jatah satu detik
+        self.request_burst = request_burst or max(request_rate, 1)
+        self.byte_burst = byte_burst or byte_rate
+        self.enabled = bool(request_rate or byte_rate)
+
+    def configure_from(self, server_config):
+        """Mengambil batas dari konfigurasi server (request_rate, request_burst, byte_rate, byte_burst)"""
+        self.configure(server_config.request_rate, server_config.request_burst, server_config.byte_rate, server_config.byte_burst)
+
+    def client_key(self, client_ip):
+        """Kunci 64-bit yang sama di semua proses (hash() bawaan Python diacak per proses)"""
+        key = int.from_bytes(hashlib.blake2b(client_ip.encode(), digest_size=8).digest(), 'little', signed=True)
+        # Nol menandai slot kosong
+        return key or 1
+
+    def update(self, client_ip, consume):
+        """Mengisi ulang bucket klien lalu menjalankan consume(slot_base) di bawah lock"""
+        key = self.client_key(client_ip)
+        stripe = key % self.lock_stripes
+        stripe_base = stripe * self.stripe_size
+        first_probe = (key // self.lock_stripes) % self.stripe_size
+        keys = self.keys
+        values = self.values
+        now = time.monotonic()
+        with self.locks[stripe]:
+            chosen_slot = None
+            oldest_slot = None
+            for probe in range(min(MAX_PROBES, self.stripe_size)):
+                slot = stripe_base + (first_probe + probe) % self.stripe_size
+                if keys[slot] == key:
+                    chosen_slot = slot
+                    break
+                if keys[slot] == 0:
+                    oldest_slot = slot
+                    break
+                if oldest_slot is None or values[slot * SLOT_SIZE + UPDATED_AT] < values[oldest_slot * SLOT_SIZE + UPDATED_AT]:
+                    oldest_slot = slot
+
+            if chosen_slot is None:
+                # Klien baru (atau menggantikan klien paling lama) mulai dengan bucket penuh
+                chosen_slot = oldest_slot
+                keys[chosen_slot] = key
+                slot_base = chosen_slot * SLOT_SIZE
+                values[slot_base + REQUEST_TOKENS] = self.request_burst
+                values[slot_base + BYTE_TOKENS] = self.byte_burst
+            else:
+                slot_base = chosen_slot * SLOT_SIZE
+                elapsed = max(0.0, now - values[slot_base + UPDATED_AT])
+                values[slot_base + REQUEST_TOKENS] = min(self.request_burst, values[slot_base + REQUEST_TOKENS] + elapsed * self.request_rate)
+                values[slot_base + BYTE_TOKENS] = min(self.byte_burst, values[slot_base + BYTE_TOKENS] + elapsed * self.byte_rate)
+            values[slot_base + UPDATED_AT] = now
+            return consume(slot_base)
+
+    def admit(self, client_ip):
+        """Mengambil satu token request; 0 jika diizinkan, selain itu detik sampai token tersedia"""
+        if not self.request_rate:
+            return 0.0
+
+        def take_request(slot_base):
+            tokens = self.values[slot_base + REQUEST_TOKENS]
+            if tokens >= 1:
+                self.values[slot_base + REQUEST_TOKENS] = tokens - 1
+                return 0.0
+            return (1 - tokens) / self.request_rate
+
+        return self.update(client_ip, take_request)
+
+    def consume(self, client_ip, byte_count):
+        """Mengambil token byte untuk data yang akan dikirim, hasilnya detik jeda sebelum mengirim"""
+        if not self.byte_rate or not byte_count:
+            return 0.0
+
+        def take_bytes(slot_base):
+            # Bucket boleh minus: utang dibayar dengan jeda, sehingga koneksi paralel klien yang sama ikut melambat
+            tokens = self.values[slot_base + BYTE_TOKENS] - byte_count
+            self.values[slot_base + BYTE_TOKENS] = tokens
+            return -tokens / self.byte_rate if tokens < 0 else 0.0
+
+        return self.update(client_ip, take_bytes)
+
+    def throttle(self, client_ip, byte_count):
+        """Versi blocking consume untuk worker thread, mengembalikan lama jeda"""
+        delay = self.consume(client_ip, byte_count)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+# Limiter bersama, dibuat saat import (sebelum fork) agar dipakai semua worker
+rate_limiter = RateLimiter()
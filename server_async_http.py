@@ -0,0 +1,373 @@
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from access_log import log_writer
+from metrics import metrics_registry
+from config import load_config
+from ratelimit import rate_limiter
+from http import HttpServer, HttpRequest, RequestError, rate_limited_response, overload_response, DeadlineExceeded, TransferProgress, IoDeadlines, DEFAULT_DEADLINES, MAX_KEEP_ALIVE_REQUESTS, MAX_DISCARD_BODY_SIZE, THROTTLE_SEGMENT_SIZE, CONNECTION_CLOSE, CONNECTION_KEEP_ALIVE, LAST_CHUNK, chunk_buffers
+
+# Inisialisasi instance httpserver bersama untuk semua koneksi
+shared_http_server = HttpServer()
+
+# Batas ukuran blok header request
+MAX_HEADER_SIZE = 65536
+
+# Body file dikirim per segmen, setiap segmen harus selesai dalam write_timeout.
+# Segmen awal kecil, berikutnya diperbesar sesuai laju klien agar sendfile tidak terlalu sering dipanggil
+SENDFILE_SEGMENT_SIZE = 256 * 1024
+MAX_SENDFILE_SEGMENT_SIZE = 16 * 1024 * 1024
+
+# Ukuran maksimal potongan body upload yang diserahkan ke executor sekali jalan
+BODY_CHUNK_SIZE = 65536
+
+# Jumlah thread untuk I/O file (open, stat, tulis upload) di luar event loop, diisi dari konfigurasi
+file_io_workers = 0
+
+# Alamat yang sedang didengarkan, untuk status server
+listen_addresses = ''
+
+# Jumlah koneksi yang sedang dilayani
+active_connections = 0
+
+def print_with_timestamp(message, level="INFO"):
+    try:
+        current_task = asyncio.current_task()
+    except RuntimeError:
+        # Dipanggil di luar event loop
+        current_task = None
+    task_name = current_task.get_name() if current_task and level != "SERVER" else 'SERVER'
+    # Hanya enqueue, penulisan ke stdout dilakukan thread log secara batch
+    log_writer.log(message, task_name)
+
+async def with_deadline(awaitable, timeout, phase):
+    """Menjalankan operasi I/O dengan batas waktu, DeadlineExceeded jika terlewati"""
+    try:
+        if hasattr(asyncio, 'timeout'):
+            # Python 3.11+: cukup timer di task yang sama, tanpa membuat task baru seperti wait_for
+            async with asyncio.timeout(timeout):
+                return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(phase)
+
+async def drain_with_deadline(stream_writer, timeout):
+    """Menunggu buffer kirim berkurang, dibatasi timeout hanya jika masih ada data tertahan"""
+    if stream_writer.transport.get_write_buffer_size():
+        await with_deadline(stream_writer.drain(), timeout, 'write')
+    else:
+        await stream_writer.drain()
+
+class StreamBodyReader:
+    """Menjembatani body dari asyncio StreamReader ke handler sinkron di thread executor"""
+    def __init__(self, stream_reader, event_loop, deadlines):
+        self.stream_reader = stream_reader
+        self.event_loop = event_loop
+        self.deadlines = deadlines
+        self.body_progress = TransferProgress(deadlines)
+
+    def read_chunk(self, limit):
+        """Mengambil potongan body berikutnya, dipanggil dari thread executor"""
+        receive_chunk = with_deadline(self.stream_reader.read(limit), self.deadlines.body_timeout, 'body')
+        chunk = asyncio.run_coroutine_threadsafe(receive_chunk, self.event_loop).result()
+        if not chunk:
+            raise ConnectionError("Koneksi terputus sebelum body selesai diterima")
+        self.body_progress.add(len(chunk))
+        return chunk
+
+    def read_body(self, length):
+        """Membaca body lengkap sepanjang length, dipanggil dari thread executor"""
+        body = bytearray()
+        while len(body) < length:
+            try:
+                body += self.read_chunk(length - len(body))
+            except ConnectionError:
+                raise ConnectionError(f"Koneksi terputus setelah {len(body)} dari {length} byte body")
+        return body
+
+async def receive_body(stream_reader, http_request, body_consumer, deadlines, http_server=shared_http_server):
+    """Membaca body di event loop, hanya pemrosesan tiap potongan (I/O disk) yang dijalankan di executor"""
+    # Thread executor tidak menunggu klien, sehingga upload lambat tidak menahan request lain
+    event_loop = asyncio.get_running_loop()
+    body_progress = TransferProgress(deadlines)
+    try:
+        while http_request.body_remaining > 0 and body_consumer.response is None:
+            receive_chunk = stream_reader.read(min(BODY_CHUNK_SIZE, http_request.body_remaining))
+            chunk = await with_deadline(receive_chunk, deadlines.body_timeout, 'body')
+            if not chunk:
+                raise ConnectionError(f"Koneksi terputus dengan sisa {http_request.body_remaining} byte body")
+            body_progress.add(len(chunk))
+            http_request.body_remaining -= len(chunk)
+            await event_loop.run_in_executor(None, body_consumer.feed, chunk)
+        return await event_loop.run_in_executor(None, body_consumer.finish)
+    except (DeadlineExceeded, OSError, asyncio.IncompleteReadError):
+        # Klien lambat atau terputus diputus oleh HandleClient tanpa response
+        raise
+    except Exception as upload_error:
+        # Error lain tetap dijawab seperti handle_file_upload di jalur thread, lalu koneksi ditutup
+        if isinstance(upload_error, (RequestError, ValueError)):
+            http_response = http_server.response(400, 'Bad Request', 'Malformed upload data', {})
+        else:
+            http_response = http_server.response(500, 'Internal Server Error', f'Upload error: {str(upload_error)}', {})
+        http_response.close_connection = True
+        return http_response
+    finally:
+        # File sementara dari bagian yang belum selesai dibuang, juga saat klien diputus
+        body_consumer.abort()
+
+async def read_request_head(stream_reader, idle_timeout, header_timeout):
+    """Membaca blok header request, None jika koneksi ditutup"""
+    # Pada keep-alive byte pertama ditunggu selama idle_timeout, sisa header dibatasi header_timeout
+    first_byte = b''
+    if idle_timeout is not None:
+        first_byte = await with_deadline(stream_reader.read(1), idle_timeout, 'idle')
+        if not first_byte:
+            return None
+    try:
+        head = await with_deadline(stream_reader.readuntil(b'\r\n\r\n'), header_timeout, 'header')
+        return first_byte + head[:-4]
+    except asyncio.IncompleteReadError as read_error:
+        # Klien menutup sisi kirim tanpa baris kosong, anggap header selesai
+        return (first_byte + read_error.partial).rstrip(b'\r\n') or None
+    except asyncio.LimitOverrunError:
+        raise RequestError(431, 'Request Header Fields Too Large')
+
+async def send_response(stream_writer, http_response, keep_alive, deadlines=DEFAULT_DEADLINES, throttle=None):
+    """Mengirim response tanpa memblokir event loop, body file dengan sendfile"""
+    # throttle(byte_count), jika ada, di-await sebelum setiap potongan sesuai batas laju klien
+    connection_line = CONNECTION_KEEP_ALIVE if keep_alive and not http_response.close_connection else CONNECTION_CLOSE
+    try:
+        stream_writer.writelines([*http_response.header_buffers, connection_line])
+        http_response.sent_bytes = http_response.header_size() + len(connection_line)
+        if http_response.chunks is not None:
+            # Potongan dikirim begitu dibuat, drain menahan generator jika klien lambat
+            for chunk in http_response.chunks:
+                if not chunk:
+                    continue
+                chunk_data = chunk_buffers(chunk) if http_response.chunked else [chunk]
+                if throttle is not None:
+                    await throttle(sum(len(chunk_part) for chunk_part in chunk_data))
+                stream_writer.writelines(chunk_data)
+                http_response.sent_bytes += sum(len(chunk_part) for chunk_part in chunk_data)
+                await drain_with_deadline(stream_writer, deadlines.write_timeout)
+            if http_response.chunked:
+                stream_writer.write(LAST_CHUNK)
+                http_response.sent_bytes += len(LAST_CHUNK)
+        elif http_response.file is not None:
+            if http_response.count:
+                await drain_with_deadline(stream_writer, deadlines.write_timeout)
+                event_loop = asyncio.get_running_loop()
+                segment_offset = http_response.offset
+                segment_end = http_response.offset + http_response.count
+                # Dengan batas laju byte, segmen tetap kecil agar jeda tersebar sepanjang transfer
+                segment_limit = SENDFILE_SEGMENT_SIZE if throttle is None else THROTTLE_SEGMENT_SIZE
+                while segment_offset < segment_end:
+                    # sendfile tidak melaporkan kemajuan, jadi batas waktu diterapkan per segmen
+                    segment_size = min(segment_limit, segment_end - segment_offset)
+                    if throttle is not None:
+                        await throttle(segment_size)
+                    segment_start = time.monotonic()
+                    send_segment = event_loop.sendfile(stream_writer.transport, http_response.file, segment_offset, segment_size)
+                    segment_sent = await with_deadline(send_segment, deadlines.write_timeout, 'write')
+                    if not segment_sent:
+                        break
+                    segment_offset += segment_sent
+                    http_response.sent_bytes += segment_sent
+                    if throttle is not None:
+                        continue
+                    # Segmen berikutnya cukup untuk seperempat write_timeout pada laju yang baru terukur
+                    segment_rate = segment_sent / max(time.monotonic() - segment_start, 0.001)
+                    segment_limit = int(min(max(segment_rate * deadlines.write_timeout / 4, SENDFILE_SEGMENT_SIZE), MAX_SENDFILE_SEGMENT_SIZE))
+        elif http_response.body:
+            if throttle is not None:
+                await throttle(len(http_response.body))
+            stream_writer.write(http_response.body)
+            http_response.sent_bytes += len(http_response.body)
+        await drain_with_deadline(stream_writer, deadlines.write_timeout)
+    finally:
+        http_response.close()
+
+async def HandleClient(stream_reader, stream_writer, http_server=shared_http_server, deadlines=DEFAULT_DEADLINES, max_in_flight=None, retry_after=1):
+    """Melayani satu koneksi klien sebagai coroutine di event loop"""
+    global active_connections
+    client_address = stream_writer.get_extra_info('peername')
+    client_label = f"{client_address[0]}:{client_address[1]}"
+    client_ip = client_address[0]
+    event_loop = asyncio.get_running_loop()
+
+    # Menolak dengan 503 jika koneksi yang dilayani sudah mencapai batas
+    if max_in_flight is not None and active_connections >= max_in_flight:
+        print_with_timestamp(f"Server penuh, menolak {client_label}", "WARNING")
+        try:
+            await send_response(stream_writer, overload_response(http_server, retry_after), False, deadlines)
+        except (OSError, DeadlineExceeded):
+            pass
+        finally:
+            stream_writer.close()
+        return
+
+    active_connections += 1
+
+    async def limit_bandwidth(byte_count):
+        # Semua koneksi dari IP yang sama berbagi satu bucket byte
+        delay = rate_limiter.consume(client_ip, byte_count)
+        if delay:
+            metrics_registry.throttled(delay)
+            await asyncio.sleep(delay)
+
+    if rate_limiter.byte_rate:
+        throttle = limit_bandwidth
+    else:
+        throttle = None
+    metrics_registry.set_connections(active_connections, file_io_workers)
+
+    try:
+        print_with_timestamp(f"Memproses klien {client_label}", "CLIENT")
+        handled_requests = 0
+        while handled_requests < MAX_KEEP_ALIVE_REQUESTS:
+            try:
+                # Request pertama dibatasi header_timeout sejak diterima, request berikutnya oleh idle timeout
+                request_head = await read_request_head(stream_reader, deadlines.idle_timeout if handled_requests else None, deadlines.header_timeout)
+                if request_head is None:
+                    if not handled_requests:
+                        print_with_timestamp(f"Koneksi ditutup oleh {client_label}", "WARNING")
+                    break
+                http_request = HttpRequest.parse(request_head)
+                body_length = http_request.content_length()
+            except RequestError as request_error:
+                print_with_timestamp(f"Request tidak valid dari {client_label}: {request_error}", "WARNING")
+                await send_response(stream_writer, http_server.response(request_error.kode, request_error.message, '', {}), False, deadlines)
+                break
+
+            handled_requests += 1
+            request_start = time.monotonic()
+
+            # Body dibaca oleh handler dari thread executor sesuai kebutuhan
+            http_request.body_reader = StreamBodyReader(stream_reader, event_loop, deadlines)
+            http_request.body_remaining = body_length
+
+            # Klien yang melewati batas request mendapat 429 tanpa menjalankan handler
+            retry_after = rate_limiter.admit(client_ip) if rate_limiter.request_rate else 0
+            if retry_after:
+                print_with_timestamp(f"Batas request {client_label} terlampaui, 429", "WARNING")
+                http_response = rate_limited_response(http_server, retry_after)
+            else:
+                body_consumer = http_server.body_consumer(http_request)
+                if body_consumer is not None:
+                    http_response = await receive_body(stream_reader, http_request, body_consumer, deadlines, http_server)
+                else:
+                    # Handler (termasuk I/O file) dijalankan di executor agar event loop tidak terblokir
+                    http_response = await event_loop.run_in_executor(None, http_server.proses, http_request)
+
+            keep_alive = http_request.wants_keep_alive() and handled_requests < MAX_KEEP_ALIVE_REQUESTS
+            if keep_alive and http_request.body_reader is not None and http_request.body_remaining:
+                # Membuang sisa body yang tidak dibaca handler agar koneksi bisa dipakai lagi
+                if http_request.body_remaining > MAX_DISCARD_BODY_SIZE:
+                    keep_alive = False
+                else:
+                    await with_deadline(stream_reader.readexactly(http_request.body_remaining), deadlines.body_timeout, 'body')
+                    http_request.body_remaining = 0
+
+            await send_response(stream_writer, http_response, keep_alive, deadlines, throttle)
+            request_latency = time.monotonic() - request_start
+            log_writer.access(client_address, http_request, http_response, request_latency)
+            metrics_registry.observe(client_address, http_request, http_response, request_latency)
+            if not keep_alive or http_response.close_connection:
+                break
+
+    except DeadlineExceeded as deadline_error:
+        if deadline_error.phase == 'idle':
+            print_with_timestamp(f"Koneksi {client_label} idle, ditutup", "INFO")
+        else:
+            print_with_timestamp(f"Koneksi {client_label} tidak ada kemajuan ({deadline_error}), diputus", "WARNING")
+        metrics_registry.reaped(deadline_error.phase)
+    except (OSError, asyncio.IncompleteReadError) as network_error:
+        print_with_timestamp(f"Error koneksi dengan {client_label}: {network_error}", "ERROR")
+    except Exception as process_error:
+        print_with_timestamp(f"Error dalam HandleClient untuk {client_label}: {process_error}", "ERROR")
+    finally:
+        active_connections -= 1
+        metrics_registry.set_connections(active_connections, file_io_workers)
+        stream_writer.close()
+        print_with_timestamp(f"Selesai menangani {client_label}", "SUCCESS")
+
+def print_server_status():
+    """Menampilkan status server secara berkala"""
+    log_writer.write(
+        f"\n{'='*60}\n"
+        f"SERVER STATUS - {datetime.now().strftime('%H:%M:%S')}\n"
+        f"Active Connections: {active_connections}\n"
+        f"Listening on: {listen_addresses}\n"
+        f"{'='*60}\n\n"
+    )
+
+async def report_status():
+    """Menampilkan status server setiap 30 detik jika ada koneksi aktif"""
+    while True:
+        await asyncio.sleep(30)
+        if active_connections:
+            print_server_status()
+
+def configure_executor(event_loop, thread_count):
+    """Memasang thread pool untuk I/O file sebagai executor default event loop"""
+    global file_io_workers
+    file_io_workers = thread_count
+    event_loop.set_default_executor(ThreadPoolExecutor(max_workers=thread_count))
+
+def site_handler(document_root, server_config):
+    """Handler koneksi yang terikat ke HttpServer untuk document root tertentu"""
+    site_server = HttpServer(document_root, server_config.handlers, server_config.storage)
+    return functools.partial(HandleClient, http_server=site_server, deadlines=IoDeadlines.from_config(server_config),
+                             max_in_flight=server_config.max_in_flight, retry_after=server_config.retry_after)
+
+async def RunServer(server_config):
+    global listen_addresses
+    configure_executor(asyncio.get_running_loop(), server_config.threads)
+    # Batas request dan byte per IP klien untuk semua koneksi di event loop
+    rate_limiter.configure_from(server_config)
+    # Format dan sampling access log dari konfigurasi, diatur sebelum worker dibuat
+    log_writer.configure_from(server_config)
+
+    # Satu server asyncio per site, masing-masing dengan document root sendiri
+    async_servers = []
+    for site_address, document_root in server_config.addresses():
+        async_servers.append(await asyncio.start_server(site_handler(document_root, server_config), site_address[0], site_address[1],
+                                                        limit=MAX_HEADER_SIZE, reuse_address=True, backlog=server_config.listen_backlog))
+        print_with_timestamp(f"Async HTTP Server aktif di port {site_address[1]} (root {document_root})", "SERVER")
+    listen_addresses = ', '.join(f"{site_address[0]}:{site_address[1]}" for site_address, _ in server_config.addresses())
+
+    status_task = asyncio.create_task(report_status())
+    try:
+        await asyncio.gather(*(async_server.serve_forever() for async_server in async_servers))
+    finally:
+        status_task.cancel()
+        for async_server in async_servers:
+            async_server.close()
+
+def LaunchServer(server_config=None):
+    if server_config is None:
+        server_config = load_config('async', [])
+    print_with_timestamp("Menginisialisasi Async HTTP Server...", "SERVER")
+    try:
+        asyncio.run(RunServer(server_config))
+    except KeyboardInterrupt:
+        print_with_timestamp("Sinyal interrupt diterima. Mematikan server...", "WARNING")
+    except Exception as server_error:
+        print_with_timestamp(f"Error server terjadi: {server_error}", "ERROR")
+    finally:
+        print_with_timestamp("Server telah dimatikan dengan aman", "SERVER")
+        log_writer.flush()
+
+        # Footer penutup
+        print("\n" + "="*60)
+        print("HTTP Async Server - STOPPED")
+        print("Terima kasih telah menggunakan server ini!")
+        print("="*60)
+
+def start_application():
+    LaunchServer(load_config('async', description="Async HTTP Server"))
+
+if __name__ == "__main__":
+    start_application()
@@ -0,0 +1,195 @@
+import socket
+import os
+import sys
+import time
+import signal
+import asyncio
+import selectors
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import server_thread_pool_http
+import server_async_http
+from access_log import log_writer
+from metrics import metrics_registry
+from config import load_config
+from ratelimit import rate_limiter
+from http import HttpServer, InFlightTracker, IoDeadlines, send_overload_response, create_listener
+
+# Mode worker yang didukung: 'thread' (thread pool) atau 'async' (event loop asyncio)
+WORKER_MODES = ('thread', 'async')
+
+# Worker yang berhenti kurang dari sekian detik setelah dijalankan dianggap gagal start
+WORKER_MIN_UPTIME = 5
+# Setelah sekian kali gagal start berturut-turut, server berhenti dengan error alih-alih menjalankan ulang terus
+MAX_FAILED_STARTS = 5
+
+def print_with_timestamp(message, level="INFO"):
+    # Hanya enqueue, penulisan ke stdout dilakukan thread log secara batch
+    log_writer.log(message, 'SERVER' if level == "SERVER" else os.getpid())
+
+def run_thread_worker(sites, server_config):
+    """Loop accept worker dengan thread pool sendiri, satu selector untuk semua listener site"""
+    connection_selector = selectors.DefaultSelector()
+    for listener, document_root in sites:
+        connection_selector.register(listener, selectors.EVENT_READ, HttpServer(document_root, server_config.handlers, server_config.storage))
+    deadlines = IoDeadlines.from_config(server_config)
+    active_futures = InFlightTracker(server_config.max_in_flight, lambda error: print_with_timestamp(f"Task thread gagal: {error}", "ERROR"),
+                                     lambda active_count: metrics_registry.set_connections(active_count, server_config.threads))
+    with ThreadPoolExecutor(max_workers=server_config.threads) as executor:
+        while True:
+            for selector_key, _ in connection_selector.select():
+                try:
+                    connection, address = selector_key.fileobj.accept()
+                except BlockingIOError:
+                    # Koneksi sudah diambil worker lain yang berbagi listener
+                    continue
+                if active_futures.is_full():
+                    send_overload_response(selector_key.data, connection, server_config.retry_after)
+                    continue
+                active_futures.track(executor.submit(server_thread_pool_http.ProcessClientInThread, connection, address, selector_key.data, deadlines))
+
+def run_async_worker(sites, server_config):
+    """Event loop asyncio worker di atas socket listening miliknya"""
+    async def serve():
+        server_async_http.configure_executor(asyncio.get_running_loop(), server_config.threads)
+        async_servers = []
+        for listener, document_root in sites:
+            async_servers.append(await asyncio.start_server(server_async_http.site_handler(document_root, server_config), sock=listener, limit=server_async_http.MAX_HEADER_SIZE))
+        await asyncio.gather(*(async_server.serve_forever() for async_server in async_servers))
+
+    asyncio.run(serve())
+
+def WorkerProcess(worker_number, inherited_listeners, server_config):
+    """Proses worker: accept dan melayani koneksi secara independen dari worker lain"""
+    # Sinyal interrupt ditangani oleh proses induk
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Dengan spawn, log writer di proses ini dibuat ulang dari import sehingga perlu diatur lagi
+    log_writer.configure_from(server_config)
+
+    if inherited_listeners is None:
+        listeners = [create_listener(site_address, server_config.listen_backlog, True) for site_address, _ in server_config.addresses()]
+    else:
+        listeners = inherited_listeners
+    sites = [(listener, document_root) for listener, (_, document_root) in zip(listeners, server_config.addresses())]
+    print_with_timestamp(f"Worker {worker_number} ({server_config.worker_mode}) siap menerima koneksi", "INFO")
+    try:
+        if server_config.worker_mode == 'async':
+            run_async_worker(sites, server_config)
+        else:
+            run_thread_worker(sites, server_config)
+    finally:
+        for listener in listeners:
+            listener.close()
+
+def check_addresses(server_config):
+    """Memastikan semua alamat site bisa di-bind sebelum worker di-fork"""
+    for site_address, _ in server_config.addresses():
+        # Hanya bind tanpa listen, sehingga proses induk tidak ikut menerima koneksi dari grup SO_REUSEPORT
+        probe_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probe_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            probe_socket.bind(site_address)
+        except (OSError, OverflowError) as bind_error:
+            raise SystemExit(f"Tidak bisa bind ke {site_address[0]}:{site_address[1]}: {bind_error}")
+        finally:
+            probe_socket.close()
+
+def LaunchServer(server_config=None):
+    if server_config is None:
+        server_config = load_config('prefork', [])
+    if server_config.worker_mode not in WORKER_MODES:
+        raise SystemExit(f"Mode worker tidak dikenal: {server_config.worker_mode} (pilih {', '.join(WORKER_MODES)})")
+    print_with_timestamp("Menginisialisasi Pre-fork HTTP Server...", "SERVER")
+
+    # Dengan SO_REUSEPORT kernel membagi koneksi ke listener tiap worker,
+    # tanpa itu semua worker mewarisi socket listening dari induk
+    reuse_port = hasattr(socket, 'SO_REUSEPORT')
+    shared_listeners = None
+    if reuse_port:
+        # Alamat yang tidak valid atau sudah dipakai ketahuan di sini, bukan sebagai worker yang terus mati
+        check_addresses(server_config)
+    else:
+        try:
+            shared_listeners = [create_listener(site_address, server_config.listen_backlog) for site_address, _ in server_config.addresses()]
+        except (OSError, OverflowError) as bind_error:
+            raise SystemExit(f"Tidak bisa membuka listener: {bind_error}")
+        # Beberapa worker menunggu listener yang sama, accept tidak boleh memblokir
+        for shared_listener in shared_listeners:
+            shared_listener.setblocking(False)
+
+    if sys.platform != 'win32':
+        process_context = multiprocessing.get_context('fork')
+    else:
+        process_context = multiprocessing.get_context('spawn')
+
+    # Batas per IP klien diatur sebelum fork, bucket di shared memory dipakai bersama semua worker
+    rate_limiter.configure_from(server_config)
+    # Format dan sampling access log dari konfigurasi, diatur sebelum worker dibuat
+    log_writer.configure_from(server_config)
+    # Slot metrics untuk setiap worker ditambah proses induk dan pengganti worker yang mati
+    metrics_registry.reserve(server_config.workers * 2 + 1)
+
+    workers = {}
+    worker_started = {}
+    failed_starts = 0
+
+    def spawn_worker(worker_number):
+        worker = process_context.Process(target=WorkerProcess, args=(worker_number, shared_listeners, server_config), daemon=True)
+        worker.start()
+        workers[worker_number] = worker
+        worker_started[worker_number] = time.monotonic()
+
+    for worker_number in range(server_config.workers):
+        spawn_worker(worker_number)
+
+    listen_mode = "SO_REUSEPORT" if reuse_port else "listener bersama"
+    listen_ports = ', '.join(str(site_address[1]) for site_address, _ in server_config.addresses())
+    print_with_timestamp(f"Pre-fork HTTP Server aktif di port {listen_ports} dengan {server_config.workers} worker ({listen_mode})", "SERVER")
+    print_with_timestamp(f"Main Process ID: {os.getpid()}", "SERVER")
+
+    try:
+        while True:
+            time.sleep(1)
+            # Menjalankan ulang worker yang berhenti
+            for worker_number, worker in list(workers.items()):
+                if not worker.is_alive():
+                    # Hanya kematian beruntun tepat setelah start yang dihitung, worker yang sempat berjalan mereset hitungan
+                    if time.monotonic() - worker_started[worker_number] < WORKER_MIN_UPTIME:
+                        failed_starts += 1
+                    else:
+                        failed_starts = 0
+                    if failed_starts >= MAX_FAILED_STARTS:
+                        print_with_timestamp(f"Worker {worker_number} berhenti (exit code {worker.exitcode}) dan {failed_starts} worker gagal start berturut-turut, server dihentikan", "ERROR")
+                        raise SystemExit(1)
+                    print_with_timestamp(f"Worker {worker_number} berhenti (exit code {worker.exitcode}), dijalankan ulang", "WARNING")
+                    spawn_worker(worker_number)
+
+    except KeyboardInterrupt:
+        print_with_timestamp("Sinyal interrupt diterima. Mematikan server...", "WARNING")
+
+    except Exception as server_error:
+        print_with_timestamp(f"Error server terjadi: {server_error}", "ERROR")
+
+    finally:
+        for worker in workers.values():
+            worker.terminate()
+        for worker in workers.values():
+            worker.join(timeout=10)
+
+        for shared_listener in shared_listeners or []:
+            shared_listener.close()
+        print_with_timestamp("Server telah dimatikan dengan aman", "SERVER")
+        log_writer.flush()
+
+        # Footer penutup
+        print("\n" + "="*60)
+        print("HTTP Pre-fork Server - STOPPED")
+        print("Terima kasih telah menggunakan server ini!")
+        print("="*60)
+
+def start_application():
+    LaunchServer(load_config('prefork', description="Pre-fork HTTP Server"))
+
+if __name__ == "__main__":
+    start_application()
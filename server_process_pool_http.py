@@ -1,87 +1,47 @@
 from socket import *
 import socket
+import os
 import time
 import sys
 import logging
 import multiprocessing
+import selectors
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from http import HttpServer
+from access_log import log_writer
+from metrics import metrics_registry
+from config import load_config
+from ratelimit import rate_limiter
+from http import HttpServer, InFlightTracker, IoDeadlines, serve_connection, send_overload_response, create_listener
 
 # Inisialisasi instance server HTTP global
 http_server_instance = HttpServer()
 
+# HttpServer per site (document root, modul route dan storage) di setiap proses worker, dibuat sekali agar indeks dan cache terpakai ulang
+worker_http_servers = {}
+
 def print_with_timestamp(message, level="INFO"):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    process_id = multiprocessing.current_process().pid
-    
-    if level == "INFO":
-        print(f"[{timestamp}] [{process_id:>8}] {message}")
-    elif level == "SUCCESS":
-        print(f"[{timestamp}] [{process_id:>8}] {message}")
-    elif level == "ERROR":
-        print(f"[{timestamp}] [{process_id:>8}] {message}")
-    elif level == "WARNING":
-        print(f"[{timestamp}] [{process_id:>8}] {message}")
-    elif level == "SERVER":
-        print(f"[{timestamp}] [{'SERVER':>8}] {message}")
-    elif level == "CLIENT":
-        print(f"[{timestamp}] [{process_id:>8}] {message}")
+    # Hanya enqueue, penulisan ke stdout dilakukan thread log secara batch
+    label = 'SERVER' if level == "SERVER" else multiprocessing.current_process().pid
+    log_writer.log(message, label)
 
 def ProcessClientConnection(connection_info):
     """Menangani permintaan klien dalam proses terpisah - menerima data koneksi"""
-    client_socket, client_address = connection_info
+    client_socket, client_address, site, deadlines = connection_info
     
     try:
         print_with_timestamp(f"Memproses klien {client_address[0]}:{client_address[1]}", "CLIENT")
         
-        # Membuat instance HttpServer baru untuk proses worker
-        worker_http_server = HttpServer()
+        # Instance HttpServer milik proses worker untuk site ini
+        worker_http_server = worker_http_servers.get(site)
+        if worker_http_server is None:
+            worker_http_server = worker_http_servers[site] = HttpServer(*site)
         
-        request_buffer = ""
-        while True:
-            try:
-                raw_data = client_socket.recv(4096)  # Buffer yang diperbesar untuk transfer file
-                if raw_data:
-                    # Mengubah bytes menjadi string untuk pemrosesan request
-                    text_data = raw_data.decode('utf-8', errors='ignore')
-                    request_buffer += text_data
-                    
-                    # Memverifikasi bahwa request HTTP lengkap telah diterima
-                    if '\r\n\r\n' in request_buffer:
-                        # Ekstrak method dan path untuk logging
-                        first_line = request_buffer.split('\r\n')[0]
-                        method_path = first_line.split(' ')[:2] if len(first_line.split(' ')) >= 2 else ['UNKNOWN', '/']
-                        
-                        print_with_timestamp(f"{client_address[0]}:{client_address[1]} → {method_path[0]} {method_path[1]}", "INFO")
-                        
-                        # Menangani request yang lengkap
-                        server_response = worker_http_server.proses(request_buffer)
-                        # Mengirim response kembali
-                        client_socket.sendall(server_response)
-                        
-                        print_with_timestamp(f"Response dikirim ke {client_address[0]}:{client_address[1]}", "SUCCESS")
-                        break
-                    elif request_buffer.endswith('\r\n') and 'GET' in request_buffer and 'HTTP' in request_buffer:
-                        # Ekstrak method dan path untuk logging
-                        first_line = request_buffer.split('\r\n')[0]
-                        method_path = first_line.split(' ')[:2] if len(first_line.split(' ')) >= 2 else ['UNKNOWN', '/']
-                        
-                        print_with_timestamp(f"{client_address[0]}:{client_address[1]} → {method_path[0]} {method_path[1]}", "INFO")
-                        
-                        # Menangani request GET sederhana
-                        server_response = worker_http_server.proses(request_buffer)
-                        client_socket.sendall(server_response)
-                        
-                        print_with_timestamp(f"Response dikirim ke {client_address[0]}:{client_address[1]}", "SUCCESS")
-                        break
-                else:
-                    # Koneksi ditutup oleh klien
-                    print_with_timestamp(f"Koneksi ditutup oleh {client_address[0]}:{client_address[1]}", "WARNING")
-                    break
-            except OSError as network_error:
-                print_with_timestamp(f"Error koneksi dengan {client_address[0]}:{client_address[1]}: {network_error}", "ERROR")
-                break
+        try:
+            # Melayani request berurutan selama koneksi keep-alive
+            serve_connection(worker_http_server, client_socket, client_address, print_with_timestamp, (log_writer.access, metrics_registry.observe), deadlines, rate_limiter=rate_limiter)
+        except OSError as network_error:
+            print_with_timestamp(f"Error koneksi dengan {client_address[0]}:{client_address[1]}: {network_error}", "ERROR")
         
         client_socket.close()
         print_with_timestamp(f"Selesai menangani {client_address[0]}:{client_address[1]}", "SUCCESS")
@@ -93,56 +53,74 @@ def ProcessClientConnection(connection_info):
             client_socket.close()
         return f"Error menangani {client_address}: {str(handling_error)}"
 
-def print_server_status(active_processes):
+def print_server_status(active_processes, listen_addresses):
     """Menampilkan status server secara berkala"""
-    print(f"\n{'='*60}")
-    print(f"SERVER STATUS - {datetime.now().strftime('%H:%M:%S')}")
-    print(f"Active Processes: {active_processes}")
-    print(f"Listening on: 172.16.16.101:8885")
-    print(f"{'='*60}\n")
+    log_writer.write(
+        f"\n{'='*60}\n"
+        f"SERVER STATUS - {datetime.now().strftime('%H:%M:%S')}\n"
+        f"Active Processes: {active_processes}\n"
+        f"Listening on: {listen_addresses}\n"
+        f"{'='*60}\n\n"
+    )
 
-def InitializeServer():
+def InitializeServer(server_config=None):
+    if server_config is None:
+        server_config = load_config('process', [])
     print_with_timestamp("Menginisialisasi Process Pool HTTP Server...", "SERVER")
     
-    main_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    main_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    main_socket.bind(('172.16.16.101', 8885))
-    main_socket.listen(10)
+    # Satu socket listening per site; pengaturan site ikut dikirim ke proses worker
+    connection_selector = selectors.DefaultSelector()
+    listeners = []
+    for site_address, document_root in server_config.addresses():
+        listener = create_listener(site_address, server_config.listen_backlog)
+        listeners.append(listener)
+        connection_selector.register(listener, selectors.EVENT_READ, (document_root, server_config.handlers, server_config.storage))
+        print_with_timestamp(f"Process Pool HTTP Server aktif di port {site_address[1]} (root {document_root})", "SERVER")
+    listen_addresses = ', '.join(f"{site_address[0]}:{site_address[1]}" for site_address, _ in server_config.addresses())
+    # Batas waktu I/O agar klien yang diam tidak menahan proses worker
+    deadlines = IoDeadlines.from_config(server_config)
+    # Batas per IP klien; bucket di shared memory sehingga dihitung bersama oleh semua proses worker
+    rate_limiter.configure_from(server_config)
+    # Format dan sampling access log dari konfigurasi, diatur sebelum worker dibuat
+    log_writer.configure_from(server_config)
+    # Slot metrics untuk setiap proses worker ditambah proses induk dan pengganti worker yang mati
+    metrics_registry.reserve(server_config.workers * 2 + 1)
     
-    print_with_timestamp("Process Pool HTTP Server aktif di port 8885", "SERVER")
     print_with_timestamp(f"Main Process ID: {multiprocessing.current_process().pid}", "SERVER")
     
-    # Menyimpan daftar future yang sedang aktif untuk manajemen
-    active_tasks = []
+    # Menyimpan future yang sedang aktif, dilepas otomatis saat selesai
+    active_tasks = InFlightTracker(server_config.max_in_flight, lambda error: print_with_timestamp(f"Task process gagal: {error}", "ERROR"),
+                                   lambda active_count: metrics_registry.set_connections(active_count, server_config.workers))
     last_status_time = time.time()
     
-    with ProcessPoolExecutor(max_workers=4) as executor:
+    with ProcessPoolExecutor(max_workers=server_config.workers) as executor:
+        # Worker di-fork sebelum accept pertama agar tidak mewarisi socket klien dari proses induk
+        executor.submit(os.getpid).result()
         try:
             while True:
                 # Menampilkan status server setiap 30 detik jika ada aktivitas
                 current_time = time.time()
                 if current_time - last_status_time > 30 and active_tasks:
-                    print_server_status(len(active_tasks))
+                    print_server_status(len(active_tasks), listen_addresses)
                     last_status_time = current_time
                 
-                connection, address = main_socket.accept()
-                print_with_timestamp(f"Koneksi baru diterima dari {address[0]}:{address[1]}", "SERVER")
-                
-                # Menghapus future yang sudah selesai dari tracking
-                completed_tasks = [task for task in active_tasks if task.done()]
-                for completed_task in completed_tasks:
-                    try:
-                        result = completed_task.result()
-                        # Hasil sudah di-log di ProcessClientConnection, tidak perlu log lagi
-                    except Exception as error:
-                        print_with_timestamp(f"Task process gagal: {error}", "ERROR")
-                    active_tasks.remove(completed_task)
-                
-                # Menambahkan task baru ke process pool
-                future_task = executor.submit(ProcessClientConnection, (connection, address))
-                active_tasks.append(future_task)
-                
-                print_with_timestamp(f"Process aktif: {len(active_tasks)}", "INFO")
+                for selector_key, _ in connection_selector.select():
+                    connection, address = selector_key.fileobj.accept()
+                    print_with_timestamp(f"Koneksi baru diterima dari {address[0]}:{address[1]}", "SERVER")
+                    
+                    # Menolak dengan 503 jika koneksi yang dilayani sudah mencapai batas
+                    if active_tasks.is_full():
+                        print_with_timestamp(f"Server penuh, menolak {address[0]}:{address[1]}", "WARNING")
+                        send_overload_response(http_server_instance, connection, server_config.retry_after)
+                        continue
+                    
+                    # Menambahkan task baru ke process pool
+                    future_task = executor.submit(ProcessClientConnection, (connection, address, selector_key.data, deadlines))
+                    # Salinan socket di proses induk ditutup setelah worker selesai, agar klien menerima EOF
+                    future_task.add_done_callback(lambda _, connection=connection: connection.close())
+                    active_tasks.track(future_task)
+                    
+                    print_with_timestamp(f"Process aktif: {len(active_tasks)}", "INFO")
                 
         except KeyboardInterrupt:
             print_with_timestamp("Sinyal interrupt diterima. Mematikan server...", "WARNING")
@@ -152,7 +130,7 @@ def InitializeServer():
             if active_tasks:
                 print_with_timestamp(f"Menunggu {len(active_tasks)} process aktif untuk selesai...", "INFO")
                 try:
-                    for done_future in as_completed(active_tasks, timeout=10):
+                    for done_future in as_completed(active_tasks.snapshot(), timeout=10):
                         try:
                             final_result = done_future.result()
                             # Hasil sudah di-log di ProcessClientConnection
@@ -165,8 +143,11 @@ def InitializeServer():
             print_with_timestamp(f"Server mengalami error: {error}", "ERROR")
         finally:
             print_with_timestamp("Menutup socket server...", "SERVER")
-            main_socket.close()
+            connection_selector.close()
+            for listener in listeners:
+                listener.close()
             print_with_timestamp("Server telah dimatikan dengan aman", "SERVER")
+            log_writer.flush()
             
             # Footer penutup
             print("\n" + "="*60)
@@ -182,7 +163,7 @@ def main_execution():
         else:
             multiprocessing.set_start_method('spawn', force=True)
     
-    InitializeServer()
+    InitializeServer(load_config('process', description="Process Pool HTTP Server"))
 
 if __name__ == "__main__":
     main_execution()
\ No newline at end of file
@@ -4,82 +4,33 @@ import time
 import sys
 import logging
 import threading
+import selectors
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from http import HttpServer
+from access_log import log_writer
+from metrics import metrics_registry
+from config import load_config
+from ratelimit import rate_limiter
+from http import HttpServer, InFlightTracker, IoDeadlines, DEFAULT_DEADLINES, serve_connection, send_overload_response, create_listener
 
 # Inisialisasi instance httpserver bersama (thread-safe karena thread berbagi memori)
 shared_http_server = HttpServer()
 
-# Lock untuk output yang thread-safe
-output_lock = threading.Lock()
-
 def print_with_timestamp(message, level="INFO"):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    thread_id = threading.current_thread().ident
-    
-    with output_lock:
-        if level == "INFO":
-            print(f"[{timestamp}] [{thread_id:>8}] {message}")
-        elif level == "SUCCESS":
-            print(f"[{timestamp}] [{thread_id:>8}] {message}")
-        elif level == "ERROR":
-            print(f"[{timestamp}] [{thread_id:>8}] {message}")
-        elif level == "WARNING":
-            print(f"[{timestamp}] [{thread_id:>8}] {message}")
-        elif level == "SERVER":
-            print(f"[{timestamp}] [{'SERVER':>8}] {message}")
-        elif level == "CLIENT":
-            print(f"[{timestamp}] [{thread_id:>8}] {message}")
+    # Hanya enqueue, penulisan ke stdout dilakukan thread log secara batch
+    label = 'SERVER' if level == "SERVER" else threading.current_thread().ident
+    log_writer.log(message, label)
 
-def ProcessClientInThread(client_socket, client_address):
+def ProcessClientInThread(client_socket, client_address, http_server=shared_http_server, deadlines=DEFAULT_DEADLINES):
     """Menangani permintaan klien dalam thread terpisah"""
     try:
         print_with_timestamp(f"Memproses klien {client_address[0]}:{client_address[1]}", "CLIENT")
         
-        data_buffer = ""
-        while True:
-            try:
-                received_bytes = client_socket.recv(4096)  # Buffer yang diperbesar untuk upload
-                if received_bytes:
-                    # Mengubah bytes menjadi string untuk penanganan request
-                    request_text = received_bytes.decode('utf-8', errors='ignore')  # Menangani data binary dengan baik
-                    data_buffer = data_buffer + request_text
-                    
-                    # Mendeteksi request HTTP yang lengkap
-                    if '\r\n\r\n' in data_buffer:
-                        # Ekstrak method dan path untuk logging
-                        first_line = data_buffer.split('\r\n')[0]
-                        method_path = first_line.split(' ')[:2] if len(first_line.split(' ')) >= 2 else ['UNKNOWN', '/']
-                        
-                        print_with_timestamp(f"{client_address[0]}:{client_address[1]} → {method_path[0]} {method_path[1]}", "INFO")
-                        
-                        # Request HTTP lengkap diterima, proses
-                        http_response = shared_http_server.proses(data_buffer)
-                        client_socket.sendall(http_response)
-                        
-                        print_with_timestamp(f"Response dikirim ke {client_address[0]}:{client_address[1]}", "SUCCESS")
-                        break
-                    elif data_buffer.endswith('\r\n') and ('GET' in data_buffer or 'POST' in data_buffer or 'DELETE' in data_buffer) and 'HTTP' in data_buffer:
-                        # Ekstrak method dan path untuk logging
-                        first_line = data_buffer.split('\r\n')[0]
-                        method_path = first_line.split(' ')[:2] if len(first_line.split(' ')) >= 2 else ['UNKNOWN', '/']
-                        
-                        print_with_timestamp(f"{client_address[0]}:{client_address[1]} → {method_path[0]} {method_path[1]}", "INFO")
-                        
-                        # Menangani request sederhana (seperti GET /files)
-                        http_response = shared_http_server.proses(data_buffer)
-                        client_socket.sendall(http_response)
-                        
-                        print_with_timestamp(f"Response dikirim ke {client_address[0]}:{client_address[1]}", "SUCCESS")
-                        break
-                else:
-                    # Koneksi ditutup oleh klien
-                    print_with_timestamp(f"Koneksi ditutup oleh {client_address[0]}:{client_address[1]}", "WARNING")
-                    break
-            except OSError as network_error:
-                print_with_timestamp(f"Error koneksi dengan {client_address[0]}:{client_address[1]}: {network_error}", "ERROR")
-                break
+        try:
+            # Melayani request berurutan selama koneksi keep-alive
+            serve_connection(http_server, client_socket, client_address, print_with_timestamp, (log_writer.access, metrics_registry.observe), deadlines, rate_limiter=rate_limiter)
+        except OSError as network_error:
+            print_with_timestamp(f"Error koneksi dengan {client_address[0]}:{client_address[1]}: {network_error}", "ERROR")
         
         client_socket.close()
         print_with_timestamp(f"Selesai menangani {client_address[0]}:{client_address[1]}", "SUCCESS")
@@ -91,59 +42,70 @@ def ProcessClientInThread(client_socket, client_address):
             client_socket.close()
         return f"Error menangani {client_address[0]}:{client_address[1]}: {str(process_error)}"
 
-def print_server_status(active_threads):
+def print_server_status(active_threads, listen_addresses):
     """Menampilkan status server secara berkala"""
-    with output_lock:
-        print(f"\n{'='*60}")
-        print(f"SERVER STATUS - {datetime.now().strftime('%H:%M:%S')}")
-        print(f"Active Threads: {active_threads}")
-        print(f"Listening on: 172.16.16.101:8885")
-        print(f"{'='*60}\n")
+    log_writer.write(
+        f"\n{'='*60}\n"
+        f"SERVER STATUS - {datetime.now().strftime('%H:%M:%S')}\n"
+        f"Active Threads: {active_threads}\n"
+        f"Listening on: {listen_addresses}\n"
+        f"{'='*60}\n\n"
+    )
 
-def LaunchServer():
+def LaunchServer(server_config=None):
+    if server_config is None:
+        server_config = load_config('thread', [])
     print_with_timestamp("Menginisialisasi Thread Pool HTTP Server...", "SERVER")
     
-    # Inisialisasi socket server
-    main_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    main_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    main_socket.bind(('172.16.16.101', 8885))
-    main_socket.listen(10)
+    # Satu socket listening per site, masing-masing dengan document root sendiri
+    connection_selector = selectors.DefaultSelector()
+    listeners = []
+    for site_address, document_root in server_config.addresses():
+        listener = create_listener(site_address, server_config.listen_backlog)
+        listeners.append(listener)
+        connection_selector.register(listener, selectors.EVENT_READ, HttpServer(document_root, server_config.handlers, server_config.storage))
+        print_with_timestamp(f"Thread Pool HTTP Server aktif di port {site_address[1]} (root {document_root})", "SERVER")
+    listen_addresses = ', '.join(f"{site_address[0]}:{site_address[1]}" for site_address, _ in server_config.addresses())
+    # Batas waktu I/O agar klien yang diam tidak menahan thread
+    deadlines = IoDeadlines.from_config(server_config)
+    # Batas request dan byte per IP klien, berlaku untuk semua thread
+    rate_limiter.configure_from(server_config)
+    # Format dan sampling access log dari konfigurasi, diatur sebelum worker dibuat
+    log_writer.configure_from(server_config)
     
-    print_with_timestamp("Thread Pool HTTP Server aktif di port 8885", "SERVER")
     print_with_timestamp(f"Main Thread ID: {threading.current_thread().ident}", "SERVER")
     
-    # Melacak future thread yang aktif
-    active_futures = []
+    # Melacak future thread yang aktif, dilepas otomatis saat selesai
+    active_futures = InFlightTracker(server_config.max_in_flight, lambda error: print_with_timestamp(f"Task thread gagal: {error}", "ERROR"),
+                                     lambda active_count: metrics_registry.set_connections(active_count, server_config.workers))
     last_status_time = time.time()
     
-    with ThreadPoolExecutor(max_workers=20) as executor:
+    with ThreadPoolExecutor(max_workers=server_config.workers) as executor:
         try:
             while True:
                 # Menampilkan status server setiap 30 detik jika ada aktivitas
                 current_time = time.time()
                 if current_time - last_status_time > 30 and active_futures:
-                    print_server_status(len(active_futures))
+                    print_server_status(len(active_futures), listen_addresses)
                     last_status_time = current_time
                 
-                # Menerima koneksi yang masuk
-                connection, address = main_socket.accept()
-                print_with_timestamp(f"Koneksi baru diterima dari {address[0]}:{address[1]}", "SERVER")
-                
-                # Menghapus future yang sudah selesai dari tracking
-                completed_futures = [future for future in active_futures if future.done()]
-                for done_future in completed_futures:
-                    try:
-                        result = done_future.result()
-                        # Hasil sudah di-log di ProcessClientInThread, tidak perlu log lagi
-                    except Exception as error:
-                        print_with_timestamp(f"Task thread gagal: {error}", "ERROR")
-                    active_futures.remove(done_future)
-                
-                # Menambahkan task penanganan klien baru ke thread pool
-                future_task = executor.submit(ProcessClientInThread, connection, address)
-                active_futures.append(future_task)
-                
-                print_with_timestamp(f"Thread aktif: {len(active_futures)}", "INFO")
+                # Menunggu koneksi masuk di salah satu listener
+                for selector_key, _ in connection_selector.select():
+                    connection, address = selector_key.fileobj.accept()
+                    site_server = selector_key.data
+                    print_with_timestamp(f"Koneksi baru diterima dari {address[0]}:{address[1]}", "SERVER")
+                    
+                    # Menolak dengan 503 jika koneksi yang dilayani sudah mencapai batas
+                    if active_futures.is_full():
+                        print_with_timestamp(f"Server penuh, menolak {address[0]}:{address[1]}", "WARNING")
+                        send_overload_response(site_server, connection, server_config.retry_after)
+                        continue
+                    
+                    # Menambahkan task penanganan klien baru ke thread pool
+                    future_task = executor.submit(ProcessClientInThread, connection, address, site_server, deadlines)
+                    active_futures.track(future_task)
+                    
+                    print_with_timestamp(f"Thread aktif: {len(active_futures)}", "INFO")
                 
         except KeyboardInterrupt:
             print_with_timestamp("Sinyal interrupt diterima. Mematikan server...", "WARNING")
@@ -153,7 +115,7 @@ def LaunchServer():
             if active_futures:
                 print_with_timestamp(f"Menunggu {len(active_futures)} thread aktif untuk selesai...", "INFO")
                 try:
-                    for done_future in as_completed(active_futures, timeout=10):
+                    for done_future in as_completed(active_futures.snapshot(), timeout=10):
                         try:
                             final_result = done_future.result()
                             # Hasil sudah di-log di ProcessClientInThread
@@ -167,8 +129,11 @@ def LaunchServer():
             
         finally:
             print_with_timestamp("Menutup socket server...", "SERVER")
-            main_socket.close()
+            connection_selector.close()
+            for listener in listeners:
+                listener.close()
             print_with_timestamp("Server telah dimatikan dengan aman", "SERVER")
+            log_writer.flush()
             
             # Footer penutup
             print("\n" + "="*60)
@@ -177,7 +142,7 @@ def LaunchServer():
             print("="*60)
 
 def start_application():
-    LaunchServer()
+    LaunchServer(load_config('thread', description="Thread Pool HTTP Server"))
 
 if __name__ == "__main__":
     start_application()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul server ada di root repo; http.py menutupi paket http bawaan, jadi root harus paling depan
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
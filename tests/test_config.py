@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import config
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch, tmp_path):
+    """Tanpa variabel HTTP_* dari luar dan tanpa .env di direktori kerja"""
+    for env_name in list(os.environ):
+        if env_name.startswith('HTTP_'):
+            monkeypatch.delenv(env_name)
+    monkeypatch.chdir(tmp_path)
+
+def write_env(path, text):
+    path.write_text(text)
+    return str(path)
+
+def test_defaults_per_mode():
+    assert config.load_config('thread', []).workers == config.default_values('thread')['workers']
+    process_config = config.load_config('process', [])
+    assert process_config.workers >= 4
+    assert process_config.max_in_flight == process_config.workers * 8
+    assert config.load_config('async', []).max_in_flight is not None
+    assert config.load_config('thread', []).port == config.DEFAULT_PORT
+
+def test_precedence_default_env_file_environment_cli(tmp_path, monkeypatch):
+    env_file = write_env(tmp_path / 'site.env', 'HTTP_SERVER_PORT=1111\nHTTP_WORKERS=3\nHTTP_RETRY_AFTER=7\n')
+    # File env mengalahkan default
+    loaded = config.load_config('thread', ['--env-file', env_file])
+    assert (loaded.port, loaded.workers, loaded.retry_after) == (1111, 3, 7)
+    # Environment mengalahkan file env
+    monkeypatch.setenv('HTTP_SERVER_PORT', '2222')
+    monkeypatch.setenv('HTTP_WORKERS', '4')
+    loaded = config.load_config('thread', ['--env-file', env_file])
+    assert (loaded.port, loaded.workers, loaded.retry_after) == (2222, 4, 7)
+    # Flag CLI mengalahkan semuanya
+    loaded = config.load_config('thread', ['--env-file', env_file, '--port', '3333'])
+    assert (loaded.port, loaded.workers, loaded.retry_after) == (3333, 4, 7)
+
+def test_env_file_format(tmp_path):
+    env_file = write_env(tmp_path / 'site.env', '# komentar\n\nHTTP_SERVER_HOST = "127.0.0.1"\nbaris tanpa sama dengan\nHTTP_STORAGE=\'content\'\n')
+    loaded = config.load_config('thread', ['--env-file', env_file])
+    assert loaded.host == '127.0.0.1'
+    assert loaded.storage == 'content'
+
+def test_default_env_file_in_served_directory_is_ignored(tmp_path, capsys):
+    # .env di document root bisa ditulis klien lewat upload, jadi tidak dibaca tanpa --env-file
+    write_env(tmp_path / '.env', 'HTTP_WORKERS=99\n')
+    assert config.load_config('thread', ['--document-root', str(tmp_path)]).workers != 99
+    assert '.env' in capsys.readouterr().err
+    served_elsewhere = tmp_path / 'public'
+    served_elsewhere.mkdir()
+    assert config.load_config('thread', ['--document-root', str(served_elsewhere)]).workers == 99
+
+def test_sites_replace_port_and_document_root():
+    loaded = config.load_config('thread', ['--host', '127.0.0.1', '--sites', '8001=/srv/a, 8002=/srv/b'])
+    assert loaded.addresses() == [(('127.0.0.1', 8001), '/srv/a'), (('127.0.0.1', 8002), '/srv/b')]
+    loaded = config.load_config('thread', ['--host', '127.0.0.1', '--port', '8003', '--document-root', '/srv/c'])
+    assert loaded.addresses() == [(('127.0.0.1', 8003), '/srv/c')]
+
+@pytest.mark.parametrize('arguments', [
+    ['--port', 'abc'],
+    ['--sites', '8001'],
+    ['--access-log-format', 'xml'],
+    ['--access-log-sample-rate', '1.5'],
+])
+def test_invalid_values_exit(arguments):
+    with pytest.raises(SystemExit):
+        config.load_config('thread', arguments)
+
+def test_access_log_settings():
+    loaded = config.load_config('thread', ['--access-log-format', 'JSON', '--access-log-sample-rate', '0.25'])
+    assert (loaded.access_log_format, loaded.access_log_sample_rate) == ('json', 0.25)
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from http import DirectoryIndex
+
+# mtime direktori dimundurkan ke waktu lama agar setiap perubahan berikutnya pasti mengubahnya,
+# meskipun resolusi timestamp filesystem kasar
+OLD_MTIME_NS = 1_000_000_000 * 10**9
+
+def age_directory(directory):
+    os.utime(directory, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+
+def names(directory_index):
+    return sorted(entry.name for entry in directory_index.files())
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / 'x').write_text('x')
+    (tmp_path / 'keep').write_text('keep')
+    age_directory(tmp_path)
+    return tmp_path
+
+def new_index(directory):
+    return DirectoryIndex(str(directory), {'.txt': 'text/plain'})
+
+def test_initial_scan_skips_hidden_files_and_directories(directory):
+    (directory / '.hidden').write_text('h')
+    (directory / 'sub').mkdir()
+    age_directory(directory)
+    assert names(new_index(directory)) == ['keep', 'x']
+
+def test_refresh_picks_up_external_changes(directory):
+    directory_index = new_index(directory)
+    assert names(directory_index) == ['keep', 'x']
+    (directory / 'added').write_text('a')
+    os.remove(directory / 'x')
+    assert names(directory_index) == ['added', 'keep']
+
+def test_unchanged_directory_is_not_rescanned(directory, monkeypatch):
+    directory_index = new_index(directory)
+    directory_index.files()
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or real_scandir(path))
+    directory_index.files()
+    directory_index.lookup('keep')
+    assert scans == []
+
+def test_apply_change_updates_entry_immediately(directory):
+    directory_index = new_index(directory)
+    directory_index.files()
+    directory_index.apply_change('new.txt', lambda: (directory / 'new.txt').write_text('new'))
+    new_entry = directory_index.entries['new.txt']
+    assert (new_entry.size, new_entry.mime_type) == (3, 'text/plain')
+    directory_index.apply_change('x', lambda: os.remove(directory / 'x'))
+    assert 'x' not in directory_index.entries
+    assert names(directory_index) == ['keep', 'new.txt']
+
+def test_apply_change_keeps_cached_mtime(directory):
+    directory_index = new_index(directory)
+    directory_index.files()
+    directory_index.apply_change('new', lambda: (directory / 'new').write_text('new'))
+    # Mtime lama dipertahankan sehingga refresh berikutnya memindai ulang
+    assert directory_index.directory_mtime == OLD_MTIME_NS
+    assert directory_index.directory_mtime != os.stat(directory).st_mtime_ns
+
+def test_concurrent_change_by_other_worker_is_not_lost(directory):
+    # Dua indeks mewakili dua proses worker pada document root yang sama
+    index_a = new_index(directory)
+    index_b = new_index(directory)
+    index_a.files()
+    index_b.files()
+
+    def upload_while_other_worker_deletes():
+        (directory / 'new').write_text('new')
+        index_b.apply_change('x', lambda: os.remove(directory / 'x'))
+
+    index_a.apply_change('new', upload_while_other_worker_deletes)
+    assert sorted(os.listdir(directory)) == ['keep', 'new']
+    assert names(index_a) == ['keep', 'new']
+    assert names(index_b) == ['keep', 'new']
+
+def test_failed_change_still_syncs_entry(directory):
+    directory_index = new_index(directory)
+    directory_index.files()
+
+    def remove_then_fail():
+        os.remove(directory / 'x')
+        raise OSError('gagal setelah menghapus')
+
+    with pytest.raises(OSError):
+        directory_index.apply_change('x', remove_then_fail)
+    assert 'x' not in directory_index.entries
+
+def test_lookup_falls_back_to_stat_within_same_mtime(directory):
+    directory_index = new_index(directory)
+    directory_index.files()
+    # File baru dengan mtime direktori yang sama (resolusi timestamp kasar): pemindaian dilewati
+    (directory / 'late').write_text('late')
+    age_directory(directory)
+    assert directory_index.lookup('late').size == 4
+
+@pytest.mark.parametrize('name', ['', '.env', '../keep', 'sub/keep'])
+def test_update_rejects_hidden_and_nested_names(directory, name):
+    assert new_index(directory).update(name) is None
+
+def test_sorted_files_follow_changes(directory):
+    directory_index = new_index(directory)
+    assert [entry.name for entry in directory_index.sorted_files('name')] == ['keep', 'x']
+    directory_index.apply_change('a', lambda: (directory / 'a').write_text('aaaaaaaa'))
+    assert [entry.name for entry in directory_index.sorted_files('name')] == ['a', 'keep', 'x']
+    assert [entry.name for entry in directory_index.sorted_files('size', reverse=True)] == ['a', 'keep', 'x']
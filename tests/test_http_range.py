@@ -0,0 +1,113 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from http import HttpServer, RESPONSE_CACHE_MAX_FILE_SIZE
+
+def render(http_response):
+    """Bytes response seperti yang diterima klien, lewat sepasang socket lokal"""
+    server_side, client_side = socket.socketpair()
+    sender = threading.Thread(target=lambda: (http_response.send(server_side), server_side.close()))
+    sender.start()
+    received = bytearray()
+    while True:
+        chunk = client_side.recv(65536)
+        if not chunk:
+            break
+        received += chunk
+    sender.join()
+    client_side.close()
+    head, _, body = bytes(received).partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = {name.lower(): value.strip() for name, _, value in (line.partition(':') for line in header_lines)}
+    return int(status_line.split()[1]), headers, body
+
+def get(http_server, path, **headers):
+    header_text = ''.join(f'{name.replace("_", "-")}: {value}\r\n' for name, value in headers.items())
+    return render(http_server.proses(f'GET {path} HTTP/1.1\r\nHost: test\r\n{header_text}\r\n'))
+
+# Ukuran kecil dilayani dari cache memori, ukuran besar dengan sendfile
+@pytest.fixture(params=[1000, RESPONSE_CACHE_MAX_FILE_SIZE + 1000])
+def site(request, tmp_path):
+    content = os.urandom(request.param)
+    # .bin tidak dikompresi, sehingga body bisa dibandingkan langsung
+    (tmp_path / 'data.bin').write_bytes(content)
+    return HttpServer(str(tmp_path)), content
+
+def test_full_file(site):
+    http_server, content = site
+    status, headers, body = get(http_server, '/data.bin')
+    assert status == 200
+    assert body == content
+    assert headers['accept-ranges'] == 'bytes'
+    assert int(headers['content-length']) == len(content)
+
+@pytest.mark.parametrize('range_spec, expected', [
+    ('bytes=0-9', (0, 9)),
+    ('bytes=10-', (10, None)),
+    ('bytes=-5', (-5, None)),
+    ('bytes=5-999999999', (5, None)),
+])
+def test_single_range(site, range_spec, expected):
+    http_server, content = site
+    status, headers, body = get(http_server, '/data.bin', Range=range_spec)
+    range_start, range_end = expected
+    if range_start < 0:
+        range_start += len(content)
+    if range_end is None:
+        range_end = len(content) - 1
+    assert status == 206
+    assert body == content[range_start:range_end + 1]
+    assert headers['content-range'] == f'bytes {range_start}-{range_end}/{len(content)}'
+
+@pytest.mark.parametrize('range_spec', ['bytes=999999999-', 'bytes=-0'])
+def test_unsatisfiable_range(site, range_spec):
+    http_server, content = site
+    status, headers, _ = get(http_server, '/data.bin', Range=range_spec)
+    assert status == 416
+    assert headers['content-range'] == f'bytes */{len(content)}'
+
+@pytest.mark.parametrize('range_spec', ['bytes=0-1,4-5', 'items=0-5', 'bytes=9-3', 'bytes=abc'])
+def test_ignored_range_sends_whole_file(site, range_spec):
+    http_server, content = site
+    status, _, body = get(http_server, '/data.bin', Range=range_spec)
+    assert status == 200
+    assert body == content
+
+def test_etag_revalidation(site):
+    http_server, _ = site
+    _, headers, _ = get(http_server, '/data.bin')
+    etag = headers['etag']
+    # Dua kali agar jalur cache memori juga diperiksa
+    for _ in range(2):
+        status, not_modified_headers, body = get(http_server, '/data.bin', If_None_Match=etag)
+        assert status == 304
+        assert body == b''
+        assert not_modified_headers['etag'] == etag
+    assert get(http_server, '/data.bin', If_None_Match='"other"')[0] == 200
+    assert get(http_server, '/data.bin', If_None_Match=f'"other", W/{etag}')[0] == 304
+
+def test_if_modified_since(site):
+    http_server, _ = site
+    _, headers, _ = get(http_server, '/data.bin')
+    assert get(http_server, '/data.bin', If_Modified_Since=headers['last-modified'])[0] == 304
+    assert get(http_server, '/data.bin', If_Modified_Since='Thu, 01 Jan 1970 00:00:00 GMT')[0] == 200
+    assert get(http_server, '/data.bin', If_Modified_Since='not a date')[0] == 200
+    # If-None-Match yang tidak cocok lebih diutamakan daripada If-Modified-Since
+    assert get(http_server, '/data.bin', If_None_Match='"other"', If_Modified_Since=headers['last-modified'])[0] == 200
+
+def test_changed_file_gets_new_etag(site, tmp_path):
+    http_server, content = site
+    _, headers, _ = get(http_server, '/data.bin')
+    (tmp_path / 'data.bin').write_bytes(content + b'more')
+    os.utime(tmp_path / 'data.bin', ns=(1, 10**18))
+    status, new_headers, body = get(http_server, '/data.bin', If_None_Match=headers['etag'])
+    assert status == 200
+    assert body == content + b'more'
+    assert new_headers['etag'] != headers['etag']
+
+def test_missing_file(site):
+    http_server, _ = site
+    assert get(http_server, '/nothing.bin')[0] == 404
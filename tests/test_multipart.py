@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from http import MultipartParser, UploadStore, RequestError, UPLOAD_TEMP_DIRECTORY
+
+BOUNDARY = 'xYz123'
+
+def multipart_body(parts, boundary=BOUNDARY):
+    """Body multipart/form-data dari daftar (filename, data)"""
+    body = b''
+    for file_name, data in parts:
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+        body += data + b'\r\n'
+    return body + f'--{boundary}--\r\n'.encode()
+
+def parse(directory, chunks):
+    parser = MultipartParser(BOUNDARY, UploadStore(str(directory)))
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+    finally:
+        parser.abort()
+    return parser.saved_files
+
+def split_at(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+def test_single_file_in_one_chunk(tmp_path):
+    assert parse(tmp_path, [multipart_body([('a.txt', b'hello')])]) == ['a.txt']
+    assert (tmp_path / 'a.txt').read_bytes() == b'hello'
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 13, 64])
+def test_delimiter_split_across_chunks(tmp_path, chunk_size):
+    # Data sengaja memuat potongan yang mirip awal delimiter
+    payload = b'line\r\n--xYz12 not yet\r\n--' + bytes(range(256)) * 4
+    body = multipart_body([('one.bin', payload), ('two.bin', b'second')])
+    assert parse(tmp_path, split_at(body, chunk_size)) == ['one.bin', 'two.bin']
+    assert (tmp_path / 'one.bin').read_bytes() == payload
+    assert (tmp_path / 'two.bin').read_bytes() == b'second'
+
+def test_every_split_point(tmp_path):
+    body = multipart_body([('f.txt', b'abc\r\n-\r\n--')])
+    for split_point in range(1, len(body)):
+        directory = tmp_path / str(split_point)
+        directory.mkdir()
+        assert parse(directory, [body[:split_point], body[split_point:]]) == ['f.txt']
+        assert (directory / 'f.txt').read_bytes() == b'abc\r\n-\r\n--'
+
+def test_empty_file_part(tmp_path):
+    assert parse(tmp_path, [multipart_body([('empty.txt', b'')])]) == ['empty.txt']
+    assert (tmp_path / 'empty.txt').read_bytes() == b''
+
+def test_missing_closing_delimiter_is_rejected(tmp_path):
+    body = multipart_body([('cut.txt', b'partial data')])
+    with pytest.raises(RequestError):
+        parse(tmp_path, [body[:-len(f'--{BOUNDARY}--\r\n') - 4]])
+    # File yang belum lengkap tidak disimpan dan file sementaranya dibuang
+    assert not (tmp_path / 'cut.txt').exists()
+    assert os.listdir(tmp_path / UPLOAD_TEMP_DIRECTORY) == []
+
+def test_oversized_part_header_is_rejected(tmp_path):
+    body = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="x"\r\nX-Padding: {"a" * 20000}'.encode()
+    with pytest.raises(RequestError):
+        parse(tmp_path, [body])
+
+def test_hidden_and_nested_names(tmp_path):
+    with pytest.raises(RequestError):
+        parse(tmp_path, [multipart_body([('.env', b'HTTP_SERVER_PORT=1')])])
+    assert not (tmp_path / '.env').exists()
+    # Komponen direktori dibuang, file tetap di document root
+    assert parse(tmp_path, [multipart_body([('../../etc/x.txt', b'x')])]) == ['x.txt']
+    assert (tmp_path / 'x.txt').exists()
+
+def test_non_file_fields_are_ignored(tmp_path):
+    body = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="note"\r\n\r\nvalue\r\n'.encode() + multipart_body([('b.txt', b'B')])
+    assert parse(tmp_path, [body]) == ['b.txt']